@@ -0,0 +1,406 @@
+"""
+Seeded random workload generators for the benchmarks
+"""
+from __future__ import annotations
+from random import Random
+from src.tree_transducer.Tree import Tree, VarLeaf
+from src.tree_transducer.TreeAutomaton.NBTA import NBTA
+from src.tree_transducer.TreeAutomaton.DBTA import DBTA
+from src.tree_transducer.TreeAutomaton.NTTA import NTTA
+from src.tree_transducer.TreeAutomaton.DTTA import DTTA
+from src.tree_transducer.TreeTransducer.NBTT import NBTT
+from src.tree_transducer.TreeTransducer.NTTT import NTTT
+
+def random_alphabet(rng: Random, size: int, max_rank: int = 2) -> dict:
+    """
+    Creates a random ranked alphabet with at least one symbol of rank 0 and one symbol of rank max_rank
+
+    Args:
+        rng: The seeded random number generator
+        size: The number of symbols, which must be at least 2
+        max_rank: The highest rank of a symbol
+
+    Returns:
+        dict: A dict mapping each symbol to its rank
+    """
+    ranks = [0, max_rank] + [rng.randint(0, max_rank) for _ in range(size - 2)]
+    return {f"f{i}": rank for (i, rank) in enumerate(ranks)}
+
+def _states(n_states: int) -> list:
+    """
+    Names the states of a generated machine
+
+    Args:
+        n_states: The number of states
+
+    Returns:
+        list: A list containing the names of the states
+    """
+    return [f"q{i}" for i in range(n_states)]
+
+def _final_states(rng: Random, states: list, final_ratio: float) -> list:
+    """
+    Picks the final states of a generated machine
+
+    Args:
+        rng: The seeded random number generator
+        states: The states of the machine
+        final_ratio: The fraction of the states that are final
+
+    Returns:
+        list: A list containing at least one final state
+    """
+    return rng.sample(states, max(1, round(final_ratio * len(states))))
+
+def _child_tuples(rng: Random, states: list, rank: int, count: int) -> list:
+    """
+    Picks distinct tuples of child states
+
+    Args:
+        rng: The seeded random number generator
+        states: The states of the machine
+        rank: The length of the tuples
+        count: The number of tuples, which is lowered to the number of possible tuples if it is larger
+
+    Returns:
+        list: A list containing the tuples
+    """
+    count = min(count, len(states) ** rank)
+    tuples = set()
+    while len(tuples) < count:
+        tuples.add(tuple(rng.choice(states) for _ in range(rank)))
+    return sorted(tuples)
+
+def random_nbta(rng: Random, alphabet: dict, n_states: int, rules_per_symbol: int = 4, ambiguity: int = 2, epsilon_rules: int = 0, final_ratio: float = 0.3) -> NBTA:
+    """
+    Creates a random bottom-up automaton
+
+    Args:
+        rng: The seeded random number generator
+        alphabet: A dict mapping each symbol to its rank
+        n_states: The number of states
+        rules_per_symbol: The number of distinct tuples of child states read by each symbol
+        ambiguity: The number of states reached by each tuple of child states
+        epsilon_rules: The number of epsilon transitions
+        final_ratio: The fraction of the states that are final
+
+    Returns:
+        NBTA: The automaton
+    """
+    states = _states(n_states)
+    transitions = dict()
+    for (symbol, rank) in alphabet.items():
+        for children in _child_tuples(rng, states, rank, rules_per_symbol):
+            transitions[(children, symbol)] = set(rng.sample(states, min(ambiguity, n_states)))
+    for _ in range(epsilon_rules):
+        transitions.setdefault(((rng.choice(states),), ""), set()).add(rng.choice(states))
+    return NBTA(states, _final_states(rng, states, final_ratio), alphabet.keys(), transitions)
+
+def random_dbta(rng: Random, alphabet: dict, n_states: int, rules_per_symbol: int = 4, final_ratio: float = 0.3) -> DBTA:
+    """
+    Creates a random deterministic bottom-up automaton whose states are all reachable, so that it can be minimized.
+    Rules only read states that were already reached, and the states are reached in order.
+
+    Args:
+        rng: The seeded random number generator
+        alphabet: A dict mapping each symbol to its rank
+        n_states: The number of states
+        rules_per_symbol: The number of tuples of child states read by each symbol
+        final_ratio: The fraction of the states that are final
+
+    Returns:
+        DBTA: The automaton
+    """
+    states = _states(n_states)
+    symbols = list(alphabet.items())
+    leaves = [symbol for (symbol, rank) in symbols if rank == 0]
+    transitions = {(tuple(), leaves[0]): {states[0]}}
+    reached = 1
+    for _ in range(rules_per_symbol * len(symbols)):
+        (symbol, rank) = rng.choice(symbols)
+        key = (tuple(rng.choice(states[:reached]) for _ in range(rank)), symbol)
+        if key in transitions:
+            continue
+        if reached < n_states:
+            transitions[key] = {states[reached]}
+            reached += 1
+        else:
+            transitions[key] = {rng.choice(states)}
+    states = states[:reached]
+    return DBTA(states, _final_states(rng, states, final_ratio), alphabet.keys(), transitions)
+
+def random_ntta(rng: Random, alphabet: dict, n_states: int, rules_per_symbol: int = 4, ambiguity: int = 2, epsilon_rules: int = 0, final_ratio: float = 0.3) -> NTTA:
+    """
+    Creates a random top-down automaton
+
+    Args:
+        rng: The seeded random number generator
+        alphabet: A dict mapping each symbol to its rank
+        n_states: The number of states
+        rules_per_symbol: The number of states that read each symbol
+        ambiguity: The number of tuples of child states of each (state, symbol, rank) key
+        epsilon_rules: The number of epsilon transitions
+        final_ratio: The fraction of the states that are initial
+
+    Returns:
+        NTTA: The automaton
+    """
+    states = _states(n_states)
+    transitions = dict()
+    for (symbol, rank) in alphabet.items():
+        for state in rng.sample(states, min(rules_per_symbol, n_states)):
+            transitions[(state, symbol, rank)] = {tuple(rng.choice(states) for _ in range(rank)) for _ in range(ambiguity)}
+    for _ in range(epsilon_rules):
+        transitions.setdefault((rng.choice(states), "", 1), set()).add((rng.choice(states),))
+    return NTTA(states, _final_states(rng, states, final_ratio), alphabet.keys(), transitions)
+
+def random_dtta(rng: Random, alphabet: dict, n_states: int, rules_per_symbol: int = 4, final_ratio: float = 0.3) -> DTTA:
+    """
+    Creates a random deterministic top-down automaton
+
+    Args:
+        rng: The seeded random number generator
+        alphabet: A dict mapping each symbol to its rank
+        n_states: The number of states
+        rules_per_symbol: The number of states that read each symbol
+        final_ratio: The fraction of the states that are initial
+
+    Returns:
+        DTTA: The automaton
+    """
+    automaton = random_ntta(rng, alphabet, n_states, rules_per_symbol, 1, 0, final_ratio)
+    return DTTA(automaton.states, automaton.final_states, automaton.symbols, automaton.transitions)
+
+def random_template(rng: Random, symbols: dict, rank: int) -> Tree:
+    """
+    Creates a random output template with one variable for each child
+
+    Args:
+        rng: The seeded random number generator
+        symbols: A dict mapping each output symbol to its rank
+        rank: The number of variables
+
+    Returns:
+        Tree: A template whose root has rank symbols of that rank, or a variable if there is none and rank is 1
+    """
+    variables = [VarLeaf(i) for i in range(rank)]
+    rng.shuffle(variables)
+    candidates = [symbol for (symbol, r) in symbols.items() if r == rank]
+    if not candidates:
+        return variables[0] if rank == 1 else Tree(rng.choice([s for (s, r) in symbols.items() if r == 0]))
+    return Tree(rng.choice(candidates), variables)
+
+def random_nbtt(rng: Random, alphabet: dict, n_states: int, rules_per_symbol: int = 4, ambiguity: int = 2, epsilon_rules: int = 0, final_ratio: float = 0.3) -> NBTT:
+    """
+    Creates a random bottom-up transducer whose output alphabet is its input alphabet
+
+    Args:
+        rng: The seeded random number generator
+        alphabet: A dict mapping each symbol to its rank
+        n_states: The number of states
+        rules_per_symbol: The number of distinct tuples of child states read by each symbol
+        ambiguity: The number of rules of each tuple of child states
+        epsilon_rules: The number of epsilon transitions
+        final_ratio: The fraction of the states that are final
+
+    Returns:
+        NBTT: The transducer
+    """
+    states = _states(n_states)
+    transitions = dict()
+    for (symbol, rank) in alphabet.items():
+        for children in _child_tuples(rng, states, rank, rules_per_symbol):
+            transitions[(children, symbol)] = [(rng.choice(states), random_template(rng, alphabet, rank)) for _ in range(ambiguity)]
+    for _ in range(epsilon_rules):
+        transitions.setdefault(((rng.choice(states),), ""), []).append((rng.choice(states), random_template(rng, alphabet, 1)))
+    return NBTT(states, _final_states(rng, states, final_ratio), alphabet.keys(), alphabet.keys(), transitions)
+
+def random_nttt(rng: Random, alphabet: dict, n_states: int, rules_per_symbol: int = 4, ambiguity: int = 2, epsilon_rules: int = 0, final_ratio: float = 0.3) -> NTTT:
+    """
+    Creates a random top-down transducer whose output alphabet is its input alphabet
+
+    Args:
+        rng: The seeded random number generator
+        alphabet: A dict mapping each symbol to its rank
+        n_states: The number of states
+        rules_per_symbol: The number of states that read each symbol
+        ambiguity: The number of rules of each (state, symbol, rank) key
+        epsilon_rules: The number of epsilon transitions
+        final_ratio: The fraction of the states that are initial
+
+    Returns:
+        NTTT: The transducer
+    """
+    states = _states(n_states)
+    transitions = dict()
+    for (symbol, rank) in alphabet.items():
+        for state in rng.sample(states, min(rules_per_symbol, n_states)):
+            transitions[(state, symbol, rank)] = {(tuple(rng.choice(states) for _ in range(rank)), random_template(rng, alphabet, rank)) for _ in range(ambiguity)}
+    for _ in range(epsilon_rules):
+        transitions.setdefault((rng.choice(states), "", 1), set()).add(((rng.choice(states),), random_template(rng, alphabet, 1)))
+    return NTTT(states, _final_states(rng, states, final_ratio), alphabet.keys(), alphabet.keys(), transitions)
+
+def dense_epsilon_rules(states: list, top_down: bool = False) -> dict:
+    """
+    Creates an epsilon transition between each ordered pair of distinct states, whose output template is a single variable.
+    Every sequence of distinct states is a chain of epsilon transitions, which makes it the worst case for finding a transducer's epsilon chains.
+
+    Args:
+        states: The states of the transducer
+        top_down: Whether the transitions are for a top-down transducer instead of a bottom-up transducer
+
+    Returns:
+        dict: A dict containing the epsilon transitions
+    """
+    if top_down:
+        return {(s, "", 1): {((t,), VarLeaf(0)) for t in states if t != s} for s in states}
+    return {((s,), ""): [(t, VarLeaf(0)) for t in states if t != s] for s in states}
+
+def random_tree(rng: Random, alphabet: dict, size: int) -> Tree:
+    """
+    Creates a random tree with about the given number of nodes.
+    Each inner node splits the rest of its size evenly between its children, and usually has the highest rank so that the tree stays shallow.
+
+    Args:
+        rng: The seeded random number generator
+        alphabet: A dict mapping each symbol to its rank
+        size: The number of nodes to aim for
+
+    Returns:
+        Tree: The tree
+    """
+    leaves = [symbol for (symbol, rank) in alphabet.items() if rank == 0]
+    inner = [(symbol, rank) for (symbol, rank) in alphabet.items() if rank > 0]
+    max_rank = max(alphabet.values())
+    widest = [(symbol, rank) for (symbol, rank) in inner if rank == max_rank]
+    return _random_tree_helper(rng, leaves, inner, widest, size)
+
+def _random_tree_helper(rng: Random, leaves: list, inner: list, widest: list, size: int) -> Tree:
+    """
+    Recursive helper for random_tree()
+
+    Args:
+        rng: The seeded random number generator
+        leaves: The symbols of rank 0
+        inner: A list of (symbol, rank) tuples of the symbols of positive rank
+        widest: A list of (symbol, rank) tuples of the symbols of the highest rank
+        size: The number of nodes to aim for in the subtree
+
+    Returns:
+        Tree: The subtree
+    """
+    if size <= 1 or not inner:
+        return Tree(rng.choice(leaves))
+    (symbol, rank) = rng.choice(widest if rng.random() < 0.75 else inner)
+    sizes = [(size - 1) // rank + (1 if i < (size - 1) % rank else 0) for i in range(rank)]
+    return Tree(symbol, [_random_tree_helper(rng, leaves, inner, widest, sizes[i]) for i in range(rank)])
+
+def deep_tree(rng: Random, alphabet: dict, depth: int) -> Tree:
+    """
+    Creates a tree whose first children form a path of the given depth, with leaves as every other child
+
+    Args:
+        rng: The seeded random number generator
+        alphabet: A dict mapping each symbol to its rank
+        depth: The number of nodes on the path
+
+    Returns:
+        Tree: The tree
+    """
+    leaves = [symbol for (symbol, rank) in alphabet.items() if rank == 0]
+    inner = [(symbol, rank) for (symbol, rank) in alphabet.items() if rank > 0]
+    tree = Tree(rng.choice(leaves))
+    for _ in range(depth - 1):
+        (symbol, rank) = rng.choice(inner)
+        tree = Tree(symbol, [tree] + [Tree(rng.choice(leaves)) for _ in range(rank - 1)])
+    return tree
+
+def wide_tree(rng: Random, alphabet: dict, depth: int) -> Tree:
+    """
+    Creates a complete tree of the given depth whose inner nodes all have the highest rank in the alphabet
+
+    Args:
+        rng: The seeded random number generator
+        alphabet: A dict mapping each symbol to its rank
+        depth: The depth of the tree
+
+    Returns:
+        Tree: The tree
+    """
+    max_rank = max(alphabet.values())
+    leaves = [symbol for (symbol, rank) in alphabet.items() if rank == 0]
+    inner = [symbol for (symbol, rank) in alphabet.items() if rank == max_rank]
+    if depth <= 1 or max_rank == 0:
+        return Tree(rng.choice(leaves))
+    return Tree(rng.choice(inner), [wide_tree(rng, alphabet, depth - 1) for _ in range(max_rank)])
+
+def accepted_tree(rng: Random, automaton: NBTA | NTTA, size: int) -> Tree:
+    """
+    Creates a random tree accepted by an automaton with about the given number of nodes.
+    Rules with the most children are picked at random and the rest of the size is split between the children.
+    Once the size of a subtree is used up, only rules that lead to the smallest subtrees are picked.
+    Epsilon transitions are not used.
+
+    Args:
+        rng: The seeded random number generator
+        automaton: The NBTA or NTTA
+        size: The number of nodes to aim for
+
+    Returns:
+        Tree: The tree, or None if the automaton accepts no tree without epsilon transitions
+    """
+    #Each rule is stored as a tuple containing the symbol and the child states, under the state that it produces
+    producers = dict()
+    if isinstance(automaton, NTTA):
+        for (k, v) in automaton.transitions.items():
+            if k[1]:
+                producers.setdefault(k[0], []).extend((k[1], children) for children in v)
+        starts = automaton.final_states
+    else:
+        for (k, v) in automaton.transitions.items():
+            if k[1]:
+                for state in v:
+                    producers.setdefault(state, []).append((k[1], k[0]))
+        starts = {s for s in automaton.states if automaton.epsilon_closure[s] & automaton.final_states}
+    heights = dict()
+    update = True
+    while update:
+        update = False
+        for (state, rules) in producers.items():
+            for (_, children) in rules:
+                if all(c in heights for c in children):
+                    height = 1 + max((heights[c] for c in children), default=0)
+                    if height < heights.get(state, height + 1):
+                        heights[state] = height
+                        update = True
+    starts = sorted(s for s in starts if s in heights)
+    if not starts:
+        return None
+    return _accepted_tree_helper(rng, rng.choice(starts), producers, heights, size)
+
+def _accepted_tree_helper(rng: Random, state, producers: dict, heights: dict, size: int) -> Tree:
+    """
+    Recursive helper for accepted_tree()
+
+    Args:
+        rng: The seeded random number generator
+        state: The state of the subtree
+        producers: A dict mapping states to lists of (symbol, child states) rules that produce them
+        heights: A dict mapping states to the height of their smallest subtree
+        size: The number of nodes to aim for in the subtree
+
+    Returns:
+        Tree: The subtree
+    """
+    rules = [rule for rule in producers[state] if all(c in heights for c in rule[1])]
+    if size <= 1:
+        #Every child of these rules has a smaller subtree than the state, so the recursion ends
+        rules = [rule for rule in rules if all(heights[c] < heights[state] for c in rule[1])]
+    else:
+        #Picking the rules with the most children keeps the tree shallow
+        widest = max(len(rule[1]) for rule in rules)
+        rules = [rule for rule in rules if len(rule[1]) == widest]
+    (symbol, children) = rng.choice(rules)
+    #The rest of the size is split evenly between the children
+    sizes = [(size - 1) // len(children) + (1 if i < (size - 1) % len(children) else 0) for i in range(len(children))]
+    return Tree(symbol, [_accepted_tree_helper(rng, children[i], producers, heights, sizes[i]) for i in range(len(children))])
@@ -0,0 +1,117 @@
+"""
+Benchmark runner module.
+Runs the scenarios over their size sweeps, writes the timings as JSON and compares them against a stored baseline.
+"""
+from __future__ import annotations
+from collections.abc import Iterable
+from random import Random
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from .Scenarios import SCENARIOS
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+def run_benchmarks(names: Iterable = None, sizes: Iterable = None, repeat: int = 5, seed: int = 0) -> dict:
+    """
+    Runs benchmark scenarios, timing each one at each size of its sweep.
+    Each (scenario, size) pair gets its own random number generator seeded from the seed, the scenario and the size,
+    so adding or removing scenarios does not change the workloads of the others.
+
+    Args:
+        names: The names of the scenarios to run, or None to run all of them
+        sizes: The sizes to run every scenario at, or None to use each scenario's default sweep
+        repeat: The number of times each workload is timed, of which the fastest is kept
+        seed: The seed of the workloads
+
+    Returns:
+        dict: A dict containing the settings of the run and, under "results", a dict mapping scenario names to dicts mapping sizes to seconds
+    """
+    results = dict()
+    for name in (SCENARIOS if names is None else names):
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown benchmark scenario: {name}")
+        (setup, default_sizes) = SCENARIOS[name]
+        results[name] = dict()
+        for size in (default_sizes if sizes is None else sizes):
+            run = setup(Random(f"{seed}:{name}:{size}"), size)
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - start)
+            results[name][str(size)] = min(timings)
+    return {"seed": seed, "repeat": repeat, "python": platform.python_version(), "results": results}
+
+def compare_results(results: dict, baseline: dict, tolerance: float = 0.5) -> list:
+    """
+    Finds the timings that are slower than their baseline by more than the tolerance.
+    Only the (scenario, size) pairs present in both runs are compared.
+
+    Args:
+        results: The output of run_benchmarks()
+        baseline: The output of an earlier run_benchmarks()
+        tolerance: The fraction by which a timing may exceed its baseline
+
+    Returns:
+        list: A list of tuples each containing the scenario, the size, the baseline timing and the new timing of a regression
+    """
+    regressions = []
+    for (name, timings) in results["results"].items():
+        baseline_timings = baseline["results"].get(name, dict())
+        for (size, seconds) in timings.items():
+            if size in baseline_timings and seconds > baseline_timings[size] * (1 + tolerance):
+                regressions.append((name, size, baseline_timings[size], seconds))
+    return regressions
+
+def main(argv: list = None) -> int:
+    """
+    Runs the benchmarks from the command line
+
+    Args:
+        argv: The command line arguments, or None to use sys.argv
+
+    Returns:
+        int: 1 if a regression was found and 0 otherwise
+    """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Runs the tree automaton and transducer benchmarks.")
+    parser.add_argument("scenarios", nargs="*", help="the scenarios to run (all by default)")
+    parser.add_argument("--sizes", type=int, nargs="+", help="the sizes to run every scenario at instead of their default sweeps")
+    parser.add_argument("--repeat", type=int, default=5, help="the number of timings of each workload, of which the fastest is kept")
+    parser.add_argument("--seed", type=int, default=0, help="the seed of the workloads")
+    parser.add_argument("--output", help="the path of the JSON file the results are written to")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="the path of the JSON baseline the results are compared against")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="the fraction by which a timing may exceed its baseline")
+    parser.add_argument("--list", action="store_true", help="lists the scenarios and their default sizes")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for (name, (_, sizes)) in SCENARIOS.items():
+            print(f"{name}: {', '.join(map(str, sizes))}")
+        return 0
+
+    results = run_benchmarks(args.scenarios or None, args.sizes, args.repeat, args.seed)
+    for (name, timings) in results["results"].items():
+        for (size, seconds) in timings.items():
+            print(f"{name:<24} {size:>6} {seconds * 1000:>12.3f} ms")
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+    if not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    if baseline["seed"] != results["seed"]:
+        print(f"Baseline was run with seed {baseline['seed']}, so it is not compared.")
+        return 0
+    regressions = compare_results(results, baseline, args.tolerance)
+    for (name, size, before, after) in regressions:
+        print(f"Regression: {name} at size {size} took {after * 1000:.3f} ms (baseline {before * 1000:.3f} ms)")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
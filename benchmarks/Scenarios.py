@@ -0,0 +1,158 @@
+"""
+Timed benchmark scenarios.
+Each scenario builds its workload for one size from a seeded random number generator and returns a function that runs the timed operation.
+Building the workload is not timed.
+"""
+from __future__ import annotations
+from random import Random
+from . import Generators as gen
+
+def _alphabet(rng: Random):
+    """
+    Creates the ranked alphabet shared by the scenarios
+
+    Args:
+        rng: The seeded random number generator
+
+    Returns:
+        dict: A dict mapping each symbol to its rank
+    """
+    return gen.random_alphabet(rng, 6, 2)
+
+def _accepts(make, tree_type: str = "accepted"):
+    """
+    Creates a scenario that checks whether an automaton with 16 states accepts a tree whose size is the scenario's size
+
+    Args:
+        make: The generator of the automaton
+        tree_type: "accepted" for a tree accepted by the automaton, "random" for a random tree,
+            "deep" for a tree whose depth is the size or "wide" for a complete tree whose depth is the size
+
+    Returns:
+        function: The scenario
+    """
+    def setup(rng: Random, size: int):
+        alphabet = _alphabet(rng)
+        automaton = make(rng, alphabet, 16, rules_per_symbol=32)
+        if tree_type == "accepted":
+            tree = gen.accepted_tree(rng, automaton, size) or gen.random_tree(rng, alphabet, size)
+        elif tree_type == "deep":
+            tree = gen.deep_tree(rng, alphabet, size)
+        elif tree_type == "wide":
+            tree = gen.wide_tree(rng, alphabet, size)
+        else:
+            tree = gen.random_tree(rng, alphabet, size)
+        return lambda: automaton.accepts(tree)
+    return setup
+
+def _determinize(rng: Random, size: int):
+    """
+    Determinizes a bottom-up automaton whose number of states is the size
+    """
+    automaton = gen.random_nbta(rng, _alphabet(rng), size, rules_per_symbol=size)
+    return automaton.determinize
+
+def _minimize(rng: Random, size: int):
+    """
+    Minimizes a deterministic bottom-up automaton whose number of states is the size
+    """
+    automaton = gen.random_dbta(rng, _alphabet(rng), size, rules_per_symbol=2 * size)
+    return automaton.minimize
+
+def _product(make, operation: str):
+    """
+    Creates a scenario that builds the union or intersection of two machines whose number of states is the size
+
+    Args:
+        make: The generator of the machines
+        operation: "union" or "intersection"
+
+    Returns:
+        function: The scenario
+    """
+    def setup(rng: Random, size: int):
+        alphabet = _alphabet(rng)
+        first = make(rng, alphabet, size, rules_per_symbol=size)
+        second = make(rng, alphabet, size, rules_per_symbol=size)
+        return lambda: getattr(first, operation)(second)
+    return setup
+
+def _transduce(make, ambiguity: int, method: str = "transduce"):
+    """
+    Creates a scenario that transduces a tree in the domain of a transducer with 16 states, where the tree's size is the size
+
+    Args:
+        make: The generator of the transducer
+        ambiguity: The number of rules of each key of the transducer
+        method: The name of the transducer's method that is timed
+
+    Returns:
+        function: The scenario
+    """
+    def setup(rng: Random, size: int):
+        alphabet = _alphabet(rng)
+        transducer = make(rng, alphabet, 16, rules_per_symbol=32, ambiguity=ambiguity)
+        tree = gen.accepted_tree(rng, transducer.domain(), size) or gen.random_tree(rng, alphabet, size)
+        run = getattr(transducer, method)
+        return lambda: run(tree)
+    return setup
+
+def _epsilon_closure(make):
+    """
+    Creates a scenario that finds the epsilon closures of a machine whose number of states is the size, with two epsilon transitions per state
+
+    Args:
+        make: The generator of the machine
+
+    Returns:
+        function: The scenario
+    """
+    def setup(rng: Random, size: int):
+        machine = make(rng, _alphabet(rng), size, epsilon_rules=2 * size)
+        return machine.get_epsilon_closure
+    return setup
+
+def _epsilon_construction(make, top_down: bool = False):
+    """
+    Creates a scenario that builds a transducer whose number of states is the size and whose epsilon transitions connect every pair of states,
+    which times finding and composing its epsilon chains
+
+    Args:
+        make: The generator of the transducer's other rules
+        top_down: Whether the transducer is top-down
+
+    Returns:
+        function: The scenario
+    """
+    def setup(rng: Random, size: int):
+        machine = make(rng, _alphabet(rng), size)
+        transitions = dict(machine.transitions)
+        transitions.update(gen.dense_epsilon_rules(sorted(machine.states), top_down))
+        return lambda: type(machine)(machine.states, machine.final_states, machine.in_symbols, machine.out_symbols, transitions)
+    return setup
+
+#Each scenario is stored as a tuple containing its setup function and the sizes of its default sweep
+SCENARIOS = {
+    "nbta_accepts": (_accepts(gen.random_nbta), (100, 400, 1600)),
+    "nbta_accepts_random": (_accepts(gen.random_nbta, "random"), (100, 400, 1600)),
+    "nbta_accepts_deep": (_accepts(gen.random_nbta, "deep"), (100, 200, 400)),
+    "nbta_accepts_wide": (_accepts(gen.random_nbta, "wide"), (6, 8, 10)),
+    "dbta_accepts": (_accepts(gen.random_dbta), (100, 400, 1600)),
+    "ntta_accepts": (_accepts(gen.random_ntta), (100, 400, 1600)),
+    "dtta_accepts": (_accepts(gen.random_dtta), (100, 400, 1600)),
+    "nbta_determinize": (_determinize, (4, 6, 8)),
+    "dbta_minimize": (_minimize, (8, 12, 16)),
+    "nbta_union": (_product(gen.random_nbta, "union"), (4, 8, 16)),
+    "nbta_intersection": (_product(gen.random_nbta, "intersection"), (4, 8, 16)),
+    "nbtt_union": (_product(gen.random_nbtt, "union"), (4, 8, 16)),
+    "nbtt_intersection": (_product(gen.random_nbtt, "intersection"), (4, 8, 16)),
+    "nttt_intersection": (_product(gen.random_nttt, "intersection"), (4, 8, 16)),
+    "nbtt_transduce": (_transduce(gen.random_nbtt, 1), (50, 200, 800)),
+    "nttt_transduce": (_transduce(gen.random_nttt, 1), (50, 200, 800)),
+    "nbtt_count_outputs": (_transduce(gen.random_nbtt, 2, "count_outputs"), (50, 200, 800)),
+    "nttt_count_outputs": (_transduce(gen.random_nttt, 2, "count_outputs"), (50, 200, 800)),
+    "nbta_epsilon_closure": (_epsilon_closure(gen.random_nbta), (16, 64, 256)),
+    "ntta_epsilon_closure": (_epsilon_closure(gen.random_ntta), (16, 64, 256)),
+    "nbtt_epsilon_construction": (_epsilon_construction(gen.random_nbtt), (8, 16, 32)),
+    "nttt_epsilon_construction": (_epsilon_construction(gen.random_nttt, True), (8, 16, 32)),
+}
@@ -0,0 +1,4 @@
+import sys
+from .Runner import main
+
+sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Budget module
+"""
+from __future__ import annotations
+import time
+
+class BudgetExceeded(Exception):
+    """
+    Raised when an operation runs over its Budget or the budget is cancelled.
+    The budget's statistics at that point are kept so that callers can report how far the operation got.
+
+    Args:
+        resource:
+            The limit that was exceeded: "states", "outputs", "nodes", "deadline" or "cancelled"
+        stats:
+            The budget's statistics when it was exceeded, as returned by Budget.stats()
+    """
+    def __init__(self, resource: str, stats: dict):
+        super().__init__(f"Budget exceeded ({resource}): {stats}")
+        self.resource = resource
+        self.stats = stats
+
+class Budget:
+    """
+    Limits on the work done by expensive operations such as determinization, minimization, products and transduction.
+    The operations check the budget cooperatively in their inner loops and raise BudgetExceeded as soon as a limit is passed.
+    A budget is shared by every operation it is passed to, so one budget should be made for each request being served.
+    Another thread can stop the operations using a budget by calling cancel().
+
+    Args:
+        max_states:
+            The maximum number of states created by a construction, or None for no limit
+        max_outputs:
+            The maximum number of output trees built, or None for no limit
+        max_nodes:
+            The maximum number of input nodes, worklist items or state pairs visited, or None for no limit
+        timeout:
+            The number of seconds after the budget's creation at which operations are stopped, or None for no deadline
+    """
+    def __init__(self, max_states: int = None, max_outputs: int = None, max_nodes: int = None, timeout: float = None):
+        self.max_states = max_states
+        self.max_outputs = max_outputs
+        self.max_nodes = max_nodes
+        self.start = time.monotonic()
+        self.deadline = None if timeout is None else self.start + timeout
+        self.cancelled = False
+        self.states = 0
+        self.outputs = 0
+        self.nodes = 0
+
+    def cancel(self):
+        """
+        Stops the operations using the budget the next time they check it
+        """
+        self.cancelled = True
+
+    def check(self):
+        """
+        Checks the deadline and cancellation of the budget
+
+        Raises:
+            BudgetExceeded: The budget was cancelled or its deadline has passed
+        """
+        if self.cancelled:
+            raise BudgetExceeded("cancelled", self.stats())
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise BudgetExceeded("deadline", self.stats())
+
+    def visit(self, count: int = 1):
+        """
+        Records visited nodes and checks the budget
+
+        Args:
+            count: The number of nodes visited
+
+        Raises:
+            BudgetExceeded: The budget has too many visited nodes, was cancelled or its deadline has passed
+        """
+        self.nodes += count
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise BudgetExceeded("nodes", self.stats())
+        self.check()
+
+    def check_states(self, count: int):
+        """
+        Records the number of states created by a construction
+
+        Args:
+            count: The number of states created so far
+
+        Raises:
+            BudgetExceeded: The construction has created too many states
+        """
+        self.states = max(self.states, count)
+        if self.max_states is not None and count > self.max_states:
+            raise BudgetExceeded("states", self.stats())
+
+    def add_outputs(self, count: int):
+        """
+        Records built output trees
+
+        Args:
+            count: The number of output trees built
+
+        Raises:
+            BudgetExceeded: Too many output trees have been built
+        """
+        self.outputs += count
+        if self.max_outputs is not None and self.outputs > self.max_outputs:
+            raise BudgetExceeded("outputs", self.stats())
+
+    def stats(self) -> dict:
+        """
+        Returns the work recorded by the budget
+
+        Returns:
+            dict: A dict containing the largest number of states created by a construction, the number of output trees built,
+            the number of nodes visited and the number of seconds since the budget was created
+        """
+        return {"states": self.states, "outputs": self.outputs, "nodes": self.nodes, "seconds": time.monotonic() - self.start}
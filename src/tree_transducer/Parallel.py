@@ -0,0 +1,114 @@
+"""
+Parallel corpus processing module
+"""
+from __future__ import annotations
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import os
+from .Tree import Tree
+
+_worker_machine = None
+_worker_method = None
+
+def _init_worker(machine, method: str):
+    """
+    Stores the machine in a worker process so that it is only sent to each worker once
+
+    Args:
+        machine: The automaton or transducer used by the worker
+        method: The name of the machine's method to be called on each tree
+    """
+    global _worker_machine, _worker_method
+    _worker_machine = machine
+    _worker_method = method
+
+def _run_chunk(chunk: list) -> list:
+    """
+    Runs the worker's machine over a chunk of trees
+
+    Args:
+        chunk: A list containing Trees or their string forms
+
+    Returns:
+        list: The results of the machine's method for each tree in the chunk
+    """
+    run = getattr(_worker_machine, _worker_method)
+    return [run(Tree.from_string(tree) if isinstance(tree, str) else tree) for tree in chunk]
+
+def read_corpus(path: str) -> Iterator[str]:
+    """
+    Reads a corpus file containing one tree per line in the string form produced by str(), skipping blank lines.
+    The lines are parsed by the workers.
+
+    Args:
+        path: The path of the corpus file
+
+    Returns:
+        Iterator: An iterator over the non-blank lines of the file
+    """
+    with open(path) as corpus:
+        for line in corpus:
+            if line.strip():
+                yield line
+
+def run_parallel(machine, trees: Iterable | str, method: str = None, workers: int = None, chunk_size: int = 64, max_in_flight: int = None) -> Iterator:
+    """
+    Runs an automaton or transducer over a corpus in a pool of worker processes.
+    The machine is sent to each worker once when the worker starts, and the trees are sent in chunks.
+    Results are yielded in the order of the input while at most max_in_flight chunks are being processed.
+    The arguments are checked when the function is called, before any result is requested.
+
+    Args:
+        machine: The automaton or transducer to be run
+        trees: An Iterable containing Trees or their string forms, or the path of a corpus file
+        method: The name of the machine's method to be called on each tree, which defaults to accepts or transduce
+        workers: The number of worker processes, which defaults to the number of CPUs
+        chunk_size: The number of trees sent to a worker at once
+        max_in_flight: The maximum number of chunks submitted but not yet yielded, which defaults to twice the number of workers
+
+    Returns:
+        Iterator: An iterator over the results for each tree
+
+    Raises:
+        ValueError: chunk_size, workers or max_in_flight is not positive.
+    """
+    if method is None:
+        method = "accepts" if hasattr(machine, "accepts") else "transduce"
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if max_in_flight is None:
+        max_in_flight = 2 * workers
+    if chunk_size < 1 or workers < 1 or max_in_flight < 1:
+        raise ValueError("chunk_size, workers and max_in_flight must be positive.")
+    if isinstance(trees, str):
+        trees = read_corpus(trees)
+    #The pool's processes are only started when the first chunk is submitted
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(machine, method))
+    return _run_chunks(executor, iter(trees), chunk_size, max_in_flight)
+
+def _run_chunks(executor: ProcessPoolExecutor, trees: Iterator, chunk_size: int, max_in_flight: int) -> Iterator:
+    """
+    Submits the trees to a pool in chunks and yields their results in the order of the input, shutting the pool down when done
+
+    Args:
+        executor: The pool of worker processes
+        trees: An Iterator over Trees or their string forms
+        chunk_size: The number of trees sent to a worker at once
+        max_in_flight: The maximum number of chunks submitted but not yet yielded
+
+    Returns:
+        Iterator: An iterator over the results for each tree
+    """
+    with executor:
+        in_flight = deque()
+        while True:
+            while len(in_flight) < max_in_flight:
+                chunk = list(islice(trees, chunk_size))
+                if not chunk:
+                    break
+                in_flight.append(executor.submit(_run_chunk, chunk))
+            if not in_flight:
+                break
+            yield from in_flight.popleft().result()
@@ -0,0 +1,134 @@
+"""
+Profiler module
+"""
+from __future__ import annotations
+from collections import Counter, defaultdict
+from collections.abc import Callable
+from contextlib import contextmanager
+import time
+
+class Profiler:
+    """
+    Collects statistics of the runs and constructions of the automata and transducers it is attached to.
+    A machine is profiled by setting its profiler attribute to a Profiler, and machines whose profiler is None skip all of the bookkeeping.
+    The counters, peaks and timers are named by what they measure:
+        lookups: The number of transition lookups
+        combinations: The number of combinations of child states or child outputs that were combined by a rule
+        epsilon_expansions: The number of states or outputs reached through epsilon transitions
+        states / outputs (peaks): The largest set of states or outputs of a single node
+        phase timers: The seconds spent in each phase of a construction, such as "determinize.subsets"
+    Rules are identified by (key, value) tuples of their transition key and one element of its transitions.
+
+    Args:
+        callback:
+            A function that is called with the snapshot of the statistics each time they are flushed
+    """
+    def __init__(self, callback: Callable = None):
+        self.callback = callback
+        self.reset()
+
+    def reset(self):
+        """
+        Clears the collected statistics
+        """
+        self.counters = Counter()
+        self.rule_hits = Counter()
+        self.peaks = dict()
+        self.timers = defaultdict(float)
+
+    def count(self, name: str, amount: int = 1):
+        """
+        Adds to a counter
+
+        Args:
+            name: The name of the counter
+            amount: The amount added to the counter
+        """
+        self.counters[name] += amount
+
+    def hit(self, rule: tuple):
+        """
+        Records that a rule was applied at a node
+
+        Args:
+            rule: A tuple containing the key of the rule and the rule
+        """
+        self.rule_hits[rule] += 1
+
+    def peak(self, name: str, size: int):
+        """
+        Raises a peak to the given size if it is larger
+
+        Args:
+            name: The name of the peak
+            size: The size that was observed
+        """
+        if size > self.peaks.get(name, 0):
+            self.peaks[name] = size
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Times the code run inside the context and adds it to a phase timer
+
+        Args:
+            name: The name of the phase
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[name] += time.perf_counter() - start
+
+    def snapshot(self) -> dict:
+        """
+        Exports the counters, peaks and timers as flat metrics.
+        Rule hits are left out since there is one per rule, and are found with hot_rules() and dead_rules() instead.
+
+        Returns:
+            dict: A dict mapping the names of counters, "peak_" followed by the names of peaks
+            and "seconds_" followed by the names of phases to their values
+        """
+        metrics = dict(self.counters)
+        metrics.update((f"peak_{name}", size) for (name, size) in self.peaks.items())
+        metrics.update((f"seconds_{name}", seconds) for (name, seconds) in self.timers.items())
+        return metrics
+
+    def flush(self) -> dict:
+        """
+        Passes the snapshot of the statistics to the callback, if there is one, and clears them
+
+        Returns:
+            dict: The snapshot
+        """
+        metrics = self.snapshot()
+        if self.callback is not None:
+            self.callback(metrics)
+        self.reset()
+        return metrics
+
+    def hot_rules(self, n: int = 10) -> list:
+        """
+        Finds the most applied rules
+
+        Args:
+            n: The number of rules to return
+
+        Returns:
+            list: A list of tuples each containing a rule and its number of hits, from the most hit
+        """
+        return self.rule_hits.most_common(n)
+
+    def dead_rules(self, machine) -> list:
+        """
+        Finds the rules of a machine that were never applied while it was profiled.
+        The epsilon rules of top-down automata are folded into epsilon closures and are never hit, so they are left out for machines
+        whose epsilon_rule_hits is False. The epsilon rules of every other machine are reported like its other rules.
+
+        Args:
+            machine: The automaton or transducer that was profiled
+
+        Returns:
+            list: A list of tuples each containing the key of a rule and the rule
+        """
+        return [(k, rule) for (k, v) in machine.transitions.items() if k[1] or machine.epsilon_rule_hits for rule in v if (k, rule) not in self.rule_hits]
@@ -0,0 +1,56 @@
+"""
+Semiring module
+"""
+from __future__ import annotations
+from collections.abc import Callable
+import operator
+
+class Semiring:
+    """
+    Semiring of rule weights for weighted transducers.
+    The weight of a derivation is the product of the weights of its rules, and of two weights the better one is the one with the smaller key,
+    so the sum of the semiring is taking the better weight.
+    The functions should be picklable (not lambdas) so that weighted transducers can be sent to worker processes.
+
+    Args:
+        name:
+            The name of the semiring
+        times:
+            A function that multiplies two weights
+        one:
+            The weight of a derivation without rules
+        zero:
+            The weight of no derivation, which is worse than every other weight
+        key:
+            A function mapping a weight to a value that is smaller for better weights
+    """
+    def __init__(self, name: str, times: Callable, one, zero, key: Callable):
+        self.name = name
+        self.times = times
+        self.one = one
+        self.zero = zero
+        self.key = key
+
+    def plus(self, a, b):
+        """
+        Returns the better of two weights
+
+        Args:
+            a: The first weight
+            b: The second weight
+
+        Returns:
+            The weight with the smaller key, or a if the keys are equal
+        """
+        return a if self.key(a) <= self.key(b) else b
+
+    def __str__(self) -> str:
+        return f"Semiring({self.name})"
+
+    def __repr__(self) -> str:
+        return f"Semiring({self.name})"
+
+#Weights are costs such as negative log probabilities and the cheapest derivation is the best
+TROPICAL = Semiring("tropical", operator.add, 0, float("inf"), operator.pos)
+#Weights are probabilities and the most probable derivation is the best
+VITERBI = Semiring("viterbi", operator.mul, 1, 0, operator.neg)
@@ -0,0 +1,388 @@
+"""
+Shared-memory compiled transition table module
+"""
+from __future__ import annotations
+from array import array
+from multiprocessing import shared_memory
+import pickle
+from .TreeAutomaton.NBTA import NBTA
+from .TreeAutomaton.NTTA import NTTA
+
+_HEADER_SIZE = 16
+
+class SharedTable:
+    """
+    Compiled transition table of an automaton stored in a block of shared memory.
+    States and symbols are numbered, and the transitions are stored as an open-addressing hash table of integer keys and values,
+    so any number of processes can run the machine from one copy of the table without deserializing it.
+
+    The process that creates the table owns it and must unlink() it when it is no longer needed.
+    Pickling a table only sends its name, so passing it to worker processes attaches them to the same block of memory.
+
+    The block starts with the length of the pickled metadata and the number of integers in the table, followed by the
+    metadata and the table. The first integer of the table is its capacity, followed by one slot per bucket holding the
+    offset of an entry or -1, followed by the entries, each stored as the length of its key, the key, the length of its value and the value.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        """
+        Wraps a block of shared memory containing a compiled table.
+        Tables should be made with create() or attach().
+
+        Args:
+            shm: The block of shared memory
+            owner: Whether this process created the block
+        """
+        self._shm = shm
+        self.name = shm.name
+        self.owner = owner
+        header = shm.buf[:_HEADER_SIZE].cast("q")
+        meta_len, table_len = header[0], header[1]
+        header.release()
+        self.meta = pickle.loads(shm.buf[_HEADER_SIZE:_HEADER_SIZE + meta_len])
+        start = _HEADER_SIZE + _pad(meta_len)
+        self._table = shm.buf[start:start + 8 * table_len].cast("q")
+        self._capacity = self._table[0]
+        self._symbol_ids = {s: i for i, s in enumerate(self.meta["symbols"])}
+
+    @staticmethod
+    def create(machine) -> SharedTable:
+        """
+        Compiles an automaton into a new block of shared memory owned by this process
+
+        Args:
+            machine: An NBTA or NTTA (or one of their deterministic subclasses)
+
+        Returns:
+            SharedTable: The compiled table
+
+        Raises:
+            TypeError: The machine is not a supported automaton.
+        """
+        meta, entries = _compile(machine)
+        capacity = 1
+        while capacity < 2 * len(entries):
+            capacity *= 2
+        table = array("q", [capacity] + [-1] * capacity)
+        for key, val in entries.items():
+            i = hash(key) & (capacity - 1)
+            while table[1 + i] != -1:
+                i = (i + 1) & (capacity - 1)
+            table[1 + i] = len(table)
+            table.append(len(key))
+            table.extend(key)
+            table.append(len(val))
+            table.extend(val)
+
+        meta_bytes = pickle.dumps(meta)
+        shm = shared_memory.SharedMemory(create=True, size=_HEADER_SIZE + _pad(len(meta_bytes)) + 8 * len(table))
+        shm.buf[:_HEADER_SIZE] = array("q", [len(meta_bytes), len(table)]).tobytes()
+        shm.buf[_HEADER_SIZE:_HEADER_SIZE + len(meta_bytes)] = meta_bytes
+        start = _HEADER_SIZE + _pad(len(meta_bytes))
+        shm.buf[start:start + 8 * len(table)] = table.tobytes()
+        return _TABLE_CLASSES[meta["kind"]](shm, True)
+
+    @staticmethod
+    def attach(name: str) -> SharedTable:
+        """
+        Attaches to a table created by another process.
+        The attaching process should be a child of the owner, such as a pool worker, so that they share a resource tracker
+        and the block is not freed when the attaching process exits.
+
+        Args:
+            name: The name of the table's block of shared memory
+
+        Returns:
+            SharedTable: The table, which is not owned by this process
+        """
+        shm = shared_memory.SharedMemory(name=name)
+        header = shm.buf[:_HEADER_SIZE].cast("q")
+        meta_len = header[0]
+        header.release()
+        kind = pickle.loads(shm.buf[_HEADER_SIZE:_HEADER_SIZE + meta_len])["kind"]
+        return _TABLE_CLASSES[kind](shm, False)
+
+    def close(self):
+        """
+        Detaches this process from the table. The table can no longer be used by this object.
+        """
+        if self._shm is not None:
+            self._table.release()
+            self._shm.close()
+            self._shm = None
+
+    def unlink(self):
+        """
+        Detaches this process from the table and frees the block of shared memory.
+        Processes still attached to the table can keep using it until they close it.
+
+        Raises:
+            PermissionError: This process does not own the table.
+        """
+        if not self.owner:
+            raise PermissionError("Only the process that created a shared table can unlink it.")
+        shm = self._shm
+        self.close()
+        if shm is not None:
+            shm.unlink()
+
+    def __enter__(self) -> SharedTable:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.owner:
+            self.unlink()
+        else:
+            self.close()
+
+    def __reduce__(self):
+        return (SharedTable.attach, (self.name,))
+
+    def _lookup(self, key: tuple):
+        """
+        Finds the value of a key in the table
+
+        Args:
+            key: A tuple of integers
+
+        Returns:
+            memoryview: The integers of the value, or None if the key is not in the table
+        """
+        table = self._table
+        mask = self._capacity - 1
+        i = hash(key) & mask
+        key_len = len(key)
+        while True:
+            offset = table[1 + i]
+            if offset == -1:
+                return None
+            if table[offset] == key_len and tuple(table[offset + 1:offset + 1 + key_len]) == key:
+                val_start = offset + 2 + key_len
+                return table[val_start:val_start + table[val_start - 1]]
+            i = (i + 1) & mask
+
+    def _symbol_id(self, symbol) -> int:
+        """
+        Finds the id of an input symbol
+
+        Args:
+            symbol: The symbol
+
+        Returns:
+            int: The id of the symbol, or -2 if the table does not contain the symbol
+        """
+        return self._symbol_ids.get(symbol, -2)
+
+    def __str__(self) -> str:
+        return f"{type(self).__name__}(Name: {self.name}\n \
+                Kind: {self.meta['kind']}\n \
+                Owner: {self.owner})"
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(Name: {self.name}\n \
+                Kind: {self.meta['kind']}\n \
+                Owner: {self.owner})"
+
+class SharedAutomaton(SharedTable):
+    """
+    Shared-memory compiled table of a bottom-up or top-down tree automaton.
+    The table is run by the automaton class's own methods, which read its rules and epsilon closures through views of the table
+    instead of dicts, so states are represented by their ids.
+    """
+    #Rule hits would be recorded by state id, so runs of shared tables are not profiled
+    profiler = None
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        """
+        Wraps a block of shared memory containing a compiled automaton.
+        Tables should be made with create() or attach().
+
+        Args:
+            shm: The block of shared memory
+            owner: Whether this process created the block
+        """
+        super().__init__(shm, owner)
+        self.final_states = set(self.meta["final_states"])
+        self.epsilon_closure = _ClosureView(self)
+
+class SharedNBTA(SharedAutomaton):
+    """
+    Shared-memory compiled table of a bottom-up tree automaton, run by the methods of NBTA
+    """
+    accepts = NBTA.accepts
+    accepts_many = NBTA.accepts_many
+    _is_accepting = NBTA._is_accepting
+    _accept_helper = NBTA._accept_helper
+    _get_next_states = NBTA._get_next_states
+    _set_batch_stats = NBTA._set_batch_stats
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        """
+        Wraps a block of shared memory containing a compiled bottom-up automaton.
+        Tables should be made with create() or attach().
+
+        Args:
+            shm: The block of shared memory
+            owner: Whether this process created the block
+        """
+        super().__init__(shm, owner)
+        self.transitions = _BottomUpRuleView(self)
+
+class SharedNTTA(SharedAutomaton):
+    """
+    Shared-memory compiled table of a top-down tree automaton, run by the methods of NTTA
+    """
+    accepts = NTTA.accepts
+    accepts_many = NTTA.accepts_many
+    _accept_helper = NTTA._accept_helper
+    _accept_many_helper = NTTA._accept_many_helper
+    _set_batch_stats = NTTA._set_batch_stats
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        """
+        Wraps a block of shared memory containing a compiled top-down automaton.
+        Tables should be made with create() or attach().
+
+        Args:
+            shm: The block of shared memory
+            owner: Whether this process created the block
+        """
+        super().__init__(shm, owner)
+        self.live_transitions = _TopDownRuleView(self)
+
+class _ClosureView:
+    """
+    Read-only view of the epsilon closures of a shared automaton, indexed by state id like the automaton's epsilon_closure dict
+    """
+
+    def __init__(self, table: SharedTable):
+        self._table = table
+
+    def __getitem__(self, state: int) -> set:
+        """
+        Finds the epsilon closure of a state
+
+        Args:
+            state: The state id
+
+        Returns:
+            set: The set of ids of the states in the closure
+        """
+        return set(self._table._lookup((-1, state)))
+
+class _BottomUpRuleView:
+    """
+    Read-only view of the rules of a shared bottom-up automaton with the interface of NBTA.transitions,
+    mapping (tuple of child state ids, symbol) keys to sets of state ids
+    """
+
+    def __init__(self, table: SharedTable):
+        self._table = table
+
+    def get(self, key: tuple, default=None):
+        """
+        Finds the states of the rule with the given child states and symbol
+
+        Args:
+            key: A tuple containing the tuple of child state ids and the symbol
+            default: The value returned if the table has no such rule
+
+        Returns:
+            set: The set of state ids of the rule, or default if the table has no such rule
+        """
+        children, symbol = key
+        val = self._table._lookup((self._table._symbol_id(symbol),) + children)
+        return default if val is None else set(val)
+
+class _TopDownRuleView:
+    """
+    Read-only view of the live rules of a shared top-down automaton with the interface of NTTA.live_transitions,
+    mapping (state id, symbol, arity) keys to lists of (tuple of child state ids, order of the children) tuples
+    """
+
+    def __init__(self, table: SharedTable):
+        self._table = table
+
+    def get(self, key: tuple, default=None):
+        """
+        Finds the live rules of a (state id, symbol, arity) key
+
+        Args:
+            key: A tuple containing the state id, the symbol and the arity
+            default: The value returned if the table has no such rules
+
+        Returns:
+            list: The list of (tuple of child state ids, order of the children) tuples of the rules, or default if the table has no such rules
+        """
+        state, symbol, arity = key
+        val = self._table._lookup((state, self._table._symbol_id(symbol), arity))
+        if val is None:
+            return default
+        rules = []
+        for i in range(val[0]):
+            pos = 1 + 2 * i * arity
+            rules.append((tuple(val[pos:pos + arity]), tuple(val[pos + arity:pos + 2 * arity])))
+        return rules
+
+_TABLE_CLASSES = {"NBTA": SharedNBTA, "NTTA": SharedNTTA}
+
+def _pad(length: int) -> int:
+    """
+    Rounds a number of bytes up to a multiple of 8
+
+    Args:
+        length: The number of bytes
+
+    Returns:
+        int: The smallest multiple of 8 that is at least length
+    """
+    return (length + 7) // 8 * 8
+
+def _compile(machine) -> tuple:
+    """
+    Numbers the states and symbols of an automaton and encodes its rules and epsilon closures as integer keys and values.
+    Symbol id 0 is reserved for epsilon transitions, and the epsilon closure of each state is stored under the key (-1, state id).
+    Top-down automata store their live transitions, each rule being its child states followed by the order in which they are checked.
+
+    Args:
+        machine: An NBTA or NTTA (or one of their deterministic subclasses)
+
+    Returns:
+        tuple: A tuple containing the metadata dict and a dict mapping tuples of integers to lists of integers
+
+    Raises:
+        TypeError: The machine is not a supported automaton.
+    """
+    if not isinstance(machine, (NBTA, NTTA)):
+        raise TypeError(f"Cannot compile {type(machine).__name__} into a shared table.")
+    states = list(machine.states)
+    state_ids = {s: i for i, s in enumerate(states)}
+    symbols = [""]
+    symbol_ids = {"": 0}
+    entries = dict()
+
+    def symbol_id(symbol) -> int:
+        if symbol not in symbol_ids:
+            symbol_ids[symbol] = len(symbols)
+            symbols.append(symbol)
+        return symbol_ids[symbol]
+
+    if isinstance(machine, NBTA):
+        kind = "NBTA"
+        for (children, symbol), dest_states in machine.transitions.items():
+            key = (symbol_id(symbol),) + tuple(state_ids[c] for c in children)
+            entries[key] = [state_ids[s] for s in dest_states]
+    else:
+        kind = "NTTA"
+        for (state, symbol, arity), rules in machine.live_transitions.items():
+            val = [len(rules)]
+            for (children, order) in rules:
+                val.extend(state_ids[c] for c in children)
+                val.extend(order)
+            entries[(state_ids[state], symbol_id(symbol), arity)] = val
+    for s, closure in machine.epsilon_closure.items():
+        entries[(-1, state_ids[s])] = [state_ids[c] for c in closure]
+    final_states = [state_ids[s] for s in machine.final_states]
+
+    meta = {"kind": kind, "states": states, "symbols": symbols, "final_states": final_states}
+    return (meta, entries)
@@ -2,6 +2,7 @@
 Tree module
 """
 from __future__ import annotations
+from collections.abc import Iterable, Iterator
 
 class Tree:
     """
@@ -75,6 +76,116 @@ class Tree:
         values = {self.value}.union(*[c.get_values() for c in self.children])
         return values
 
+    @staticmethod
+    def from_string(string: str) -> Tree:
+        """
+        Creates a tree from the string form produced by str(), such as a(b(),c()).
+        Values are read as strings.
+
+        Args:
+            string: The string form of the tree
+
+        Returns:
+            Tree: The tree represented by the string
+
+        Raises:
+            ValueError: The string is not a well-formed tree.
+        """
+        string = string.strip()
+        stack = []
+        tree = None
+        start = 0
+        closed = False
+        for i, char in enumerate(string):
+            if char == "(":
+                if closed:
+                    raise ValueError(f"Missing comma in tree string: {string}")
+                stack.append((string[start:i].strip(), []))
+                start = i + 1
+                closed = False
+            elif char == ")":
+                if not stack or string[start:i].strip() or (stack[-1][1] and not closed):
+                    raise ValueError(f"Malformed tree string: {string}")
+                value, children = stack.pop()
+                tree = Tree(value, children)
+                if stack:
+                    stack[-1][1].append(tree)
+                elif string[i+1:].strip():
+                    raise ValueError(f"Trailing characters in tree string: {string}")
+                start = i + 1
+                closed = True
+            elif char == ",":
+                if not stack or not closed or string[start:i].strip():
+                    raise ValueError(f"Malformed tree string: {string}")
+                start = i + 1
+                closed = False
+        if stack or tree is None:
+            raise ValueError(f"Malformed tree string: {string}")
+        return tree
+
+    def to_events(self) -> Iterator[tuple]:
+        """
+        Returns the tree as a stream of events in pre-order.
+        Each node is an ("open", value, number of children) event followed by the events of its children and a ("close",) event.
+
+        Returns:
+            Iterator: An iterator over the events of the tree
+        """
+        stack = [(self, 0)]
+        while stack:
+            tree, i = stack.pop()
+            if i == 0:
+                yield ("open", tree.value, len(tree.children))
+            if i < len(tree.children):
+                stack.append((tree, i + 1))
+                stack.append((tree.children[i], 0))
+            else:
+                yield ("close",)
+
+    @staticmethod
+    def from_events(events: Iterable) -> Tree:
+        """
+        Creates a tree from a stream of events as produced by to_events()
+
+        Args:
+            events: An Iterable containing the events of the tree
+
+        Returns:
+            Tree: The tree represented by the events
+
+        Raises:
+            ValueError: The events are not a well-formed tree.
+        """
+        stack = []
+        tree = None
+        for event in events:
+            if tree is not None:
+                raise ValueError("Events continue after the end of the tree.")
+            if event[0] == "open":
+                stack.append((event[1], event[2], []))
+            elif event[0] == "close" and stack:
+                value, arity, children = stack.pop()
+                if len(children) != arity:
+                    raise ValueError(f"Node {value} has {len(children)} children but was opened with {arity}.")
+                if stack:
+                    stack[-1][2].append(Tree(value, children))
+                else:
+                    tree = Tree(value, children)
+            else:
+                raise ValueError(f"Malformed event: {event}")
+        if tree is None:
+            raise ValueError("Events end before the end of the tree.")
+        return tree
+
+    def get_vars(self) -> list:
+        """
+        Returns the indices of the VarLeaf subtrees in the tree in pre-order, including repeated indices
+
+        Returns:
+            list: the list of VarLeaf indices in the tree
+        """
+        return [i for c in self.children for i in c.get_vars()]
+
     def __str__(self) -> str:
         return f"{self.value}({','.join(str(c) for c in self.children)})"
 
@@ -90,7 +201,16 @@ class Tree:
         return False
 
     def __hash__(self) -> int:
-        return hash(self.__str__())
+        return hash((self.value, tuple(hash(c) for c in self.children)))
+
+    def materialize(self) -> Tree:
+        """
+        Returns the tree as a plain Tree. A Tree is already plain, so it is returned unchanged.
+
+        Returns:
+            Tree: the tree
+        """
+        return self
 
 class VarLeaf(Tree):
     def __init__(self, idx):
@@ -120,6 +240,15 @@ class VarLeaf(Tree):
         """
         return set()
 
+    def get_vars(self) -> list:
+        """
+        Returns the index of the VarLeaf in a list
+
+        Returns:
+            list: the list containing the index of the VarLeaf
+        """
+        return [self.idx]
+
     def __eq__(self, other: object) -> bool:
         if isinstance(other, VarLeaf):
             return self.idx == other.idx
@@ -132,4 +261,246 @@ class VarLeaf(Tree):
         return f"Var({self.idx})"
 
     def __hash__(self) -> int:
-        return hash(self.__str__())
\ No newline at end of file
+        return hash(self.__str__())
+
+class DagTree(Tree):
+    """
+    Tree whose subtrees may be shared by several parents, as in the outputs of transducer rules that copy a variable.
+    The hash of each node is cached and equality checks compare each pair of shared nodes once,
+    so neither expands the shared subtrees. DagTrees are equal to plain Trees with the same structure and have the same hash.
+    Its string form writes a subtree with several parents once, labelled #n=, and refers to it as #n afterwards.
+
+    Args:
+        value:
+            The value of the data stored in the tree
+        children:
+            A list of the tree's children
+
+    Raises:
+        ValueError: value has None type and children is not empty
+    """
+    def __init__(self, value, children: list = []):
+        super().__init__(value, children)
+        self._hash = None
+
+    def materialize(self) -> Tree:
+        """
+        Returns the tree as a plain Tree.
+        Every node is copied once, so shared subtrees are still shared by the plain Tree's nodes.
+
+        Returns:
+            Tree: the plain Tree
+        """
+        copies = dict()
+        return self._materialize_helper(self, copies)
+
+    def _materialize_helper(self, tree: Tree, copies: dict) -> Tree:
+        """
+        Recursive helper for materialize()
+
+        Args:
+            tree: The subtree to be copied
+            copies: A dict mapping the ids of copied subtrees to their copies
+
+        Returns:
+            Tree: the plain copy of the subtree
+        """
+        if not isinstance(tree, DagTree):
+            return tree
+        if id(tree) not in copies:
+            copies[id(tree)] = Tree(tree.value, [self._materialize_helper(c, copies) for c in tree.children])
+        return copies[id(tree)]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Tree):
+            return False
+        if self is other:
+            return True
+        if hash(self) != hash(other):
+            return False
+        equal = set()
+        return self._eq_helper(self, other, equal)
+
+    def _eq_helper(self, tree: Tree, other: Tree, equal: set) -> bool:
+        """
+        Recursive helper for __eq__()
+
+        Args:
+            tree: A subtree of this tree
+            other: A subtree of the other tree
+            equal: A set containing the pairs of ids of subtrees that are already known to be equal
+
+        Returns:
+            bool: True if the subtrees are equal and False otherwise.
+        """
+        if tree is other or (id(tree), id(other)) in equal:
+            return True
+        if isinstance(tree, VarLeaf) or isinstance(other, VarLeaf):
+            return tree == other
+        if tree.value != other.value or len(tree.children) != len(other.children):
+            return False
+        if not all(self._eq_helper(tree.children[i], other.children[i], equal) for i in range(len(tree.children))):
+            return False
+        equal.add((id(tree), id(other)))
+        return True
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash((self.value, tuple(hash(c) for c in self.children)))
+        return self._hash
+
+    def __str__(self) -> str:
+        parents = dict()
+        self._count_parents(self, parents)
+        labels = dict()
+        return self._str_helper(self, parents, labels)
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+    def _count_parents(self, tree: Tree, parents: dict):
+        """
+        Counts the parents of each node reachable from a node, visiting each node once
+
+        Args:
+            tree: The node
+            parents: A dict mapping node ids to their number of parents, which is filled by this method
+        """
+        for c in tree.children:
+            parents[id(c)] = parents.get(id(c), 0) + 1
+            if parents[id(c)] == 1:
+                self._count_parents(c, parents)
+
+    def _str_helper(self, tree: Tree, parents: dict, labels: dict) -> str:
+        """
+        Recursive helper for __str__()
+
+        Args:
+            tree: The node
+            parents: A dict mapping node ids to their number of parents
+            labels: A dict mapping the ids of shared nodes that have been written to their labels
+
+        Returns:
+            str: the string form of the node
+        """
+        if id(tree) in labels:
+            return f"#{labels[id(tree)]}"
+        if isinstance(tree, VarLeaf):
+            return str(tree)
+        prefix = ""
+        if parents.get(id(tree), 0) > 1:
+            labels[id(tree)] = len(labels) + 1
+            prefix = f"#{labels[id(tree)]}="
+        return f"{prefix}{tree.value}({','.join(self._str_helper(c, parents, labels) for c in tree.children)})"
+
+class Template:
+    """
+    Compiled form of an output template.
+    Subtrees without variables are kept as constants that are shared by every output instead of being copied,
+    and the positions of the variables are resolved when the template is compiled, so filling the template only
+    creates the nodes on the paths from the root to its variables.
+
+    Args:
+        tree:
+            The template Tree, which may contain VarLeaf subtrees
+        dag:
+            Whether the filled nodes are DagTrees instead of plain Trees
+    """
+    def __init__(self, tree: Tree, dag: bool = False):
+        self.tree = tree
+        self.node_type = DagTree if dag else Tree
+        self.vars = tree.get_vars()
+        self.code = self._compile(tree)
+
+    def _compile(self, tree: Tree):
+        """
+        Compiles a subtree of the template.
+        A variable becomes its index, a subtree without variables becomes the subtree itself,
+        and any other subtree becomes a tuple containing its value and the compiled forms of its children.
+
+        Args:
+            tree: The subtree
+
+        Returns:
+            The compiled subtree
+        """
+        if isinstance(tree, VarLeaf):
+            return tree.idx
+        if not tree.get_vars():
+            return tree
+        return (tree.value, tuple(self._compile(c) for c in tree.children))
+
+    def fill(self, trees: tuple) -> Tree:
+        """
+        Returns the template filled by a tuple of trees
+
+        Args:
+            trees: A Tuple containing the trees to replace the variables with
+
+        Returns:
+            Tree: The filled Tree, which shares the constant subtrees of the template
+        """
+        return self._fill_helper(self.code, trees)
+
+    def _fill_helper(self, code, trees: tuple) -> Tree:
+        """
+        Recursive helper for fill()
+
+        Args:
+            code: A compiled subtree of the template
+            trees: A Tuple containing the trees to replace the variables with
+
+        Returns:
+            Tree: The filled subtree
+        """
+        if type(code) is int:
+            return trees[code]
+        if type(code) is tuple:
+            return self.node_type(code[0], [self._fill_helper(c, trees) for c in code[1]])
+        return code
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Template):
+            return self.tree == other.tree
+        return False
+
+    def __hash__(self) -> int:
+        return hash(self.tree)
+
+    def __str__(self) -> str:
+        return f"Template({self.tree})"
+
+    def __repr__(self) -> str:
+        return f"Template({self.tree})"
+
+class SubtreeIndex:
+    """
+    Numbers subtrees so that structurally equal subtrees share the same id.
+    Each id maps to a tuple containing the value of the subtree's root and the ids of its children.
+    """
+    def __init__(self):
+        self.ids = dict()
+        self.nodes = []
+        self.lookups = 0
+
+    def get_id(self, tree: Tree) -> int:
+        """
+        Returns the id of a subtree, numbering it and its subtrees if they have not been seen before
+
+        Args:
+            tree: The subtree
+
+        Returns:
+            int: The id of the subtree
+        """
+        self.lookups += 1
+        key = (tree.value, tuple(self.get_id(c) for c in tree.children))
+        tree_id = self.ids.get(key)
+        if tree_id is None:
+            tree_id = len(self.nodes)
+            self.ids[key] = tree_id
+            self.nodes.append(key)
+        return tree_id
+
+    def __len__(self) -> int:
+        return len(self.nodes)
@@ -5,6 +5,7 @@ from __future__ import annotations
 from collections.abc import Iterable
 from ..Tree import Tree
 from .NBTA import NBTA
+from ..Budget import Budget
 
 class DBTA(NBTA):
     def _validate_input(self):
@@ -21,70 +22,86 @@ class DBTA(NBTA):
             if not k[1]:
                 raise ValueError("Deterministic automaton contains epsilon transition")
 
-    def minimize(self) -> DBTA:
+    def minimize(self, budget: Budget = None) -> DBTA:
         """
         Minimizes this deterministic automaton.
         This automaton must be reduced first.
 
+        Args:
+            budget: The Budget charged for each pair of states compared, or None for no limits
+
         Returns:
             DBTA: An automaton equivalent to this automaton with the lowest number of possible states.
+
+        Raises:
+            BudgetExceeded: The minimization ran over its budget.
         """
         rule_pairs = dict()
         eq_rel = dict()
-        for q1 in sorted(self.states):
-            for q2 in sorted(self.states):
-                rule_pairs[(q1,q2)] = self._get_rule_pairs(q1,q2)
-                if (q1 in self.final_states and q2 not in self.final_states) or \
-                    (q1 not in self.final_states and q2 in self.final_states):
-                        eq_rel[(q1,q2)] = False
-                else:
-                    eq_rel[(q1,q2)] = True
+        with self._phase("minimize.rule_pairs"):
+            for q1 in sorted(self.states):
+                for q2 in sorted(self.states):
+                    if budget is not None:
+                        budget.visit()
+                    rule_pairs[(q1,q2)] = self._get_rule_pairs(q1,q2)
+                    if (q1 in self.final_states and q2 not in self.final_states) or \
+                        (q1 not in self.final_states and q2 in self.final_states):
+                            eq_rel[(q1,q2)] = False
+                    else:
+                        eq_rel[(q1,q2)] = True
 
-        while True:
-            change = False
-            for (q1, q2), eq in eq_rel.items():
-                if eq:
-                    equal = True
-                    for (r1,r2) in rule_pairs[(q1,q2)]:
-                        dest1 = next(iter(r1[1]))
-                        dest2 = next(iter(r2[1]))
-                        if not eq_rel[(dest1, dest2)]:
-                            equal = False
-                            break
-                    if not equal:
-                        eq_rel[(q1,q2)] = False
-                        eq_rel[(q2,q1)] = False
-                        change = True
-            if not change:
-                break        
+        with self._phase("minimize.refine"):
+            while True:
+                if self.profiler is not None:
+                    self.profiler.count("refine_rounds")
+                change = False
+                for (q1, q2), eq in eq_rel.items():
+                    if budget is not None:
+                        budget.visit()
+                    if eq:
+                        equal = True
+                        for (r1,r2) in rule_pairs[(q1,q2)]:
+                            dest1 = next(iter(r1[1]))
+                            dest2 = next(iter(r2[1]))
+                            if not eq_rel[(dest1, dest2)]:
+                                equal = False
+                                break
+                        if not equal:
+                            eq_rel[(q1,q2)] = False
+                            eq_rel[(q2,q1)] = False
+                            change = True
+                if not change:
+                    break        
         
         new_finals = set()
 
         eq_class = dict()
-        for q1 in sorted(self.states):
-            in_eq_class = False
-            for q2 in eq_class:
-                if eq_rel[(q1,q2)]:
-                    eq_class[q1] = eq_class[q2]
-                    in_eq_class = True
-                    if q1 in self.final_states:
-                        new_finals.add(q1)
-                    break
+        with self._phase("minimize.classes"):
+            for q1 in sorted(self.states):
+                in_eq_class = False
+                for q2 in eq_class:
+                    if eq_rel[(q1,q2)]:
+                        eq_class[q1] = eq_class[q2]
+                        in_eq_class = True
+                        if q1 in self.final_states:
+                            new_finals.add(eq_class[q1])
+                        break
 
-            if not in_eq_class:
-                new_eq_class = [q2 for q2 in sorted(self.states) if eq_rel[(q1,q2)]]
-                new_state = "_".join(new_eq_class)
-                eq_class[q1] = new_state
-                if q1 in self.final_states:
-                    new_finals.add(new_state)
+                if not in_eq_class:
+                    new_eq_class = [q2 for q2 in sorted(self.states) if eq_rel[(q1,q2)]]
+                    new_state = "_".join(new_eq_class)
+                    eq_class[q1] = new_state
+                    if q1 in self.final_states:
+                        new_finals.add(new_state)
 
-        new_transitions = {}
-        for (key,val) in self.transitions.items():
-            new_dest = eq_class[next(iter(val))]
-            new_src = tuple([eq_class[q] for q in key[0]])
-            new_transitions[(new_src, key[1])] = {new_dest}
+        with self._phase("minimize.build"):
+            new_transitions = {}
+            for (key,val) in self.transitions.items():
+                new_dest = eq_class[next(iter(val))]
+                new_src = tuple([eq_class[q] for q in key[0]])
+                new_transitions[(new_src, key[1])] = {new_dest}
 
-        return DBTA(list(eq_class.values()), new_finals, self.symbols, new_transitions)
+            return DBTA(list(eq_class.values()), new_finals, self.symbols, new_transitions)
 
     def _get_rule_pairs(self,q1,q2) -> list:
         """
@@ -2,7 +2,7 @@
 Deterministic Top-down Tree Automaton Module
 """
 from collections.abc import Iterable
-from ..Tree import Tree
+from ..Tree import Tree, SubtreeIndex
 from .NTTA import NTTA
 
 class DTTA(NTTA):
@@ -51,7 +51,55 @@ class DTTA(NTTA):
         """
         key = (state, tree.value, len(tree.children))
         val = self.transitions.get(key, None)
-        return val is not None and all(self._accept_helper(next(iter(val))[c],tree.children[c]) for c in range(len(tree.children)))
+        accepted = val is not None and all(self._accept_helper(next(iter(val))[c],tree.children[c]) for c in range(len(tree.children)))
+        if self.profiler is not None:
+            #A rule that accepts has productive children, so it is the key's only live rule
+            self._profile_accept([key], (state,), self.live_transitions[key][0] if accepted else None)
+        return accepted
+
+    def accepts_many(self, trees: Iterable) -> list:
+        """
+        Checks whether each tree in a batch is accepted by the automaton.
+        Whether a state accepts a distinct subtree is computed once per batch and the memo's hit rate is stored in batch_stats.
+
+        Args:
+            trees: An Iterable containing the candidate Trees.
+
+        Returns:
+            list: A list containing True for each accepted tree and False for each rejected tree, in the order of the input
+        """
+        index = SubtreeIndex()
+        memo = dict()
+        counts = [0, 0]
+        state = next(iter(self.final_states))
+        results = [self._accept_many_helper(state, index.get_id(tree), index, memo, counts) for tree in trees]
+        self._set_batch_stats(counts[0], counts[1])
+        return results
+
+    def _accept_many_helper(self, state, tree_id: int, index: SubtreeIndex, memo: dict, counts: list) -> bool:
+        """
+        Recursive helper for accepts_many()
+
+        Args:
+            state: The state of the subtree
+            tree_id: The id of the subtree in the index
+            index: The SubtreeIndex of the batch
+            memo: A dict mapping (state, subtree id) pairs to whether the state accepts the subtree
+            counts: A list containing the number of memo hits and misses
+
+        Returns:
+            bool: True if the state accepts the subtree and False otherwise
+        """
+        key = (state, tree_id)
+        if key in memo:
+            counts[0] += 1
+            return memo[key]
+        counts[1] += 1
+        value, child_ids = index.nodes[tree_id]
+        val = self.transitions.get((state, value, len(child_ids)), None)
+        accepted = val is not None and all(self._accept_many_helper(next(iter(val))[c], child_ids[c], index, memo, counts) for c in range(len(child_ids)))
+        memo[key] = accepted
+        return accepted
     
     def __eq__(self, other: object) -> bool:
         if isinstance(other, DTTA):
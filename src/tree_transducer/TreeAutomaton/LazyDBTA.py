@@ -0,0 +1,133 @@
+"""
+Lazily Determinized Bottom-up Tree Automaton Module
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+from ..Tree import Tree
+if TYPE_CHECKING:
+    #NBTA imports this module, so it is only imported for type checking
+    from .NBTA import NBTA
+
+class LazyDBTA:
+    """
+    Deterministic view of a non-deterministic bottom-up tree automaton that is built on the fly.
+    Each set of states reached while running the automaton is numbered as a subset state and the transitions from
+    (symbol, tuple of subset state ids) to subset state ids are cached as they are computed.
+    The cache holds at most cache_size transitions and evicts the least recently used one when it is full.
+    If a run evicts transitions and more than thrash_ratio of its lookups miss the cache, the next fallback_runs trees
+    are run with the non-deterministic automaton directly.
+    """
+
+    def __init__(self, automaton: NBTA, cache_size: int = 10000, thrash_ratio: float = 0.5, fallback_runs: int = 100):
+        """
+        Creates a lazily determinized automaton
+
+        Args:
+            automaton: The NBTA to be determinized
+            cache_size: The maximum number of cached transitions and subset states
+            thrash_ratio: The ratio of cache misses to lookups in a run above which the cache is considered to be thrashing
+            fallback_runs: The number of trees that are run without the cache after the cache thrashes
+
+        Raises:
+            ValueError: cache_size is not positive
+        """
+        if cache_size < 1:
+            raise ValueError("cache_size must be positive.")
+        self.automaton = automaton
+        self.cache_size = cache_size
+        self.thrash_ratio = thrash_ratio
+        self.fallback_runs = fallback_runs
+        self.accepting_states = {s for s in automaton.states if automaton.epsilon_closure[s] & automaton.final_states}
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "flushes": 0, "fallback_runs": 0}
+        self._fallback_remaining = 0
+        self.flush()
+
+    def flush(self):
+        """
+        Clears the cached transitions and subset states
+        """
+        self.subsets = []
+        self.subset_ids = dict()
+        self.accepting = []
+        self.transitions = OrderedDict()
+
+    def accepts(self, tree: Tree) -> bool:
+        """
+        Checks whether a tree is accepted by the automaton
+
+        Args:
+            tree: The candidate Tree.
+
+        Returns:
+            bool: True if the automaton accepts the tree and False otherwise.
+        """
+        if self._fallback_remaining:
+            self._fallback_remaining -= 1
+            self.stats["fallback_runs"] += 1
+            return self.automaton.accepts(tree)
+
+        hits, misses, evictions = self.stats["hits"], self.stats["misses"], self.stats["evictions"]
+        accepted = self.accepting[self._accept_helper(tree)]
+        run_misses = self.stats["misses"] - misses
+        run_lookups = self.stats["hits"] - hits + run_misses
+        if self.stats["evictions"] > evictions and run_misses > self.thrash_ratio * run_lookups:
+            self._fallback_remaining = self.fallback_runs
+        #Subset states are only discarded between runs so the ids held by a run stay valid
+        if len(self.subsets) > self.cache_size:
+            self.flush()
+            self.stats["flushes"] += 1
+        return accepted
+
+    def _accept_helper(self, tree: Tree) -> int:
+        """
+        Recursive helper for accept()
+
+        Args:
+            tree: The candidate Tree.
+
+        Returns:
+            int: The id of the subset state of the input Tree
+        """
+        child_ids = tuple(self._accept_helper(c) for c in tree.children)
+        key = (tree.value, child_ids)
+        subset_id = self.transitions.get(key)
+        if subset_id is not None:
+            self.stats["hits"] += 1
+            self.transitions.move_to_end(key)
+            return subset_id
+
+        self.stats["misses"] += 1
+        states = self.automaton._get_next_states(tree.value, tuple(self.subsets[c] for c in child_ids))
+        subset_id = self._get_subset_id(frozenset(states))
+        self.transitions[key] = subset_id
+        if len(self.transitions) > self.cache_size:
+            self.transitions.popitem(last=False)
+            self.stats["evictions"] += 1
+        return subset_id
+
+    def _get_subset_id(self, subset: frozenset) -> int:
+        """
+        Finds the id of a subset state, numbering it if it has not been reached before
+
+        Args:
+            subset: A frozenset of states of the non-deterministic automaton
+
+        Returns:
+            int: The id of the subset state
+        """
+        subset_id = self.subset_ids.get(subset)
+        if subset_id is None:
+            subset_id = len(self.subsets)
+            self.subset_ids[subset] = subset_id
+            self.subsets.append(subset)
+            self.accepting.append(bool(subset & self.accepting_states))
+        return subset_id
+
+    def __str__(self) -> str:
+        return f"LazyDBTA(Automaton: {self.automaton}\n \
+                Cache Size: {self.cache_size})"
+
+    def __repr__(self) -> str:
+        return f"LazyDBTA(Automaton: {self.automaton}\n \
+                Cache Size: {self.cache_size})"
@@ -0,0 +1,134 @@
+"""
+Multiple Bottom-up Tree Automaton Module
+"""
+from __future__ import annotations
+from collections.abc import Iterable
+from ..Tree import Tree
+from .NBTA import NBTA
+
+class MultiBTA:
+    """
+    Runs several bottom-up tree automata over a tree simultaneously.
+    The states of the automata are tracked together as tuples of state sets which are numbered and cached as they are reached,
+    so each tree is traversed once and each (symbol, child state tuple) combination is only computed once.
+    """
+
+    def __init__(self, automata: Iterable[NBTA]):
+        """
+        Creates a combined runner for bottom-up automata
+
+        Args:
+            automata: An Iterable containing the NBTAs (or DBTAs) to be run together
+        """
+        self.automata = list(automata)
+        self.rules = dict()
+        self.accepting_states = []
+        for i, automaton in enumerate(self.automata):
+            for (children, symbol), dest_states in automaton.transitions.items():
+                self.rules.setdefault((symbol, len(children)), dict()).setdefault(i, []).append((children, dest_states))
+            self.accepting_states.append({s for s in automaton.states if automaton.epsilon_closure[s] & automaton.final_states})
+        #Epsilon rules apply to any symbol with the same number of children
+        for (symbol, arity), rules in list(self.rules.items()):
+            if not symbol:
+                continue
+            for i, e_rules in self.rules.get(("", arity), dict()).items():
+                rules[i] = rules.get(i, []) + e_rules
+
+        self.combined_states = []
+        self.combined_ids = dict()
+        self.masks = []
+        self.transitions = dict()
+
+    def run(self, tree: Tree) -> int:
+        """
+        Runs every automaton over a tree
+
+        Args:
+            tree: The candidate Tree.
+
+        Returns:
+            int: A bitmask where bit i is set if the ith automaton accepts the tree
+        """
+        return self.masks[self._run_helper(tree)]
+
+    def accepted(self, tree: Tree) -> list:
+        """
+        Finds the automata that accept a tree
+
+        Args:
+            tree: The candidate Tree.
+
+        Returns:
+            list: The indices of the automata that accept the tree in ascending order
+        """
+        mask = self.run(tree)
+        return [i for i in range(len(self.automata)) if mask >> i & 1]
+
+    def _run_helper(self, tree: Tree) -> int:
+        """
+        Recursive helper for run()
+
+        Args:
+            tree: The candidate Tree.
+
+        Returns:
+            int: The id of the combined state of the tree
+        """
+        child_ids = tuple(self._run_helper(c) for c in tree.children)
+        key = (tree.value, child_ids)
+        combined_id = self.transitions.get(key)
+        if combined_id is None:
+            combined_id = self._get_combined_id(self._get_next_states(tree.value, child_ids))
+            self.transitions[key] = combined_id
+        return combined_id
+
+    def _get_next_states(self, symbol, child_ids: tuple) -> tuple:
+        """
+        Computes the combined state of a node from the combined states of its children.
+        Only the automata that have rules for the symbol and number of children are consulted.
+
+        Args:
+            symbol: The symbol of the node
+            child_ids: A tuple containing the combined state ids of the children
+
+        Returns:
+            tuple: A tuple containing a frozenset of states for each automaton
+        """
+        next_states = [frozenset()] * len(self.automata)
+        child_states = [self.combined_states[c] for c in child_ids]
+        arity = len(child_ids)
+        for i, rules in self.rules.get((symbol, arity), self.rules.get(("", arity), dict())).items():
+            states = set()
+            for (children, dest_states) in rules:
+                if all(children[c] in child_states[c][i] for c in range(len(children))):
+                    states.update(dest_states)
+            next_states[i] = frozenset(states)
+        return tuple(next_states)
+
+    def _get_combined_id(self, combined_state: tuple) -> int:
+        """
+        Finds the id of a combined state, numbering it if it has not been reached before
+
+        Args:
+            combined_state: A tuple containing a frozenset of states for each automaton
+
+        Returns:
+            int: The id of the combined state
+        """
+        combined_id = self.combined_ids.get(combined_state)
+        if combined_id is None:
+            combined_id = len(self.combined_states)
+            self.combined_ids[combined_state] = combined_id
+            self.combined_states.append(combined_state)
+            mask = 0
+            for i, states in enumerate(combined_state):
+                if states & self.accepting_states[i]:
+                    mask |= 1 << i
+            self.masks.append(mask)
+        return combined_id
+
+    def __str__(self) -> str:
+        return f"MultiBTA(Automata: {self.automata})"
+
+    def __repr__(self) -> str:
+        return f"MultiBTA(Automata: {self.automata})"
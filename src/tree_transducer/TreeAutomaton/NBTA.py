@@ -3,8 +3,10 @@ Non-deterministic Bottom-up Tree Automaton Module
 """
 from __future__ import annotations
 from collections.abc import Iterable
-from ..Tree import Tree
+from ..Tree import Tree, SubtreeIndex
 from .TreeAutomaton import TreeAutomaton
+from .LazyDBTA import LazyDBTA
+from ..Budget import Budget
 from itertools import product, chain, combinations
 from collections import defaultdict
 import copy
@@ -64,10 +66,43 @@ class NBTA(TreeAutomaton):
         Returns:
             bool: True if the automaton accepts the tree and False otherwise.
         """
-        final_state = self._accept_helper(tree)
-        for f in list(final_state):
-            final_state.update(self.epsilon_closure.get(f))
-        return final_state.intersection(self.final_states) != set()
+        return self._is_accepting(self._accept_helper(tree))
+
+    def accepts_many(self, trees: Iterable) -> list:
+        """
+        Checks whether each tree in a batch is accepted by the automaton.
+        The set of states of each distinct subtree is computed once per batch and the memo's hit rate is stored in batch_stats.
+
+        Args:
+            trees: An Iterable containing the candidate Trees.
+
+        Returns:
+            list: A list containing True for each accepted tree and False for each rejected tree, in the order of the input
+        """
+        index = SubtreeIndex()
+        subtree_states = []
+        results = []
+        for tree in trees:
+            tree_id = index.get_id(tree)
+            #Subtrees are numbered after their children so the new ids can be evaluated in order
+            for node_id in range(len(subtree_states), len(index)):
+                value, child_ids = index.nodes[node_id]
+                subtree_states.append(self._get_next_states(value, tuple(subtree_states[c] for c in child_ids)))
+            results.append(self._is_accepting(subtree_states[tree_id]))
+        self._set_batch_stats(index.lookups - len(index), len(index))
+        return results
+
+    def _is_accepting(self, states: set) -> bool:
+        """
+        Checks whether a set of states of the root of a tree leads to acceptance
+
+        Args:
+            states: The set of possible states of the root
+
+        Returns:
+            bool: True if the epsilon closure of the states contains a final state and False otherwise.
+        """
+        return any(self.epsilon_closure[s] & self.final_states for s in states)
 
     def _accept_helper(self, tree: Tree) -> set:
         """
@@ -80,14 +115,63 @@ class NBTA(TreeAutomaton):
             The set of possible states of the input Tree when processed by the automaton
         """
         child_states = tuple(self._accept_helper(c) for c in tree.children)
+        return self._get_next_states(tree.value, child_states)
+
+    def _get_next_states(self, symbol, child_states: tuple) -> set:
+        """
+        Finds the states reachable from a node with the given symbol whose children have the given sets of states
+
+        Args:
+            symbol: The symbol of the node
+            child_states: A tuple containing the set of possible states of each child
+
+        Returns:
+            set: The set of possible states of the node
+        """
         child_possibilities = set(product(*child_states))
-        states_read = [self.transitions.get((children, tree.value), set()) for children in child_possibilities] \
+        states_read = [self.transitions.get((children, symbol), set()) for children in child_possibilities] \
             + [self.transitions.get((children, ""), set()) for children in child_possibilities]
-        states = states_read
-        
-        if states:
-            return set.union(*states)
-        return set()
+        states = set.union(*states_read) if states_read else set()
+        if self.profiler is not None:
+            self._profile_next_states(symbol, child_possibilities, states)
+        return states
+
+    def _profile_next_states(self, symbol, child_possibilities: set, states: set):
+        """
+        Records the lookups, combinations and rule hits of one call to _get_next_states() with the automaton's profiler
+
+        Args:
+            symbol: The symbol of the node
+            child_possibilities: The set of tuples of child states that were looked up
+            states: The set of possible states of the node
+        """
+        profiler = self.profiler
+        profiler.count("lookups", 2 * len(child_possibilities))
+        profiler.count("combinations", len(child_possibilities))
+        for children in child_possibilities:
+            for key in ((children, symbol), (children, "")):
+                for state in self.transitions.get(key, ()):
+                    profiler.hit((key, state))
+                    if not key[1]:
+                        profiler.count("epsilon_expansions")
+        profiler.peak("states", len(states))
+
+    def get_coreachable_states(self) -> set:
+        """
+        Finds the states that can still lead to acceptance when the tree is extended above the node that has them
+
+        Returns:
+            set: The set of states whose epsilon closure contains a final state or that are read by a rule leading to such a state
+        """
+        coreachable = {s for s in self.states if self.epsilon_closure[s] & self.final_states}
+        update = True
+        while update:
+            update = False
+            for (k, v) in self.transitions.items():
+                if any(r in coreachable for r in v) and not coreachable.issuperset(k[0]):
+                    coreachable.update(k[0])
+                    update = True
+        return coreachable
 
     def get_epsilon_closure(self) -> dict:
         """
@@ -120,14 +204,21 @@ class NBTA(TreeAutomaton):
                 update = False
         return e_closure
 
-    def union(self, other: NBTA) -> NBTA:
+    def union(self, other: NBTA, budget: Budget = None) -> NBTA:
         """
         Returns the union of this bottom-up automaton and another bottom-up automaton.
         The states and transitions are the products of the input automata.
         An NBTA is always returned even if both input automata are deterministic.
 
+        Args:
+            other: The other automaton
+            budget: The Budget charged for each pair of combined transitions and for the product states, or None for no limits
+
         Returns:
             NBTA: the union of this bottom-up automaton and another bottom-up automaton
+
+        Raises:
+            BudgetExceeded: The construction ran over its budget.
         """
         new_symbols = set(chain.from_iterable([self.symbols, other.symbols]))
         new_transitions = dict()
@@ -139,6 +230,8 @@ class NBTA(TreeAutomaton):
         completed_transitions_self = copy.deepcopy(self.transitions)
         completed_transitions_other = copy.deepcopy(other.transitions)
         new_states = {f"{s1}_{s2}" for s1 in self.states for s2 in other.states}
+        if budget is not None:
+            budget.check_states(len(new_states))
         for k in self.transitions.keys():
             r = ranks.get(k[1], set()).copy()
             r.add(len(k[0]))
@@ -162,6 +255,8 @@ class NBTA(TreeAutomaton):
                 completed_transitions_other[(tuple(["%S%"] * r), symbol)] = {"%S%"}
         for k_s, v_s in completed_transitions_self.items():
             for k_o, v_o in completed_transitions_other.items():
+                if budget is not None:
+                    budget.visit()
                 if not k_s[1] == k_o[1]:
                     continue
                 if not len(k_s[0]) == len(k_o[0]):
@@ -179,14 +274,21 @@ class NBTA(TreeAutomaton):
                 new_transitions[(new_children, k_s[1])] = new_val
         return NBTA(new_states, new_final_states, new_symbols, new_transitions)
 
-    def intersection(self, other: NBTA) -> NBTA:
+    def intersection(self, other: NBTA, budget: Budget = None) -> NBTA:
         """
         Returns the intersection of this bottom-up automaton and another bottom-up automaton.
         The states and transitions are the products of the input automata.
         An NBTA is always returned even if both input automata are deterministic.
 
+        Args:
+            other: The other automaton
+            budget: The Budget charged for each pair of combined transitions and for the product states, or None for no limits
+
         Returns:
             NBTA: the intersection of this bottom-up automaton and another bottom-up automaton
+
+        Raises:
+            BudgetExceeded: The construction ran over its budget.
         """
         new_symbols = self.symbols.union(other.symbols)
         new_transitions = dict()
@@ -194,8 +296,12 @@ class NBTA(TreeAutomaton):
         completed_transitions_self = copy.deepcopy(self.transitions)
         completed_transitions_other = copy.deepcopy(other.transitions)
         new_states = {f"{s1}_{s2}" for s1 in self.states for s2 in other.states}
+        if budget is not None:
+            budget.check_states(len(new_states))
         for k_s, v_s in completed_transitions_self.items():
             for k_o, v_o in completed_transitions_other.items():
+                if budget is not None:
+                    budget.visit()
                 if not k_s[1] == k_o[1]:
                     continue
                 if not len(k_s[0]) == len(k_o[0]):
@@ -216,69 +322,102 @@ class NBTA(TreeAutomaton):
 
     This algorithm is largely derived from the determinization algorithm used in LETHAL (https://lethal.sourceforge.net/)
 
+    Args:
+        budget: The Budget charged for each (symbol, subset states) pair and for the subset states, or None for no limits
+
     Returns:
         NBTA: A deterministic automaton equivalent to this automaton
+
+    Raises:
+        BudgetExceeded: The construction ran over its budget.
     """
-    def determinize(self) -> NBTA:
+    def determinize(self, budget: Budget = None) -> NBTA:
         power_states = []
         power_finals = []
         new_transitions = dict()
 
-        arities = dict()
-        for key in self.transitions.keys():
-            arity = len(key[0])
-            symbol = key[1]
-            if arity in arities:
-                arities[arity].add(symbol)
-            else:
-                arities[arity] = {symbol}
+        with self._phase("determinize.arities"):
+            arities = dict()
+            for key in self.transitions.keys():
+                arity = len(key[0])
+                symbol = key[1]
+                if arity in arities:
+                    arities[arity].add(symbol)
+                else:
+                    arities[arity] = {symbol}
         if not 0 in arities:
             return NBTA([],[],[],{})
 
         pos_arities = list(arities.keys() - {0})
         stack = []
         
-        for constant in arities[0]:
-            dest_state, is_final = self._get_dest_states(constant, [])
-            
-            if dest_state not in power_states:
-                power_states.append(dest_state)
-                if is_final:
-                    power_finals.append(dest_state)
-                for ar in pos_arities:
-                    subset_list = list(map(lambda t: tuple(t), combinations(power_states+[dest_state], ar)))
-                    subset_list = list(filter(lambda s: dest_state in s, subset_list))
-                    for state in subset_list:
-                        for symbol in arities[ar]:
-                            stack.append((symbol, state))
-            key = (tuple(), constant)
-            val = {"_".join(sorted(list(dest_state)))}
-            new_transitions[key] = val
-
-        while stack:
-            symbol, state = stack.pop()
-            dest_state, is_final = self._get_dest_states(symbol, state)
-            if not dest_state:
-                continue
-            key = (tuple("_".join(sorted(list(s))) for s in state), symbol)
-            val = {"_".join(sorted(list(dest_state)))}
-            new_transitions[key] = val
-            if dest_state not in power_states:
-                power_states.append(dest_state)
-                if is_final:
-                    power_finals.append(dest_state)
-                for ar in pos_arities:
-                    subset_list = list(map(lambda t: tuple(t), combinations(power_states+[dest_state], ar)))
-                    subset_list = list(filter(lambda s: dest_state in s, subset_list))
-                    for state in subset_list:
-                        for symbol in arities[ar]:
-                            stack.append((symbol, state))
-        return NBTA(
-            states = {"_".join(sorted(list(s))) for s in power_states},
-            final_states = {"_".join(sorted(list(s))) for s in power_states},
-            symbols = self.symbols,
-            transitions = new_transitions
-        )
+        with self._phase("determinize.constants"):
+            for constant in arities[0]:
+                dest_state, is_final = self._get_dest_states(constant, [])
+                
+                if dest_state not in power_states:
+                    power_states.append(dest_state)
+                    if budget is not None:
+                        budget.check_states(len(power_states))
+                    if is_final:
+                        power_finals.append(dest_state)
+                    for ar in pos_arities:
+                        subset_list = list(map(lambda t: tuple(t), combinations(power_states+[dest_state], ar)))
+                        subset_list = list(filter(lambda s: dest_state in s, subset_list))
+                        for state in subset_list:
+                            for symbol in arities[ar]:
+                                stack.append((symbol, state))
+                key = (tuple(), constant)
+                val = {"_".join(sorted(list(dest_state)))}
+                new_transitions[key] = val
+
+        with self._phase("determinize.subsets"):
+            while stack:
+                if self.profiler is not None:
+                    self.profiler.peak("worklist", len(stack))
+                if budget is not None:
+                    budget.visit()
+                symbol, state = stack.pop()
+                dest_state, is_final = self._get_dest_states(symbol, state)
+                if not dest_state:
+                    continue
+                key = (tuple("_".join(sorted(list(s))) for s in state), symbol)
+                val = {"_".join(sorted(list(dest_state)))}
+                new_transitions[key] = val
+                if dest_state not in power_states:
+                    power_states.append(dest_state)
+                    if budget is not None:
+                        budget.check_states(len(power_states))
+                    if is_final:
+                        power_finals.append(dest_state)
+                    for ar in pos_arities:
+                        subset_list = list(map(lambda t: tuple(t), combinations(power_states+[dest_state], ar)))
+                        subset_list = list(filter(lambda s: dest_state in s, subset_list))
+                        for state in subset_list:
+                            for symbol in arities[ar]:
+                                stack.append((symbol, state))
+        if self.profiler is not None:
+            self.profiler.count("subset_states", len(power_states))
+        with self._phase("determinize.build"):
+            return NBTA(
+                states = {"_".join(sorted(list(s))) for s in power_states},
+                final_states = {"_".join(sorted(list(s))) for s in power_states},
+                symbols = self.symbols,
+                transitions = new_transitions
+            )
+
+    def lazy_determinize(self, cache_size: int = 10000) -> LazyDBTA:
+        """
+        Returns a deterministic view of this automaton whose subset states and transitions are computed as trees are run
+        instead of all at once as in determinize()
+
+        Args:
+            cache_size: The maximum number of cached transitions and subset states
+
+        Returns:
+            LazyDBTA: A lazily determinized automaton equivalent to this automaton
+        """
+        return LazyDBTA(self, cache_size)
 
     """
     Calculates the set of destination states q in this automaton such that there is a rule f(q1...qn) -> q and qi is in the ith set in the input
@@ -3,8 +3,9 @@ Non-deterministic Top-down Tree Automaton Module
 """
 from __future__ import annotations
 from collections.abc import Iterable
-from ..Tree import Tree
+from ..Tree import Tree, SubtreeIndex
 from .TreeAutomaton import TreeAutomaton
+from ..Budget import Budget
 from itertools import product, chain
 from collections import defaultdict
 import copy
@@ -14,6 +15,9 @@ class NTTA(TreeAutomaton):
     """
     Non-deterministic top-down finite-state tree automaton
     """
+    #Epsilon rules are folded into the epsilon closures before a run, so a run cannot tell which of them it used
+    epsilon_rule_hits = False
+
     def __init__(self, states: Iterable, final_states: Iterable, symbols: Iterable, transitions: dict):
         """
         Creates a top-down tree automaton
@@ -29,6 +33,9 @@ class NTTA(TreeAutomaton):
         """
         super().__init__(states, final_states, symbols, transitions)
         self.epsilon_closure = self.get_epsilon_closure()
+        #Rules with a child state that accepts no tree can never succeed, so they are dropped before any run
+        self.productive_states = self.get_productive_states()
+        self.live_transitions = self._get_live_transitions()
 
     def _validate_input(self):
         """
@@ -82,8 +89,76 @@ class NTTA(TreeAutomaton):
             bool: True if some subtree is valid and False otherwise
         """
         keys = [(s, tree.value, len(tree.children)) for s in states]
-        vals = set.union(*[self.transitions.get(key, set()) for key in keys])
-        return vals and any([all(self._accept_helper(val[c],tree.children[c]) for c in range(len(tree.children)))] for val in vals)
+        vals = set().union(*[self.live_transitions.get(key, ()) for key in keys])
+        if self.profiler is None:
+            return any(all(self._accept_helper(self.epsilon_closure[val[c]], tree.children[c]) for c in order) for (val, order) in vals)
+        accepted = next(((val, order) for (val, order) in vals if all(self._accept_helper(self.epsilon_closure[val[c]], tree.children[c]) for c in order)), None)
+        self._profile_accept(keys, states, accepted)
+        return accepted is not None
+
+    def _profile_accept(self, keys: list, states: Iterable, accepted: tuple):
+        """
+        Records the lookups, rule hits and epsilon expansions of one node of a run with the automaton's profiler.
+        Only the rules whose children all accept their subtrees are recorded as hits.
+
+        Args:
+            keys: The (state, symbol, arity) keys that were looked up
+            states: The possible states of the node
+            accepted: The tuple of child states and order of the rule that accepted the node, or None if no rule accepted it
+        """
+        profiler = self.profiler
+        profiler.count("lookups", len(keys))
+        for key in keys:
+            for (children, order) in self.live_transitions.get(key, ()):
+                if (children, order) == accepted:
+                    profiler.hit((key, children))
+                profiler.count("combinations")
+                profiler.count("epsilon_expansions", sum(len(self.epsilon_closure[c]) - 1 for c in children))
+        profiler.peak("states", len(states))
+
+    def accepts_many(self, trees: Iterable) -> list:
+        """
+        Checks whether each tree in a batch is accepted by the automaton.
+        Whether a state accepts a distinct subtree is computed once per batch and the memo's hit rate is stored in batch_stats.
+
+        Args:
+            trees: An Iterable containing the candidate Trees.
+
+        Returns:
+            list: A list containing True for each accepted tree and False for each rejected tree, in the order of the input
+        """
+        index = SubtreeIndex()
+        memo = dict()
+        counts = [0, 0]
+        results = [any(self._accept_many_helper(s, index.get_id(tree), index, memo, counts) for s in self.final_states) for tree in trees]
+        self._set_batch_stats(counts[0], counts[1])
+        return results
+
+    def _accept_many_helper(self, state, tree_id: int, index: SubtreeIndex, memo: dict, counts: list) -> bool:
+        """
+        Recursive helper for accepts_many()
+
+        Args:
+            state: The state of the subtree
+            tree_id: The id of the subtree in the index
+            index: The SubtreeIndex of the batch
+            memo: A dict mapping (state, subtree id) pairs to whether the state accepts the subtree
+            counts: A list containing the number of memo hits and misses
+
+        Returns:
+            bool: True if the state accepts the subtree and False otherwise
+        """
+        key = (state, tree_id)
+        if key in memo:
+            counts[0] += 1
+            return memo[key]
+        counts[1] += 1
+        value, child_ids = index.nodes[tree_id]
+        arity = len(child_ids)
+        accepted = any(all(self._accept_many_helper(val[c], child_ids[c], index, memo, counts) for c in order)
+                       for s in self.epsilon_closure[state] for (val, order) in self.live_transitions.get((s, value, arity), ()))
+        memo[key] = accepted
+        return accepted
 
     def get_epsilon_closure(self) -> dict:
         """
@@ -116,6 +191,47 @@ class NTTA(TreeAutomaton):
                 update = False
         return e_closure
 
+    def get_productive_states(self) -> set:
+        """
+        Finds the states that accept at least one tree
+
+        Returns:
+            set: The set of productive states
+        """
+        productive = set()
+        update = True
+        while update:
+            update = False
+            for (k, v) in self.transitions.items():
+                if k[0] not in productive and any(all(c in productive for c in val) for val in v):
+                    productive.add(k[0])
+                    update = True
+        return productive
+
+    def _get_live_transitions(self) -> dict:
+        """
+        Finds the rules of each (state, symbol, arity) whose child states are all productive.
+        The children of each rule are ordered so that the child whose states match the fewest (symbol, arity) pairs is checked first,
+        since it is the most likely to fail.
+
+        Returns:
+            dict: A dict mapping (state, symbol, arity) keys to lists of tuples each containing the child states of a rule and the order in which its children are checked
+        """
+        productive = self.productive_states
+        key_counts = dict()
+        for k in self.transitions:
+            if k[1] and k[0] in productive:
+                key_counts[k[0]] = key_counts.get(k[0], 0) + 1
+        selectivity = {s: sum(key_counts.get(t, 0) for t in self.epsilon_closure[s]) for s in self.states}
+        live_transitions = dict()
+        for (k, v) in self.transitions.items():
+            if k[0] not in productive:
+                continue
+            rules = [(val, tuple(sorted(range(len(val)), key=lambda c: selectivity[val[c]]))) for val in v if all(c in productive for c in val)]
+            if rules:
+                live_transitions[k] = rules
+        return live_transitions
+
     def union(self, other: NTTA) -> NTTA:
         """
         Returns the union of this top-down automaton and another top-down automaton.
@@ -136,7 +252,7 @@ class NTTA(TreeAutomaton):
             {(f"2_{k[0]}",k[1],k[2]):{tuple(f"2_{s}" for s in vi) for vi in v} for k,v in other.transitions.items()}
         return NTTA(new_states, new_final_states, new_symbols, new_transitions)
 
-    def intersection(self, other: NTTA) -> NTTA:
+    def intersection(self, other: NTTA, budget: Budget = None) -> NTTA:
         """
         Returns the intersection of this top-down automaton and another top-down automaton.
         The states and transitions are the products of the input automata.
@@ -144,15 +260,22 @@ class NTTA(TreeAutomaton):
 
         Args:
             other: another NTTA
+            budget: The Budget charged for each pair of combined keys and for the product states, or None for no limits
         Returns:
             NTTA: the intersection of this top-down automaton and another top-down automaton
+        Raises:
+            BudgetExceeded: The construction ran over its budget.
         """
         state_pairs = [(s1, s2) for s1 in self.states for s2 in other.states]
+        if budget is not None:
+            budget.check_states(len(state_pairs))
         new_transitions = dict()
         for (s1,s2) in state_pairs:
             for self_key, self_val in self.transitions.items():
                 if self_key[0] != s1:
                     continue
+                if budget is not None:
+                    budget.visit()
                 symbol = self_key[1]
                 rank = self_key[2]
                 for other_key, other_val in other.transitions.items():
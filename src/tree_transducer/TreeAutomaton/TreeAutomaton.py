@@ -2,12 +2,17 @@
 Tree Automaton module
 """
 from collections.abc import Iterable
+from contextlib import nullcontext
 from ..Tree import Tree
 
 class TreeAutomaton:
     """
     Tree automaton class. The types of tree automata inherit from this.
     """
+    #The Profiler that collects statistics of the automaton's runs and constructions, or None to skip profiling
+    profiler = None
+    #Whether the automaton's runs record hits of epsilon rules, so that the profiler can report the dead ones
+    epsilon_rule_hits = True
 
     def __init__(self, states: Iterable, final_states: Iterable, symbols: Iterable, transitions: dict):
         """Creates an automaton
@@ -41,4 +46,39 @@ class TreeAutomaton:
 
         This method is intended to be overridden by subclasses of TreeAutomaton.
         """
-        raise NotImplementedError
\ No newline at end of file
+        raise NotImplementedError
+
+    def accepts_many(self, trees: Iterable) -> list:
+        """
+        Checks whether each tree in a batch is accepted by the automaton, evaluating structurally equal subtrees once per batch.
+        The memo's hit rate is stored in batch_stats.
+
+        Args:
+            trees: An Iterable containing the candidate Trees.
+
+        This method is intended to be overridden by subclasses of TreeAutomaton.
+        """
+        raise NotImplementedError
+
+    def _set_batch_stats(self, hits: int, misses: int):
+        """
+        Stores the memo statistics of the last call to accepts_many()
+
+        Args:
+            hits: The number of lookups answered by the memo
+            misses: The number of lookups that had to be evaluated
+        """
+        lookups = hits + misses
+        self.batch_stats = {"hits": hits, "misses": misses, "hit_rate": hits / lookups if lookups else 0.0}
+
+    def _phase(self, name: str):
+        """
+        Times a phase of a construction with the automaton's profiler
+
+        Args:
+            name: The name of the phase
+
+        Returns:
+            A context manager that adds the time spent in it to the phase's timer, or does nothing if the automaton has no profiler
+        """
+        return nullcontext() if self.profiler is None else self.profiler.phase(name)
@@ -4,11 +4,28 @@ Deterministic finite-state bottom-up tree transducer module
 from collections.abc import Iterable
 from .NBTT import NBTT
 from ..Tree import Tree
+from ..TreeAutomaton.NBTA import NBTA
+from ..Budget import Budget
 
 class DBTT(NBTT):
     """
     Deterministic finite-state bottom-up tree transducer class
     """
+    def __init__(self, states: Iterable, final_states: Iterable, in_symbols: Iterable, out_symbols: Iterable, transitions: dict, dag: bool = False):
+        """
+        Creates a tree transducer
+
+        Args:
+            states: An Iterable containing the set of states (Q)
+            final_states: An Iterable containing the set of final states (Q_{f/i})
+            in_symbols: An Iterable containing the set of input symbols (F)
+            out_symbols: An Iterable containing the set of output symbols (F')
+            transitions: A dict containing the transitions (Delta)
+            dag: Whether the output trees are DagTrees that share the subtrees copied by rules instead of plain Trees
+        """
+        super().__init__(states, final_states, in_symbols, out_symbols, transitions, dag)
+        #Each input has at most one rule, so it is stored directly instead of in a list
+        self.rules = {k: v[0] for (k, v) in self.compiled_transitions.items() if v}
 
     def _validate_input(self):
         """
@@ -24,6 +41,75 @@ class DBTT(NBTT):
             if not k[1]:
                 raise ValueError("Deterministic transducer contains epsilon transition")
             
+    def transduce(self, tree: Tree, output_filter: NBTA = None, budget: Budget = None) -> list:
+        """
+        Transduces the input Tree.
+        The transducer has at most one output, so it is built before it is checked by the output filter.
+
+        Args:
+            tree: The Tree to be transduced.
+            output_filter: An NBTA that accepts the outputs to keep, or None to keep every output
+            budget: The Budget charged for each input node, or None for no limits
+
+        Returns:
+            list: A list containing the new Tree made by applying the transduction to the input Tree, or an empty list if there is none
+
+        Raises:
+            BudgetExceeded: The transduction ran over its budget.
+        """
+        out_tree = self.transduce_one(tree, budget)
+        if out_tree is None or (output_filter is not None and not output_filter.accepts(out_tree)):
+            return []
+        return [out_tree]
+
+    def transduce_one(self, tree: Tree, budget: Budget = None) -> Tree:
+        """
+        Transduces the input Tree in one bottom-up pass without building sets of candidate outputs.
+
+        Args:
+            tree: The Tree to be transduced.
+            budget: The Budget charged for each input node, or None for no limits
+
+        Returns:
+            Tree: The new Tree made by applying the transduction to the input Tree, or None if the tree is rejected
+
+        Raises:
+            BudgetExceeded: The transduction ran over its budget.
+        """
+        result = self._transduce_one_helper(tree, budget)
+        if result is None or result[0] not in self.final_states:
+            return None
+        return result[1]
+
+    def _transduce_one_helper(self, tree: Tree, budget: Budget = None) -> tuple:
+        """
+        Recursive helper for transduce_one()
+
+        Args:
+            tree: The Tree to be transduced.
+            budget: The Budget of the transduction, or None for no limits
+
+        Returns:
+            tuple: A tuple containing the state of the tree and its output Tree, or None if the tree has no state
+        """
+        child_states = []
+        child_trees = []
+        for c in tree.children:
+            result = self._transduce_one_helper(c, budget)
+            if result is None:
+                return None
+            child_states.append(result[0])
+            child_trees.append(result[1])
+        if budget is not None:
+            budget.visit()
+        key = (tuple(child_states), tree.value)
+        if self.profiler is not None:
+            self._profile_lookup(key)
+        rule = self.rules.get(key)
+        if rule is None:
+            return None
+        return (rule[0], rule[1].fill(tuple(child_trees)))
+
     def __eq__(self, other: object) -> bool:
         if isinstance(other, DBTT):
             return self.states == other.states and \
@@ -1,14 +1,33 @@
 """
 Deterministic finite-state top-down tree transducer module
 """
-from collections.abc import Iterable
+from collections.abc import Iterable, Iterator
 from .NTTT import NTTT
 from ..Tree import Tree, VarLeaf
+from ..Budget import Budget
+from collections import Counter
 
 class DTTT(NTTT):
     """
     Deterministic finite-state bottom-up tree transducer class
     """
+    def __init__(self, states: Iterable, final_states: Iterable, in_symbols: Iterable, out_symbols: Iterable, transitions: dict, dag: bool = False):
+        """
+        Creates a tree transducer
+
+        Args:
+            states: An Iterable containing the set of states (Q)
+            final_states: An Iterable containing the set of final states (Q_{f/i})
+            in_symbols: An Iterable containing the set of input symbols (F)
+            out_symbols: An Iterable containing the set of output symbols (F')
+            transitions: A dict containing the transitions (Delta)
+            dag: Whether the output trees are DagTrees that share the subtrees copied by rules instead of plain Trees
+        """
+        super().__init__(states, final_states, in_symbols, out_symbols, transitions, dag)
+        #Each (state, symbol, arity) has at most one rule, so it is stored directly instead of in a set
+        self.rules = {k: v[0] for (k, v) in self.compiled_transitions.items() if v}
+        #Templates flattened into output events for transduce_events(), with the number of uses of each variable
+        self.event_rules = {k: (rule[0], self._get_template_events(rule[1].tree), Counter(rule[1].vars)) for (k, rule) in self.rules.items()}
 
     def _validate_input(self):
         """
@@ -24,6 +43,209 @@ class DTTT(NTTT):
             if not k[1]:
                 raise ValueError("Deterministic transducer contains epsilon transition")
             
+    def transduce(self, tree: Tree, budget: Budget = None) -> set:
+        """
+        Transduces the input Tree.
+
+        Args:
+            tree: The Tree to be transduced.
+            budget: The Budget charged for each input node visited, or None for no limits
+
+        Returns:
+            set: The set of new Trees made by applying the transduction to the input Tree from each initial state
+
+        Raises:
+            BudgetExceeded: The transduction ran over its budget.
+        """
+        out_trees = (self._transduce_one_helper(state, tree, budget) for state in self.final_states)
+        return {out_tree for out_tree in out_trees if out_tree is not None}
+
+    def transduce_one(self, tree: Tree, budget: Budget = None) -> Tree:
+        """
+        Transduces the input Tree in one top-down pass without building sets of candidate outputs.
+        The initial states are tried in turn and the output of the first one that accepts the tree is returned.
+
+        Args:
+            tree: The Tree to be transduced.
+            budget: The Budget charged for each input node visited, or None for no limits
+
+        Returns:
+            Tree: The new Tree made by applying the transduction to the input Tree, or None if the tree is rejected
+
+        Raises:
+            BudgetExceeded: The transduction ran over its budget.
+        """
+        for state in self.final_states:
+            out_tree = self._transduce_one_helper(state, tree, budget)
+            if out_tree is not None:
+                return out_tree
+        return None
+
+    def _transduce_one_helper(self, state, tree: Tree, budget: Budget = None) -> Tree:
+        """
+        Recursive helper for transduce_one()
+
+        Args:
+            state: The state of the tree.
+            tree: The Tree to be transduced.
+            budget: The Budget of the transduction, or None for no limits
+
+        Returns:
+            Tree: The output Tree, or None if the tree is rejected in the state
+        """
+        if budget is not None:
+            budget.visit()
+        key = (state, tree.value, len(tree.children))
+        if self.profiler is not None:
+            self._profile_lookup(key)
+        rule = self.rules.get(key)
+        if rule is None:
+            return None
+        child_trees = []
+        for i in range(len(tree.children)):
+            out_tree = self._transduce_one_helper(rule[0][i], tree.children[i], budget)
+            if out_tree is None:
+                return None
+            child_trees.append(out_tree)
+        return rule[1].fill(tuple(child_trees))
+
+    def transduce_events(self, events: Iterable) -> Iterator[tuple]:
+        """
+        Transduces a tree given as a stream of events into a stream of output events, in the format of Tree.to_events().
+        Only the states of the open input nodes are kept, so the memory used grows with the depth of the input rather than its size.
+        The constant parts of a rule's template are output as soon as the rule is chosen, and the output of a child is passed through
+        as it is made when the template uses it once and in order. Children whose outputs are reordered or copied by the template are
+        buffered until they are needed, and children that are deleted are checked but not output.
+        Because output events are produced before the whole input is read, a rejected input raises an error after part of its output has been produced.
+
+        Args:
+            events: An Iterable containing the events of the input tree
+
+        Returns:
+            Iterator: An iterator over the events of the output tree
+
+        Raises:
+            ValueError: The transducer does not have exactly one initial state.
+        """
+        if len(self.final_states) != 1:
+            raise ValueError("Streaming transduction requires exactly one initial state.")
+        return self._transduce_events_helper(next(iter(self.final_states)), events)
+
+    def _transduce_events_helper(self, initial_state, events: Iterable) -> Iterator[tuple]:
+        """
+        Generator for transduce_events()
+
+        Args:
+            initial_state: The initial state
+            events: An Iterable containing the events of the input tree
+
+        Returns:
+            Iterator: An iterator over the events of the output tree
+
+        Raises:
+            ValueError: The events are not a well-formed tree or the tree is rejected.
+        """
+        out = []
+        #Each frame is [child states, template events, position in the template, sink, next child, buffers, remaining uses]
+        stack = []
+        done = False
+        for event in events:
+            if done:
+                raise ValueError("Events continue after the end of the tree.")
+            if event[0] == "open":
+                if not stack:
+                    state, sink = initial_state, out
+                else:
+                    parent = stack[-1]
+                    child = parent[4]
+                    if child >= len(parent[0]):
+                        raise ValueError(f"Node has more children than the {len(parent[0])} it was opened with.")
+                    state = parent[0][child]
+                    sink = self._get_child_sink(parent, child)
+                rule = self.event_rules.get((state, event[1], event[2]))
+                if rule is None:
+                    raise ValueError(f"Tree rejected at node {event[1]} in state {state}.")
+                frame = [rule[0], rule[1], 0, sink, 0, dict(), dict(rule[2])]
+                stack.append(frame)
+                self._advance_events(frame)
+            elif event[0] == "close" and stack:
+                frame = stack.pop()
+                if frame[4] != len(frame[0]):
+                    raise ValueError(f"Node has {frame[4]} children but was opened with {len(frame[0])}.")
+                if stack:
+                    stack[-1][4] += 1
+                    self._advance_events(stack[-1])
+                else:
+                    done = True
+            else:
+                raise ValueError(f"Malformed event: {event}")
+            yield from out
+            out.clear()
+        if not done:
+            raise ValueError("Events end before the end of the tree.")
+
+    def _get_child_sink(self, frame: list, child: int):
+        """
+        Chooses where the output events of a child are written
+
+        Args:
+            frame: The frame of the parent
+            child: The index of the child
+
+        Returns:
+            The parent's sink if the child's output can be passed through, a new buffer if it must be kept, or None if it is deleted
+        """
+        if frame[3] is None or child not in frame[6]:
+            return None
+        template = frame[1]
+        if frame[6][child] == 1 and frame[2] < len(template) and template[frame[2]] == child:
+            return frame[3]
+        frame[5][child] = []
+        return frame[5][child]
+
+    def _advance_events(self, frame: list):
+        """
+        Writes the events of a frame's template to its sink until a variable whose child has not been read is reached
+
+        Args:
+            frame: The frame
+        """
+        template, sink = frame[1], frame[3]
+        while frame[2] < len(template):
+            item = template[frame[2]]
+            if isinstance(item, int):
+                if item >= frame[4]:
+                    return
+                buffer = frame[5].get(item)
+                if buffer is not None:
+                    if sink is not None:
+                        sink.extend(buffer)
+                    frame[6][item] -= 1
+                    if not frame[6][item]:
+                        del frame[5][item]
+            elif sink is not None:
+                sink.append(item)
+            frame[2] += 1
+
+    @staticmethod
+    def _get_template_events(template: Tree) -> tuple:
+        """
+        Flattens a template into its output events, with the index of each VarLeaf in place of its events
+
+        Args:
+            template: The template
+
+        Returns:
+            tuple: The events of the template
+        """
+        if isinstance(template, VarLeaf):
+            return (template.idx,)
+        events = [("open", template.value, len(template.children))]
+        for child in template.children:
+            events.extend(DTTT._get_template_events(child))
+        events.append(("close",))
+        return tuple(events)
+
     def __eq__(self, other: object) -> bool:
         if isinstance(other, DTTT):
             return self.states == other.states and \
@@ -4,15 +4,19 @@ Nondeterministic finite-state bottom-up tree transducer module
 from __future__ import annotations
 from collections.abc import Iterable
 from .TreeTransducer import TreeTransducer
-from ..Tree import Tree, VarLeaf
+from .OutputForest import OutputForest
+from .Pipeline import Pipeline
+from ..Tree import Tree, VarLeaf, SubtreeIndex, Template
+from ..TreeAutomaton.NBTA import NBTA
+from ..Budget import Budget
 from itertools import product, chain
-import copy
+from math import prod
 
 class NBTT(TreeTransducer):
     """
     Nondeterministic finite-state bottom-up tree transducer class
     """
-    def __init__(self, states: Iterable, final_states: Iterable, in_symbols: Iterable, out_symbols: Iterable, transitions: dict):
+    def __init__(self, states: Iterable, final_states: Iterable, in_symbols: Iterable, out_symbols: Iterable, transitions: dict, dag: bool = False):
         """
         Creates a tree transducer
 
@@ -22,9 +26,16 @@ class NBTT(TreeTransducer):
             in_symbols: An Iterable containing the set of input symbols (F)
             out_symbols: An Iterable containing the set of output symbols (F')
             transitions: A dict containing the transitions (Delta)
+            dag: Whether the output trees are DagTrees that share the subtrees copied by rules instead of plain Trees
         """
         super().__init__(states, final_states, in_symbols, out_symbols, transitions)
+        self.dag = dag
         self.epsilon_closure = self.get_epsilon_closure()
+        self.compiled_transitions = {k: [(rule[0], Template(rule[1], dag)) for rule in v] for (k, v) in self.transitions.items()}
+        #Epsilon chains are composed once here so following them at run time is a table lookup
+        self.epsilon_paths, self.epsilon_cycles = self._get_epsilon_paths()
+        self.compiled_epsilon_paths = {s: [(path[0], Template(path[1], dag), path[2]) for path in paths] for (s, paths) in self.epsilon_paths.items()}
+        self.rule_trie = self._get_rule_trie()
 
     def _validate_input(self):
         """
@@ -55,43 +66,390 @@ class NBTT(TreeTransducer):
         if not transitions_out_symbols.issubset(self.out_symbols):
             raise ValueError(f"Transducer's transitions contain output symbol(s) not present in its input out_symbols: {transitions_out_symbols - self.out_symbols}")
 
-    def transduce(self, tree: Tree) -> Tree:
+    def transduce(self, tree: Tree, output_filter: NBTA = None, budget: Budget = None) -> Tree:
         """
         Transduces the input Tree.
+        If an output filter is given, the filter's set of states is found for each partial output from the states of the outputs
+        it is built from, before the output is built. Partial outputs whose states cannot lead to acceptance are dropped,
+        so outputs rejected by the filter are never fully built. A partial output is only dropped when every rule and epsilon path
+        that can read its state uses it, since a rule that deletes it can still build an accepted output.
 
         Args: 
             tree: The Tree to be transduced.
+            output_filter: An NBTA that accepts the outputs to keep, or None to keep every output
+            budget: The Budget charged for each input node and for each partial output before it is built, or None for no limits
 
         Returns:
             Tree: A new Tree made by applying the transduction to the input Tree
+
+        Raises:
+            BudgetExceeded: The transduction ran over its budget.
+        """
+        if output_filter is None:
+            outputs = self._transduce_helper(tree, budget)
+            return [out_tree for s in self.final_states for out_tree in outputs.get(s, ())]
+        outputs = self._filtered_transduce_helper(tree, output_filter, output_filter.get_coreachable_states(), self._get_used_states(), dict(), budget)
+        return [out_tree for s in self.final_states for (filter_states, out_trees) in outputs.get(s, dict()).items()
+                if output_filter._is_accepting(filter_states) for out_tree in out_trees]
+
+    def _transduce_helper(self, tree: Tree, budget: Budget = None) -> dict:
+        """
+        Recursive helper for transduce().
+        The outputs of the children are grouped by state, and only the tuples of child states that some rule reads are combined,
+        so output trees are only built for the rules that match.
+
+        Args:
+            tree: The Tree to be transduced.
+            budget: The Budget of the transduction, or None for no limits
+
+        Returns:
+            dict: A dict mapping states to the sets of output trees that have that state, including those made with epsilon transitions
         """
-        outputs = self._transduce_helper(tree)
-        outputs = set(outputs + [i for o in outputs for i in self._get_epsilon_closed_trees(o[0],o[1])])
-        return list(map(lambda out: out[1], filter(lambda out : out[0] in self.final_states, outputs)))
+        children_outputs = [self._transduce_helper(c, budget) for c in tree.children]
+        if budget is not None:
+            budget.visit()
+        base_outputs = dict()
+        for (child_states, rules) in self._match_rules(self.rule_trie.get((tree.value, len(tree.children)), ()), children_outputs, ()):
+            child_trees = [children_outputs[i][child_states[i]] for i in range(len(child_states))]
+            if self.profiler is not None:
+                self._profile_rules(rules, child_trees)
+            if budget is not None:
+                budget.add_outputs(len(rules) * prod(len(out_trees) for out_trees in child_trees))
+            for (_, (parent_state, _), out_tree) in rules:
+                base_outputs.setdefault(parent_state, set()).update(out_tree.fill(child_combination) for child_combination in product(*child_trees))
+        outputs = {state: set(out_trees) for (state, out_trees) in base_outputs.items()}
+        for (state, out_trees) in base_outputs.items():
+            for (to_state, template, _) in self.compiled_epsilon_paths[state]:
+                if budget is not None:
+                    budget.add_outputs(len(out_trees))
+                outputs.setdefault(to_state, set()).update(template.fill((out_tree,)) for out_tree in out_trees)
+        if self.profiler is not None:
+            self._profile_outputs(base_outputs, outputs)
+        return outputs
 
-    def _transduce_helper(self, tree: Tree):
+    def _filtered_transduce_helper(self, tree: Tree, output_filter: NBTA, coreachable: set, used_states: set, constant_states: dict, budget: Budget = None) -> dict:
         """
-        Recursive helper for transduce()
+        Recursive helper for transduce() with an output filter.
+        The outputs of each child are grouped by their state and then by the filter's states, so the filter is run over each
+        template once per combination of the children's filter states rather than once per combination of output trees.
+        Outputs with no coreachable filter states are kept, under the empty set, if their state is not in used_states.
 
         Args:
             tree: The Tree to be transduced.
+            output_filter: The NBTA that accepts the outputs to keep
+            coreachable: The coreachable states of the filter
+            used_states: The states whose outputs are used by every rule and epsilon path that reads them
+            constant_states: A dict mapping the ids of constant template subtrees to the filter's states
+            budget: The Budget of the transduction, or None for no limits
+
+        Returns:
+            dict: A dict mapping states to dicts mapping frozensets of the filter's states to the sets of output trees that have them
+        """
+        children_outputs = [self._filtered_transduce_helper(c, output_filter, coreachable, used_states, constant_states, budget) for c in tree.children]
+        if budget is not None:
+            budget.visit()
+        base_outputs = dict()
+        for (child_states, rules) in self._match_rules(self.rule_trie.get((tree.value, len(tree.children)), ()), children_outputs, ()):
+            child_groups = [list(children_outputs[i][child_states[i]].items()) for i in range(len(child_states))]
+            if self.profiler is not None:
+                self._profile_rules(rules, child_groups)
+            for (_, (parent_state, _), out_tree) in rules:
+                state_outputs = base_outputs.setdefault(parent_state, dict())
+                for group_combination in product(*child_groups):
+                    filter_states = self._run_filter(out_tree.code, tuple(g[0] for g in group_combination), output_filter, coreachable, constant_states)
+                    if filter_states or parent_state not in used_states:
+                        if budget is not None:
+                            budget.add_outputs(prod(len(g[1]) for g in group_combination))
+                        state_outputs.setdefault(filter_states, set()).update(out_tree.fill(child_combination) for child_combination in product(*[g[1] for g in group_combination]))
+        outputs = {state: {f: set(out_trees) for (f, out_trees) in groups.items()} for (state, groups) in base_outputs.items()}
+        for (state, groups) in base_outputs.items():
+            for (to_state, template, _) in self.compiled_epsilon_paths[state]:
+                to_outputs = outputs.setdefault(to_state, dict())
+                for (f, out_trees) in groups.items():
+                    filter_states = self._run_filter(template.code, (f,), output_filter, coreachable, constant_states)
+                    if filter_states or to_state not in used_states:
+                        if budget is not None:
+                            budget.add_outputs(len(out_trees))
+                        to_outputs.setdefault(filter_states, set()).update(template.fill((out_tree,)) for out_tree in out_trees)
+        outputs = {state: groups for (state, groups) in outputs.items() if groups}
+        if self.profiler is not None:
+            self._profile_outputs(base_outputs, outputs)
+        return outputs
+
+    def _get_used_states(self) -> set:
+        """
+        Finds the states whose outputs are always part of the final output.
+        A state is used if every rule that reads it as a child and every epsilon path that starts at it uses its output
+        and leads to a used state, since an output that is deleted further up does not have to be accepted by an output filter.
 
         Returns:
-            A tuple containing a state and an output tree that has that state
-        """
-        transitions_to = []
-        if tree.is_leaf():
-            transitions_to = self.transitions.get((tuple(), tree.value), [])
-        else:
-            children_poss = [self._transduce_helper(c) for c in tree.children]
-            children_poss_epsilon = list(map(lambda children_tup_list: children_tup_list + [item for t in children_tup_list for item in self._get_epsilon_closed_trees(t[0], t[1])],children_poss))
-            children_prod = list(product(*children_poss_epsilon))
-            for tups in children_prod:
-                child_states, child_trees = list(zip(*tups))
-                output_tups = self.transitions.get((child_states, tree.value), [])
-                for (parent_state, out_tree) in output_tups:
-                    transitions_to.append((parent_state, out_tree.fill(child_trees)))
-        return transitions_to
+            set: The set of states whose outputs are never deleted
+        """
+        readers = {s: [] for s in self.states}
+        for (children, symbol), rules in self.transitions.items():
+            if not symbol:
+                continue
+            for (state, template) in rules:
+                out_vars = template.get_vars()
+                for (i, c) in enumerate(children):
+                    readers[c].append((state, i in out_vars))
+        for (s, paths) in self.epsilon_paths.items():
+            readers[s].extend((to_state, 0 in template.get_vars()) for (to_state, template, _) in paths)
+        used_states = {s for s in self.states if all(used for (_, used) in readers[s])}
+        update = True
+        while update:
+            update = False
+            for s in list(used_states):
+                if not all(state in used_states for (state, _) in readers[s]):
+                    used_states.discard(s)
+                    update = True
+        return used_states
+
+    def _profile_rules(self, rules: list, child_outputs: list):
+        """
+        Records the rule hits and combinations of the rules matched by a tuple of child states with the transducer's profiler
+
+        Args:
+            rules: The leaf of the rule trie containing the matched rules
+            child_outputs: A list containing the outputs, or groups of outputs, of each child that the rules combine
+        """
+        combinations = len(rules)
+        for outputs in child_outputs:
+            combinations *= len(outputs)
+        self.profiler.count("combinations", combinations)
+        for (key, rule, _) in rules:
+            self.profiler.hit((key, rule))
+
+    def _profile_outputs(self, base_outputs: dict, outputs: dict):
+        """
+        Records the lookup, epsilon expansions and output sizes of one node of a run with the transducer's profiler
+
+        Args:
+            base_outputs: A dict mapping states to the outputs of the node made without epsilon transitions
+            outputs: A dict mapping states to all of the outputs of the node
+        """
+        profiler = self.profiler
+        def size(out_trees) -> int:
+            #The outputs of a filtered run are grouped by the filter's states
+            return len(out_trees) if isinstance(out_trees, set) else sum(map(len, out_trees.values()))
+        profiler.count("lookups")
+        for (state, out_trees) in base_outputs.items():
+            for (_, _, rules) in self.compiled_epsilon_paths[state]:
+                profiler.count("epsilon_expansions", size(out_trees))
+                for rule in rules:
+                    profiler.hit(rule)
+        profiler.peak("states", len(outputs))
+        profiler.peak("outputs", sum(size(out_trees) for out_trees in outputs.values()))
+
+    def _run_filter(self, code, var_states: tuple, output_filter: NBTA, coreachable: set, constant_states: dict) -> frozenset:
+        """
+        Runs an output filter over a compiled template whose variables have the given sets of the filter's states
+
+        Args:
+            code: The compiled template, as found in a Template's code
+            var_states: A tuple containing the filter's states of each variable
+            output_filter: The NBTA that accepts the outputs to keep
+            coreachable: The coreachable states of the filter
+            constant_states: A dict mapping the ids of constant template subtrees to the filter's states
+
+        Returns:
+            frozenset: The coreachable states of the filter at the root of the filled template
+        """
+        if isinstance(code, int):
+            return var_states[code]
+        if isinstance(code, Tree):
+            if id(code) not in constant_states:
+                constant_states[id(code)] = frozenset(output_filter._accept_helper(code) & coreachable)
+            return constant_states[id(code)]
+        child_states = tuple(self._run_filter(c, var_states, output_filter, coreachable, constant_states) for c in code[1])
+        return frozenset(output_filter._get_next_states(code[0], child_states) & coreachable)
+
+    def _match_rules(self, node, children: list, child_states: tuple):
+        """
+        Finds the tuples of child states that are read by some rule, following a rule trie and the states of the children together.
+        At each level only the states that are both in the trie and among the child's states are followed, iterating over the smaller of the two.
+
+        Args:
+            node: The node of the rule trie for the child states found so far
+            children: A list containing a dict for each child whose keys are the child's states
+            child_states: A tuple containing the states of the children found so far
+
+        Returns:
+            Iterator: An iterator over tuples each containing a tuple of child states and the list of rules that read it
+        """
+        if len(child_states) == len(children):
+            if node:
+                yield (child_states, node)
+            return
+        states = children[len(child_states)]
+        for s in (node if len(node) < len(states) else states):
+            if s in node and s in states:
+                yield from self._match_rules(node[s], children, child_states + (s,))
+
+    def _get_rule_trie(self) -> dict:
+        """
+        Builds a trie of the rules for each (symbol, arity) pair, keyed by one child state per level.
+        Each leaf is a list of tuples containing the key of a rule, the rule and its compiled Template.
+
+        Returns:
+            dict: A dict mapping (symbol, arity) pairs to the roots of their tries
+        """
+        rule_trie = dict()
+        for (k, v) in self.transitions.items():
+            arity = len(k[0])
+            node = rule_trie.setdefault((k[1], arity), dict() if arity else [])
+            for (i, s) in enumerate(k[0]):
+                node = node.setdefault(s, dict() if i < arity - 1 else [])
+            node.extend((k, rule, compiled[1]) for (rule, compiled) in zip(v, self.compiled_transitions[k]))
+        return rule_trie
+
+    def transduce_forest(self, tree: Tree) -> OutputForest:
+        """
+        Transduces the input Tree into a packed forest of its outputs without building the output trees.
+        The forest has one node for each (state, distinct input subtree) pair that has an output, so its size is polynomial in the size of the input.
+        Epsilon transitions are followed along paths that do not repeat a state.
+
+        Args:
+            tree: The Tree to be transduced.
+
+        Returns:
+            OutputForest: The forest of the output trees
+        """
+        forest = OutputForest(self.dag)
+        index = SubtreeIndex()
+        root_id = index.get_id(tree)
+        epsilon_paths = self.epsilon_paths
+        closed_nodes = []
+        for input_id, (value, child_ids) in enumerate(index.nodes):
+            child_nodes = [closed_nodes[c] for c in child_ids]
+            base_nodes = dict()
+            for (child_states, rules) in self._match_rules(self.rule_trie.get((value, len(child_ids)), ()), child_nodes, ()):
+                for (key, rule, _) in rules:
+                    if rule[0] not in base_nodes:
+                        base_nodes[rule[0]] = forest.add_node((rule[0], input_id))
+                    children = tuple(child_nodes[i][child_states[i]] for i in range(len(child_states)))
+                    forest.add_alternative(base_nodes[rule[0]], rule[1], children, ((key, rule),))
+            closed_nodes.append(self._close_forest_nodes(forest, base_nodes, input_id, epsilon_paths))
+        forest.roots = [closed_nodes[root_id][s] for s in sorted(self.final_states, key=str) if s in closed_nodes[root_id]]
+        return forest
+
+    def _close_forest_nodes(self, forest: OutputForest, base_nodes: dict, input_id: int, epsilon_paths: dict) -> dict:
+        """
+        Adds the outputs reachable with epsilon transitions to the forest nodes of one input subtree
+
+        Args:
+            forest: The forest
+            base_nodes: A dict mapping states to the nodes of the outputs made without epsilon transitions
+            input_id: The id of the input subtree
+            epsilon_paths: The epsilon paths of the transducer as found by _get_epsilon_paths()
+
+        Returns:
+            dict: A dict mapping states to the nodes of all the outputs of the input subtree with that state
+        """
+        alternatives = {state: [(VarLeaf(0), (node,), ())] for state, node in base_nodes.items()}
+        for state, node in base_nodes.items():
+            for (to_state, template, rules) in epsilon_paths[state]:
+                alternatives.setdefault(to_state, []).append((template, (node,), rules))
+        closed_nodes = dict()
+        for state, state_alternatives in alternatives.items():
+            if len(state_alternatives) == 1 and not state_alternatives[0][2]:
+                closed_nodes[state] = base_nodes[state]
+                continue
+            closed_nodes[state] = forest.add_node((state, input_id))
+            for alternative in state_alternatives:
+                forest.add_alternative(closed_nodes[state], *alternative)
+        return closed_nodes
+
+    def _get_epsilon_paths(self) -> tuple:
+        """
+        Finds the chains of epsilon transitions that start at each state and do not repeat a state.
+        The output templates along each chain are composed into one template, and only the first chain found for each
+        (state at the end, composed template) pair is followed, so the number of chains is bounded by the distinct outputs
+        they make rather than by the number of paths through the epsilon rules.
+        Cycles would produce infinitely many outputs if they were followed, so they are reported instead.
+        Cycles whose composed template is a single variable only repeat outputs and are not reported.
+
+        Returns:
+            tuple: A tuple containing a dict mapping each state to a list of tuples each containing the state at the end of a chain, the composed template and the tuple of (key, value) rules in the chain,
+            and a list of tuples each containing the states of a productive cycle and its composed template
+        """
+        epsilon_paths = dict()
+        for start in self.states:
+            paths = []
+            found = set()
+            stack = [(start, VarLeaf(0), (), {start})]
+            while stack:
+                state, template, rules, visited = stack.pop()
+                key = ((state,), "")
+                for rule in self.transitions.get(key, []):
+                    if rule[0] in visited:
+                        continue
+                    path = (rule[0], rule[1].fill((template,)), rules + ((key, rule),))
+                    if path[:2] in found:
+                        continue
+                    found.add(path[:2])
+                    paths.append(path)
+                    stack.append(path + (visited | {rule[0]},))
+            epsilon_paths[start] = paths
+        return (epsilon_paths, self._get_epsilon_cycles())
+
+    def _get_epsilon_cycles(self) -> list:
+        """
+        Finds the productive cycles of epsilon transitions.
+        A cycle is found through each epsilon rule whose template is not a single variable and whose state can be reached again
+        from the state it leads to. The rest of the cycle is the shortest chain of epsilon transitions back.
+
+        Returns:
+            list: A list of tuples each containing the states of a productive cycle, starting at its smallest state, and its composed template
+        """
+        epsilon_cycles = []
+        for (key, rules) in self.transitions.items():
+            if key[1] or len(key[0]) != 1:
+                continue
+            for rule in rules:
+                steps = None if isinstance(rule[1], VarLeaf) else self._get_epsilon_chain(rule[0], key[0][0])
+                if steps is None:
+                    continue
+                cycle = [(key, rule)] + steps
+                first = min(range(len(cycle)), key=lambda i: str(cycle[i][0][0][0]))
+                cycle = cycle[first:] + cycle[:first]
+                template = VarLeaf(0)
+                for (_, cycle_rule) in cycle:
+                    template = cycle_rule[1].fill((template,))
+                epsilon_cycle = (tuple(k[0][0] for (k, _) in cycle), template)
+                if epsilon_cycle not in epsilon_cycles:
+                    epsilon_cycles.append(epsilon_cycle)
+        return epsilon_cycles
+
+    def _get_epsilon_chain(self, start, end) -> list:
+        """
+        Finds a shortest chain of epsilon transitions from one state to another with a breadth-first search
+
+        Args:
+            start: The state at the start of the chain
+            end: The state at the end of the chain
+
+        Returns:
+            list: The list of (key, value) rules in the chain, which is empty if start is end, or None if there is no chain
+        """
+        parents = {start: None}
+        queue = [start]
+        i = 0
+        while end not in parents:
+            if i == len(queue):
+                return None
+            key = ((queue[i],), "")
+            for rule in self.transitions.get(key, []):
+                if rule[0] not in parents:
+                    parents[rule[0]] = (queue[i], (key, rule))
+                    queue.append(rule[0])
+            i += 1
+        rules = []
+        state = end
+        while parents[state] is not None:
+            state, step = parents[state]
+            rules.append(step)
+        return rules[::-1]
 
     def get_epsilon_closure(self) -> dict:
         """
@@ -124,127 +482,410 @@ class NBTT(TreeTransducer):
                 update = False
         return e_closure
 
-    def _get_epsilon_closed_trees(self, state, tree) -> list: 
-        """
-        Finds the output trees that can be generated without reading any symbols, not including the input tree.
-
-        Args:
-            state: The state of the Tree
-            tree: The output tree
-
-        Returns:
-            list: The list of trees that can be made with only epsilon transitions, not including the input tree.
-        """
-        outs = []
-        stack_out = self.transitions.get(((state,),""), []).copy()
-        stack_tree = [tree] * len(stack_out)
-        i = 0
-        while i < len(stack_out):
-            out_state, out_tree = stack_out[i][0],stack_out[i][1].fill((stack_tree[i],))
-            outs.append((out_state, out_tree))
-            next_outs = self.transitions.get(((out_state,),""), [])
-            if next_outs:
-                stack_out += next_outs
-                stack_tree += [out_tree] * len(next_outs)
-            i += 1
-        return outs
-
-    def union(self, other: NBTT) -> NBTT:
+    def union(self, other: NBTT, budget: Budget = None) -> NBTT:
         """
         Returns the union of this bottom-up transducer and another bottom-up transducer.
         The states and transitions are the products of the input transducers.
+        Each transducer is completed with a sink state "%S%" for the (symbol, rank) pairs that only the other transducer reads.
+        Only the pairs of rules whose child states are reachable pairs of states are combined.
         An NBTT is always returned even if both input transducers are deterministic.
 
+        Args:
+            other: The other transducer
+            budget: The Budget charged for each reached pair of states and for the product states, or None for no limits
+
         Returns:
             NBTT: the union of this bottom-up transducer and another bottom-up transducer
+
+        Raises:
+            BudgetExceeded: The construction ran over its budget.
         """
         new_in_symbols = set(chain.from_iterable([self.in_symbols, other.in_symbols]))
         new_out_symbols = set(chain.from_iterable([self.out_symbols, other.out_symbols]))
-        new_transitions = dict()
         new_final_states = {f"{s1}_{s2}" for s1 in self.final_states for s2 in other.states}
         new_final_states.update({f"{s1}_{s2}" for s1 in self.states for s2 in other.final_states})
-        ranks = dict()
-        self_ranks = dict()
-        other_ranks = dict()
-        completed_transitions_self = copy.deepcopy(self.transitions)
-        completed_transitions_other = copy.deepcopy(other.transitions)
         new_states = {f"{s1}_{s2}" for s1 in self.states for s2 in other.states}
-        for k in self.transitions.keys():
-            r = ranks.get(k[1], set()).copy()
-            r.add(len(k[0]))
-            ranks[k[1]] = r
-            self_r = self_ranks.get(k[1], set()).copy()
-            self_r.add(len(k[0]))
-            self_ranks[k[1]] = self_r
-        for k in other.transitions.keys():
-            r = ranks.get(k[1], set()).copy()
-            r.add(len(k[0]))
-            ranks[k[1]] = r
-            other_r = other_ranks.get(k[1], set()).copy()
-            other_r.add(len(k[0]))
-            other_ranks[k[1]] = other_r
-        for symbol in ranks:
-            self_diff = ranks[symbol] - self_ranks.get(symbol, set())
-            for r in self_diff:
-                completed_transitions_self[(tuple(["%S%"] * r), symbol)] = {("%S%", VarLeaf(0))}
-            other_diff = ranks[symbol] - other_ranks.get(symbol, set())
-            for r in other_diff:
-                completed_transitions_other[(tuple(["%S%"] * r), symbol)] = {("%S%", VarLeaf(0))}
-        for k_s, v_s in completed_transitions_self.items():
-            for k_o, v_o in completed_transitions_other.items():
-                if not k_s[1] == k_o[1]:
-                    continue
-                if not len(k_s[0]) == len(k_o[0]):
-                    continue
-                new_children = tuple([f"{k_s[0][i]}_{k_o[0][i]}" for i in range(len(k_s[0]))])
-                new_val = []
-                new_states.update(new_children)
-                for s1 in v_s:
-                    for s2 in v_o:
-                        s = f"{s1[0]}_{s2[0]}"
-                        if s1[0] != "%S%":
-                            new_val.append((s, s1[1]))
-                        if s2[0] != "%S%":
-                            new_val.append((s, s2[1]))
-                        new_states.add(s)
-                        if s1[0] in self.final_states or s2[0] in other.final_states:
-                            new_final_states.add(s)
-                new_transitions[(new_children, k_s[1])] = new_val
+        if budget is not None:
+            budget.check_states(len(new_states))
+        self_ranks = {(k[1], len(k[0])) for k in self.transitions}
+        other_ranks = {(k[1], len(k[0])) for k in other.transitions}
+        #The rules are shared with the input transducers rather than copied, since only the sink rules are added
+        completed_transitions_self = dict(self.transitions)
+        completed_transitions_other = dict(other.transitions)
+        sink_rules = {("%S%", VarLeaf(0))}
+        for (symbol, r) in other_ranks - self_ranks:
+            completed_transitions_self[(tuple(["%S%"] * r), symbol)] = sink_rules
+        for (symbol, r) in self_ranks - other_ranks:
+            completed_transitions_other[(tuple(["%S%"] * r), symbol)] = sink_rules
+        new_transitions, reached = NBTT._product_transitions(completed_transitions_self, completed_transitions_other, True, budget)
+        new_states.update(f"{s1}_{s2}" for (s1, s2) in reached)
+        new_final_states.update(f"{s1}_{s2}" for (s1, s2) in reached if s1 in self.final_states or s2 in other.final_states)
         return NBTT(new_states, new_final_states, new_in_symbols, new_out_symbols, new_transitions)
 
-    def intersection(self, other: NBTT) -> NBTT:
+    def intersection(self, other: NBTT, budget: Budget = None) -> NBTT:
         """
         Returns the intersection of this transducer and another transducer.
+        Only the pairs of rules whose child states are reachable pairs of states are combined.
+
+        Args:
+            other: The other transducer
+            budget: The Budget charged for each reached pair of states and for the product states, or None for no limits
 
         Returns:
             NBTT: the intersection of this bottom-up transducer and another bottom-up transducer
+
+        Raises:
+            BudgetExceeded: The construction ran over its budget.
         """
         new_in_symbols = self.in_symbols.union(other.in_symbols)
         new_out_symbols = self.out_symbols.union(other.out_symbols)
-        new_transitions = dict()
         new_final_states = {f"{s1}_{s2}" for s1 in self.final_states for s2 in other.final_states}
-        completed_transitions_self = copy.deepcopy(self.transitions)
-        completed_transitions_other = copy.deepcopy(other.transitions)
         new_states = {f"{s1}_{s2}" for s1 in self.states for s2 in other.states}
-        for k_s, v_s in completed_transitions_self.items():
-            for k_o, v_o in completed_transitions_other.items():
-                if not k_s[1] == k_o[1]:
-                    continue
-                if not len(k_s[0]) == len(k_o[0]):
-                    continue
-                new_children = tuple([f"{k_s[0][i]}_{k_o[0][i]}" for i in range(len(k_s[0]))])
-                new_val = []
-                new_states.update(new_children)
-                for s1 in v_s:
-                    for s2 in v_o:
-                        s = f"{s1[0]}_{s2[0]}"
-                        new_val.append((s, s1[1]))
-                        if (s, s2[1]) not in new_val:
-                            new_val.append((s, s2[1]))
-                        new_states.add(s)
-                new_transitions[(new_children, k_s[1])] = new_val
+        if budget is not None:
+            budget.check_states(len(new_states))
+        new_transitions, reached = NBTT._product_transitions(self.transitions, other.transitions, False, budget)
+        new_states.update(f"{s1}_{s2}" for (s1, s2) in reached)
         return NBTT(new_states, new_final_states, new_in_symbols, new_out_symbols, new_transitions)
 
+    @staticmethod
+    def _product_transitions(first: dict, second: dict, union: bool, budget: Budget = None) -> tuple:
+        """
+        Combines the rules of two transducers that read the same symbol with the same rank, working upwards from the leaf rules.
+        The rules of the second transducer are bucketed by (symbol, rank, child position, child state), so each newly reached
+        pair of states is only matched against the rules that read it, and each pair of rules is combined once.
+
+        Args:
+            first: The transitions of the first transducer
+            second: The transitions of the second transducer
+            union: Whether the outputs of the sink state "%S%" are left out, as in a union, instead of the repeated outputs, as in an intersection
+            budget: The Budget charged for each reached pair of states, or None for no limits
+
+        Returns:
+            tuple: A tuple containing the product transitions and the set of reached (first state, second state) pairs
+        """
+        buckets = dict()
+        for k in second:
+            for (i, s) in enumerate(k[0]):
+                buckets.setdefault((k[1], len(k[0]), i, s), []).append(k)
+        leaves = dict()
+        for k in second:
+            if not k[0]:
+                leaves.setdefault(k[1], []).append(k)
+        uses = dict()
+        for k in first:
+            for (i, s) in enumerate(k[0]):
+                uses.setdefault(s, []).append((k, i))
+        new_transitions = dict()
+        reached = set()
+        stack = []
+        for k_s in first:
+            if not k_s[0]:
+                for k_o in leaves.get(k_s[1], []):
+                    NBTT._add_product_rules(k_s, first[k_s], k_o, second[k_o], union, new_transitions, reached, stack)
+        done = set()
+        while stack:
+            if budget is not None:
+                budget.visit()
+                budget.check_states(len(reached))
+            (s1, s2) = stack.pop()
+            for (k_s, i) in uses.get(s1, []):
+                rank = len(k_s[0])
+                for k_o in buckets.get((k_s[1], rank, i, s2), []):
+                    if (k_s, k_o) in done or not all((k_s[0][j], k_o[0][j]) in reached for j in range(rank)):
+                        continue
+                    done.add((k_s, k_o))
+                    NBTT._add_product_rules(k_s, first[k_s], k_o, second[k_o], union, new_transitions, reached, stack)
+        return (new_transitions, reached)
+
+    @staticmethod
+    def _add_product_rules(k_s: tuple, v_s: Iterable, k_o: tuple, v_o: Iterable, union: bool, new_transitions: dict, reached: set, stack: list):
+        """
+        Adds the rules that combine the rules of two keys to the product transitions
+
+        Args:
+            k_s: The key of the first transducer's rules
+            v_s: The first transducer's rules
+            k_o: The key of the second transducer's rules
+            v_o: The second transducer's rules
+            union: Whether the outputs of the sink state "%S%" are left out instead of the repeated outputs
+            new_transitions: The product transitions, which the new rules are added to
+            reached: The set of reached pairs of states, which the states of the new rules are added to
+            stack: The list of newly reached pairs of states, which the states of the new rules are added to
+        """
+        new_children = tuple([f"{k_s[0][i]}_{k_o[0][i]}" for i in range(len(k_s[0]))])
+        new_val = []
+        for s1 in v_s:
+            for s2 in v_o:
+                s = f"{s1[0]}_{s2[0]}"
+                if union:
+                    if s1[0] != "%S%":
+                        new_val.append((s, s1[1]))
+                    if s2[0] != "%S%":
+                        new_val.append((s, s2[1]))
+                else:
+                    new_val.append((s, s1[1]))
+                    if (s, s2[1]) not in new_val:
+                        new_val.append((s, s2[1]))
+                if (s1[0], s2[0]) not in reached:
+                    reached.add((s1[0], s2[0]))
+                    stack.append((s1[0], s2[0]))
+        new_transitions[(new_children, k_s[1])] = new_val
+
+    def domain(self) -> NBTA:
+        """
+        Returns an automaton that accepts exactly the input trees that have an output.
+        Epsilon transitions are removed by adding the epsilon closure of each rule's state to its destination states,
+        and states that no input tree reaches or that cannot lead to a final state are left out.
+
+        Returns:
+            NBTA: the domain of this bottom-up transducer
+        """
+        useful = self._get_useful_states()
+        new_transitions = dict()
+        for (children, symbol), rules in self.transitions.items():
+            if not symbol or not all(c in useful for c in children):
+                continue
+            dest_states = {s for rule in rules for s in self.epsilon_closure[rule[0]] if s in useful}
+            if dest_states:
+                new_transitions[(children, symbol)] = dest_states
+        return NBTA(useful | self.final_states, self.final_states, self.in_symbols, new_transitions)
+
+    def range(self) -> NBTA:
+        """
+        Returns an automaton that accepts the output trees of the transducer.
+        Each output template is split into one rule per node with new states for its inner nodes,
+        and rules whose template is a single variable are removed by passing their states up to the rules below them.
+        The automaton is exact for linear transducers. When a rule copies a variable the copies are checked independently,
+        so the automaton may also accept trees whose copies differ.
+
+        Returns:
+            NBTA: an automaton that accepts every output of this bottom-up transducer
+        """
+        useful = self._get_useful_states()
+        new_states = set(useful)
+        new_transitions = dict()
+        up = {s: {s} for s in useful}
+        for (children, symbol), rules in self.transitions.items():
+            if not all(c in useful for c in children):
+                continue
+            for (state, template) in rules:
+                if state not in useful:
+                    continue
+                if isinstance(template, VarLeaf):
+                    up[children[template.idx]].add(state)
+                else:
+                    self._add_template_rules(template, state, children, new_states, new_transitions)
+        #Every tree that reaches a state also reaches the states above it through variable-only rules
+        update = True
+        while update:
+            update = False
+            for s in useful:
+                closure = set().union(*[up[t] for t in up[s]])
+                if closure != up[s]:
+                    up[s] = closure
+                    update = True
+        for k, dest_states in new_transitions.items():
+            new_transitions[k] = set().union(*[up.get(d, {d}) for d in dest_states])
+        return NBTA(new_states | self.final_states, self.final_states, self.out_symbols, new_transitions)
+
+    def _add_template_rules(self, template: Tree, state, var_states: tuple, new_states: set, new_transitions: dict):
+        """
+        Adds the rules that check the shape of an output template to a bottom-up automaton
+
+        Args:
+            template: The template Tree
+            state: The state of the root of the template
+            var_states: A tuple containing the state of each variable of the template
+            new_states: The set of states of the automaton, which new states are added to
+            new_transitions: The transitions of the automaton, which new rules are added to
+        """
+        child_states = []
+        for c in template.children:
+            if isinstance(c, VarLeaf):
+                child_states.append(var_states[c.idx])
+            else:
+                child_state = f"{state}_%{len(new_states)}%"
+                new_states.add(child_state)
+                self._add_template_rules(c, child_state, var_states, new_states, new_transitions)
+                child_states.append(child_state)
+        new_transitions.setdefault((tuple(child_states), template.value), set()).add(state)
+
+    def _get_useful_states(self) -> set:
+        """
+        Finds the states that some input tree reaches and from which a final state can be reached
+
+        Returns:
+            set: The set of useful states
+        """
+        reached = set()
+        update = True
+        while update:
+            update = False
+            for (children, _), rules in self.transitions.items():
+                if all(c in reached for c in children):
+                    for rule in rules:
+                        if rule[0] not in reached:
+                            reached.add(rule[0])
+                            update = True
+        useful = self.final_states & reached
+        update = True
+        while update:
+            update = False
+            for (children, _), rules in self.transitions.items():
+                if all(c in reached for c in children) and any(rule[0] in useful for rule in rules):
+                    for c in children:
+                        if c not in useful:
+                            useful.add(c)
+                            update = True
+        return useful
+
+    def image(self, automaton: NBTA) -> NBTA:
+        """
+        Returns an automaton that accepts the outputs of every input tree accepted by another automaton.
+        It is the range of the composition of the automaton's identity transducer with this transducer.
+
+        Args:
+            automaton: The NBTA that accepts the input trees
+
+        Returns:
+            NBTA: an automaton that accepts the outputs of the accepted input trees
+
+        Raises:
+            ValueError: The transducer is not linear or has an epsilon cycle.
+        """
+        if not self.is_linear():
+            raise ValueError("image() requires a linear transducer.")
+        if self.epsilon_cycles:
+            raise ValueError("image() requires a transducer without epsilon cycles.")
+        return NBTT._identity(automaton).compose(self).range()
+
+    def preimage(self, automaton: NBTA) -> NBTA:
+        """
+        Returns an automaton that accepts the input trees that have at least one output accepted by another automaton.
+        It is the domain of the composition of this transducer with the automaton's identity transducer.
+
+        Args:
+            automaton: The NBTA that accepts the output trees
+
+        Returns:
+            NBTA: an automaton that accepts the input trees with an accepted output
+
+        Raises:
+            ValueError: The transducer is not linear or has an epsilon cycle.
+        """
+        if not self.is_linear():
+            raise ValueError("preimage() requires a linear transducer.")
+        if self.epsilon_cycles:
+            raise ValueError("preimage() requires a transducer without epsilon cycles.")
+        return self.compose(NBTT._identity(automaton)).domain()
+
+    @staticmethod
+    def _identity(automaton: NBTA) -> NBTT:
+        """
+        Returns a transducer that outputs the input tree unchanged if it is accepted by an automaton
+
+        Args:
+            automaton: The NBTA
+
+        Returns:
+            NBTT: the identity transducer of the automaton
+        """
+        new_transitions = dict()
+        for (children, symbol), dest_states in automaton.transitions.items():
+            #Rules with an empty symbol apply to every symbol with the same number of children
+            for s in [symbol] if symbol else automaton.symbols:
+                rules = new_transitions.setdefault((children, s), [])
+                for dest_state in dest_states:
+                    rule = (dest_state, Tree(s, [VarLeaf(i) for i in range(len(children))]))
+                    if rule not in rules:
+                        rules.append(rule)
+        new_final_states = {s for s in automaton.states if automaton.epsilon_closure[s] & automaton.final_states}
+        return NBTT(automaton.states, new_final_states, automaton.symbols, automaton.symbols, new_transitions)
+
+    def compose(self, other: NBTT) -> NBTT | Pipeline:
+        """
+        Returns a transducer that applies this transducer and then another transducer without building the intermediate trees.
+        A single NBTT is built when this transducer is linear or the other transducer is deterministic.
+        Otherwise, the copies of an intermediate subtree could be transduced differently by the other transducer,
+        which no bottom-up transducer can do, so a Pipeline of the two transducers is returned instead.
+        A Pipeline is also returned when either transducer has an epsilon cycle, since a cycle of one transducer's states
+        becomes a chain of different pairs of states in the composition and would be followed past the point where it is cut.
+        The states of the composition are the reachable pairs of states of the two transducers, where "%S%" marks the
+        state of an input subtree whose output is deleted by this transducer.
+
+        Args:
+            other: The transducer to be applied after this transducer
+
+        Returns:
+            NBTT | Pipeline: the composition of this bottom-up transducer and another transducer
+        """
+        deterministic = isinstance(other, NBTT) and all(len(v) <= 1 and k[1] for (k, v) in other.transitions.items())
+        if not isinstance(other, NBTT) or not (self.is_linear() or deterministic) or self.epsilon_cycles or other.epsilon_cycles:
+            return Pipeline([self, other])
+        #Deleted subtrees are still checked by this transducer but their outputs are never seen, so any constant output will do
+        placeholder = Tree(min(other.out_symbols, key=str)) if other.out_symbols else None
+        epsilon_paths = other.epsilon_paths
+        reached = {s: set() for s in self.states}
+        new_rules = set()
+        new_transitions = dict()
+        update = True
+        while update:
+            update = False
+            for (children, symbol), rules in self.transitions.items():
+                for (state, template) in rules:
+                    used = set(template.get_vars())
+                    options = []
+                    for i in range(len(children)):
+                        if i in used:
+                            options.append(sorted(reached[children[i]] - {"%S%"}, key=str))
+                        else:
+                            options.append(["%S%"] if "%S%" in reached[children[i]] else [])
+                    for child_states in product(*options):
+                        new_children = tuple(f"{children[i]}_{child_states[i]}" for i in range(len(children)))
+                        for (out_state, out_tree) in other._run_on_template(template, child_states, epsilon_paths):
+                            rule = ((new_children, symbol), (f"{state}_{out_state}", out_tree))
+                            if rule not in new_rules:
+                                new_rules.add(rule)
+                                new_transitions.setdefault(rule[0], []).append(rule[1])
+                                reached[state].add(out_state)
+                                update = True
+                    if placeholder is not None and all("%S%" in reached[c] for c in children):
+                        rule = ((tuple(f"{c}_%S%" for c in children), symbol), (f"{state}_%S%", placeholder))
+                        if rule not in new_rules:
+                            new_rules.add(rule)
+                            new_transitions.setdefault(rule[0], []).append(rule[1])
+                            reached[state].add("%S%")
+                            update = True
+        new_states = {f"{s1}_{s2}" for s1 in reached for s2 in reached[s1]}
+        new_final_states = {f"{s1}_{s2}" for s1 in self.final_states for s2 in reached[s1] if s2 in other.final_states}
+        return NBTT(new_states, new_final_states, self.in_symbols, other.out_symbols, new_transitions)
+
+    def _run_on_template(self, template: Tree, var_states: tuple, epsilon_paths: dict) -> list:
+        """
+        Runs the transducer over an output template whose variables have already been given states
+
+        Args:
+            template: The template Tree
+            var_states: A tuple containing the state of each variable of the template
+            epsilon_paths: The epsilon paths of the transducer as found by _get_epsilon_paths()
+
+        Returns:
+            list: A list of tuples each containing a state of the template and its output template
+        """
+        if isinstance(template, VarLeaf):
+            #The epsilon transitions at a variable were already applied to the subtree that fills it
+            return [(var_states[template.idx], VarLeaf(template.idx))]
+        child_results = [self._run_on_template(c, var_states, epsilon_paths) for c in template.children]
+        results = []
+        for child_combination in product(*child_results):
+            key = (tuple(c[0] for c in child_combination), template.value)
+            for (state, out_tree) in self.transitions.get(key, []):
+                results.append((state, out_tree.fill(tuple(c[1] for c in child_combination))))
+        for (state, out_tree) in list(results):
+            for (to_state, path_tree, _) in epsilon_paths[state]:
+                results.append((to_state, path_tree.fill((out_tree,))))
+        return results
+
     def __eq__(self, other: object) -> bool:
         if isinstance(other, NBTT):
             return self.states == other.states and \
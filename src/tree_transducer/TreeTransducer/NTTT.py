@@ -4,15 +4,20 @@ Non-deterministic finite-state top-down tree transducer module
 from __future__ import annotations
 from collections.abc import Iterable
 from .TreeTransducer import TreeTransducer
-from ..Tree import Tree, VarLeaf
+from .OutputForest import OutputForest
+from .Pipeline import Pipeline
+from ..Tree import Tree, VarLeaf, SubtreeIndex, Template
+from ..TreeAutomaton.NTTA import NTTA
+from ..Budget import Budget
 from itertools import product, chain
+from math import prod
 import copy
 
 class NTTT(TreeTransducer):
     """
     Non-deterministic finite-state bottom-up tree transducer class
     """
-    def __init__(self, states: Iterable, final_states: Iterable, in_symbols: Iterable, out_symbols: Iterable, transitions: dict):
+    def __init__(self, states: Iterable, final_states: Iterable, in_symbols: Iterable, out_symbols: Iterable, transitions: dict, dag: bool = False):
         """
         Creates a tree transducer
 
@@ -22,9 +27,18 @@ class NTTT(TreeTransducer):
             in_symbols: An Iterable containing the set of input symbols (F)
             out_symbols: An Iterable containing the set of output symbols (F')
             transitions: A dict containing the transitions (Delta)
+            dag: Whether the output trees are DagTrees that share the subtrees copied by rules instead of plain Trees
         """
         super().__init__(states, final_states, in_symbols, out_symbols, transitions)
+        self.dag = dag
         self.epsilon_closure = self.get_epsilon_closure()
+        self.compiled_transitions = {k: [(rule[0], Template(rule[1], dag)) for rule in v] for (k, v) in self.transitions.items()}
+        #Epsilon chains are composed once here so following them at run time is a table lookup
+        self.epsilon_paths, self.epsilon_cycles = self._get_epsilon_paths()
+        #Rules and epsilon paths that end in a state with no output can never succeed, so they are dropped before any run
+        self.productive_states = self.get_productive_states()
+        self.live_transitions = self._get_live_transitions()
+        self.compiled_epsilon_paths = {s: [(path[0], Template(path[1], dag), path[2]) for path in paths if path[0] in self.productive_states] for (s, paths) in self.epsilon_paths.items()}
 
     def _validate_input(self):
         """
@@ -55,49 +69,311 @@ class NTTT(TreeTransducer):
         if not transitions_out_symbols.issubset(self.out_symbols):
             raise ValueError(f"Transducer's transitions contain output symbol(s) not present in its input out_symbols: {transitions_out_symbols - self.out_symbols}")
 
-    def transduce(self, tree: Tree) -> Tree:
+    def transduce(self, tree: Tree, budget: Budget = None) -> Tree:
         """
         Transduces the input Tree.
+        The outputs of each (state, distinct input subtree) pair are computed once and shared by every rule and epsilon path that reaches it.
+        Epsilon transitions are followed along paths that do not repeat a state.
 
         Args: 
             tree: The Tree to be transduced.
+            budget: The Budget charged for each (state, input subtree) pair and for each output before it is built, or None for no limits
 
         Returns:
             Tree: The set of new Trees made by applying the transduction to the input Tree
+
+        Raises:
+            BudgetExceeded: The transduction ran over its budget.
         """
-        return set.union(*[self._transduce_helper(final_state, tree) for final_state in self.final_states])
+        index = SubtreeIndex()
+        root_id = index.get_id(tree)
+        epsilon_paths = self.compiled_epsilon_paths
+        base_memo = dict()
+        memo = dict()
+        return set().union(*[self._transduce_helper(final_state, root_id, index, epsilon_paths, base_memo, memo, budget) for final_state in self.final_states])
 
-    def _transduce_helper(self, state, in_tree: Tree) -> set:
+    def _transduce_helper(self, state, tree_id: int, index: SubtreeIndex, epsilon_paths: dict, base_memo: dict, memo: dict, budget: Budget = None) -> set:
         """
         Recursive helper for transduce()
 
         Args:
             state: The state of the tree.
-            tree: The Tree to be transduced.
+            tree_id: The id of the Tree to be transduced in the SubtreeIndex
+            index: The SubtreeIndex of the input
+            epsilon_paths: The epsilon paths of the transducer as found by _get_epsilon_paths()
+            base_memo: A dict mapping (state, tree id) pairs to their outputs made without epsilon transitions
+            memo: A dict mapping (state, tree id) pairs to all of their outputs
+            budget: The Budget of the transduction, or None for no limits
 
         Returns:
             set: The set of filled output Trees
         """
-        num_in_children = len(in_tree.children)
-        outs = self.transitions.get((state, in_tree.value, num_in_children), set())
-        outs_e = self.transitions.get((state, "", 1), set())
-        if outs == set() and outs_e == set():
-            return set()
-        filled = set()
-        for (child_states, out_tree) in outs:
-            child_trees = [self._transduce_helper(child_states[i], in_tree.children[i]) for i in range(num_in_children)]
-            if set() in child_trees:
-                continue
-            child_combinations = list(product(*child_trees))
-            out_trees = {out_tree.fill(child_combination) for child_combination in child_combinations}
-            filled.update(out_trees)
-        for (child_state, out_tree) in outs_e:
-            child_trees = self._transduce_helper(next(iter(child_state)), in_tree)
-            if child_trees == set():
+        key = (state, tree_id)
+        if key not in memo:
+            filled = set(self._transduce_base(state, tree_id, index, epsilon_paths, base_memo, memo, budget))
+            for (to_state, out_tree, rules) in epsilon_paths[state]:
+                child_trees = self._transduce_base(to_state, tree_id, index, epsilon_paths, base_memo, memo, budget)
+                if budget is not None:
+                    budget.add_outputs(len(child_trees))
+                filled.update(out_tree.fill((child_tree,)) for child_tree in child_trees)
+                if self.profiler is not None:
+                    self._profile_epsilon(rules, len(child_trees))
+            if self.profiler is not None:
+                self.profiler.peak("outputs", len(filled))
+            memo[key] = filled
+        return memo[key]
+
+    def _transduce_base(self, state, tree_id: int, index: SubtreeIndex, epsilon_paths: dict, base_memo: dict, memo: dict, budget: Budget = None) -> set:
+        """
+        Finds the outputs of a tree in a state that are made without an epsilon transition at its root
+
+        Args:
+            state: The state of the tree.
+            tree_id: The id of the Tree to be transduced in the SubtreeIndex
+            index: The SubtreeIndex of the input
+            epsilon_paths: The epsilon paths of the transducer as found by _get_epsilon_paths()
+            base_memo: A dict mapping (state, tree id) pairs to their outputs made without epsilon transitions
+            memo: A dict mapping (state, tree id) pairs to all of their outputs
+            budget: The Budget of the transduction, or None for no limits
+
+        Returns:
+            set: The set of filled output Trees
+        """
+        key = (state, tree_id)
+        if key not in base_memo:
+            if budget is not None:
+                budget.visit()
+            value, child_ids = index.nodes[tree_id]
+            rule_key = (state, value, len(child_ids))
+            filled = set()
+            for (rule, out_tree, order) in self.live_transitions.get(rule_key, []):
+                child_trees = [None] * len(child_ids)
+                for i in order:
+                    child_trees[i] = self._transduce_helper(rule[0][i], child_ids[i], index, epsilon_paths, base_memo, memo, budget)
+                    if not child_trees[i]:
+                        break
+                else:
+                    if self.profiler is not None:
+                        self._profile_rule(rule_key, rule, child_trees)
+                    if budget is not None:
+                        budget.add_outputs(prod(len(out_trees) for out_trees in child_trees))
+                    filled.update(out_tree.fill(child_combination) for child_combination in product(*child_trees))
+            if self.profiler is not None:
+                self.profiler.count("lookups")
+            base_memo[key] = filled
+        return base_memo[key]
+
+    def _profile_rule(self, key: tuple, rule: tuple, child_trees: list):
+        """
+        Records the hit and combinations of a rule applied at a node with the transducer's profiler
+
+        Args:
+            key: The key of the rule
+            rule: The rule
+            child_trees: A list containing the set of outputs of each child that the rule combines
+        """
+        combinations = 1
+        for out_trees in child_trees:
+            combinations *= len(out_trees)
+        self.profiler.count("combinations", combinations)
+        self.profiler.hit((key, rule))
+
+    def _profile_epsilon(self, rules: tuple, expansions: int):
+        """
+        Records the rule hits and expansions of an epsilon path followed at a node with the transducer's profiler
+
+        Args:
+            rules: The tuple of (key, rule) tuples of the epsilon path
+            expansions: The number of outputs the path was applied to
+        """
+        self.profiler.count("epsilon_expansions", expansions)
+        for rule in rules:
+            self.profiler.hit(rule)
+
+    def transduce_forest(self, tree: Tree) -> OutputForest:
+        """
+        Transduces the input Tree into a packed forest of its outputs without building the output trees.
+        The forest has one node for each (state, distinct input subtree) pair that has an output, so its size is polynomial in the size of the input.
+        Epsilon transitions are followed along paths that do not repeat a state.
+
+        Args:
+            tree: The Tree to be transduced.
+
+        Returns:
+            OutputForest: The forest of the output trees
+        """
+        forest = OutputForest(self.dag)
+        index = SubtreeIndex()
+        root_id = index.get_id(tree)
+        epsilon_paths = self.epsilon_paths
+        base_nodes = dict()
+        closed_nodes = dict()
+        roots = [self._closed_forest_node(s, root_id, forest, index, epsilon_paths, base_nodes, closed_nodes) for s in sorted(self.final_states, key=str)]
+        forest.roots = [root for root in roots if root is not None]
+        return forest
+
+    def _closed_forest_node(self, state, input_id: int, forest: OutputForest, index: SubtreeIndex, epsilon_paths: dict, base_nodes: dict, closed_nodes: dict):
+        """
+        Finds the forest node of all the outputs of an input subtree in a state, adding it to the forest if needed
+
+        Args:
+            state: The state of the input subtree
+            input_id: The id of the input subtree
+            forest: The forest
+            index: The SubtreeIndex of the input
+            epsilon_paths: The epsilon paths of the transducer as found by _get_epsilon_paths()
+            base_nodes: A dict mapping (state, input id) pairs to the nodes of the outputs made without epsilon transitions
+            closed_nodes: A dict mapping (state, input id) pairs to the nodes of all their outputs
+
+        Returns:
+            The id of the node, or None if the input subtree has no output in the state
+        """
+        key = (state, input_id)
+        if key not in closed_nodes:
+            alternatives = []
+            node = self._base_forest_node(state, input_id, forest, index, epsilon_paths, base_nodes, closed_nodes)
+            if node is not None:
+                alternatives.append((VarLeaf(0), (node,), ()))
+            for (to_state, template, rules) in epsilon_paths[state]:
+                node = self._base_forest_node(to_state, input_id, forest, index, epsilon_paths, base_nodes, closed_nodes)
+                if node is not None:
+                    alternatives.append((template, (node,), rules))
+            if not alternatives:
+                closed_nodes[key] = None
+            elif len(alternatives) == 1 and not alternatives[0][2]:
+                closed_nodes[key] = alternatives[0][1][0]
+            else:
+                closed_nodes[key] = forest.add_node(key)
+                for alternative in alternatives:
+                    forest.add_alternative(closed_nodes[key], *alternative)
+        return closed_nodes[key]
+
+    def _base_forest_node(self, state, input_id: int, forest: OutputForest, index: SubtreeIndex, epsilon_paths: dict, base_nodes: dict, closed_nodes: dict):
+        """
+        Finds the forest node of the outputs of an input subtree in a state made without epsilon transitions at its root, adding it to the forest if needed
+
+        Args:
+            state: The state of the input subtree
+            input_id: The id of the input subtree
+            forest: The forest
+            index: The SubtreeIndex of the input
+            epsilon_paths: The epsilon paths of the transducer as found by _get_epsilon_paths()
+            base_nodes: A dict mapping (state, input id) pairs to the nodes of the outputs made without epsilon transitions
+            closed_nodes: A dict mapping (state, input id) pairs to the nodes of all their outputs
+
+        Returns:
+            The id of the node, or None if the input subtree has no such output in the state
+        """
+        key = (state, input_id)
+        if key not in base_nodes:
+            value, child_ids = index.nodes[input_id]
+            alternatives = []
+            rule_key = (state, value, len(child_ids))
+            for (rule, _, order) in self.live_transitions.get(rule_key, []):
+                children = [None] * len(child_ids)
+                for i in order:
+                    children[i] = self._closed_forest_node(rule[0][i], child_ids[i], forest, index, epsilon_paths, base_nodes, closed_nodes)
+                    if children[i] is None:
+                        break
+                else:
+                    alternatives.append((rule[1], tuple(children), ((rule_key, rule),)))
+            base_nodes[key] = forest.add_node(key) if alternatives else None
+            for alternative in alternatives:
+                forest.add_alternative(base_nodes[key], *alternative)
+        return base_nodes[key]
+
+    def _get_epsilon_paths(self) -> tuple:
+        """
+        Finds the chains of epsilon transitions that start at each state and do not repeat a state.
+        The output templates along each chain are composed into one template, and only the first chain found for each
+        (state at the end, composed template) pair is followed, so the number of chains is bounded by the distinct outputs
+        they make rather than by the number of paths through the epsilon rules.
+        Cycles would produce infinitely many outputs if they were followed, so they are reported instead.
+        Cycles whose composed template is a single variable only repeat outputs and are not reported.
+        The rules are followed in the order of their string forms, so the chains are the same in every process.
+
+        Returns:
+            tuple: A tuple containing a dict mapping each state to a list of tuples each containing the state at the end of a chain, the composed template and the tuple of (key, value) rules in the chain,
+            and a list of tuples each containing the states of a productive cycle and its composed template
+        """
+        epsilon_paths = dict()
+        for start in self.states:
+            paths = []
+            found = set()
+            stack = [(start, VarLeaf(0), (), {start})]
+            while stack:
+                state, template, rules, visited = stack.pop()
+                key = (state, "", 1)
+                for rule in sorted(self.transitions.get(key, set()), key=str):
+                    to_state = rule[0][0]
+                    if to_state in visited:
+                        continue
+                    path = (to_state, template.fill((rule[1],)), rules + ((key, rule),))
+                    if path[:2] in found:
+                        continue
+                    found.add(path[:2])
+                    paths.append(path)
+                    stack.append(path + (visited | {to_state},))
+            epsilon_paths[start] = paths
+        return (epsilon_paths, self._get_epsilon_cycles())
+
+    def _get_epsilon_cycles(self) -> list:
+        """
+        Finds the productive cycles of epsilon transitions.
+        A cycle is found through each epsilon rule whose template is not a single variable and whose state can be reached again
+        from the state it leads to. The rest of the cycle is the shortest chain of epsilon transitions back.
+
+        Returns:
+            list: A list of tuples each containing the states of a productive cycle, starting at its smallest state, and its composed template
+        """
+        epsilon_cycles = []
+        for (key, rules) in self.transitions.items():
+            if key[1] or key[2] != 1:
                 continue
-            out_trees = {out_tree.fill((child_tree,)) for child_tree in child_trees}
-            filled.update(out_trees)
-        return filled
+            for rule in rules:
+                steps = None if isinstance(rule[1], VarLeaf) else self._get_epsilon_chain(rule[0][0], key[0])
+                if steps is None:
+                    continue
+                cycle = [(key, rule)] + steps
+                first = min(range(len(cycle)), key=lambda i: str(cycle[i][0][0]))
+                cycle = cycle[first:] + cycle[:first]
+                template = VarLeaf(0)
+                for (_, cycle_rule) in cycle:
+                    template = template.fill((cycle_rule[1],))
+                epsilon_cycle = (tuple(k[0] for (k, _) in cycle), template)
+                if epsilon_cycle not in epsilon_cycles:
+                    epsilon_cycles.append(epsilon_cycle)
+        return epsilon_cycles
+
+    def _get_epsilon_chain(self, start, end) -> list:
+        """
+        Finds a shortest chain of epsilon transitions from one state to another with a breadth-first search
+
+        Args:
+            start: The state at the start of the chain
+            end: The state at the end of the chain
+
+        Returns:
+            list: The list of (key, value) rules in the chain, which is empty if start is end, or None if there is no chain
+        """
+        parents = {start: None}
+        queue = [start]
+        i = 0
+        while end not in parents:
+            if i == len(queue):
+                return None
+            key = (queue[i], "", 1)
+            for rule in sorted(self.transitions.get(key, set()), key=str):
+                if rule[0][0] not in parents:
+                    parents[rule[0][0]] = (queue[i], (key, rule))
+                    queue.append(rule[0][0])
+            i += 1
+        rules = []
+        state = end
+        while parents[state] is not None:
+            state, step = parents[state]
+            rules.append(step)
+        return rules[::-1]
 
     def get_epsilon_closure(self) -> dict:
         """
@@ -149,42 +425,353 @@ class NTTT(TreeTransducer):
             {(f"2_{k[0]}",k[1],k[2]):{(tuple(f"2_{s}" for s in vi[0]),vi[1]) for vi in v} for k,v in other.transitions.items()}
         return NTTT(new_states, new_final_states, new_in_symbols, new_out_symbols, new_transitions)
 
-    def intersection(self, other: NTTT) -> NTTT:
+    def intersection(self, other: NTTT, budget: Budget = None) -> NTTT:
         """
         Returns the intersection of this top-down transducer and another top-down transducer.
-        The states and transitions are the products of the input automata.
+        The states and transitions are the products of the input automata, explored downwards from the pairs of initial states
+        so that only reachable pairs of states are created and each rule of a state is only combined with the rules of the other state for the same symbol and rank.
         An NTTT is always returned even if both input transducers are deterministic.
 
+        Args:
+            other: The other transducer
+            budget: The Budget charged for each reached pair of states and for the product states, or None for no limits
+
         Returns:
             NTTT: the intersection of this top-down transducer and another top-down transducer
+
+        Raises:
+            BudgetExceeded: The construction ran over its budget.
         """
-        state_pairs = [(s1, s2) for s1 in self.states for s2 in other.states]
+        self_keys = dict()
+        for k in self.transitions:
+            self_keys.setdefault(k[0], []).append(k)
         new_transitions = dict()
-        for (s1,s2) in state_pairs:
-            for self_key, self_val in self.transitions.items():
-                if self_key[0] != s1:
+        stack = [(s1, s2) for s1 in self.final_states for s2 in other.final_states]
+        reached = set(stack)
+        while stack:
+            if budget is not None:
+                budget.visit()
+                budget.check_states(len(reached))
+            (s1, s2) = stack.pop()
+            for self_key in self_keys.get(s1, []):
+                other_val = other.transitions.get((s2, self_key[1], self_key[2]))
+                if not other_val:
                     continue
-                symbol = self_key[1]
-                rank = self_key[2]
-                for other_key, other_val in other.transitions.items():
-                    if other_key[1] != symbol or other_key[2] != rank:
-                        continue
-                    new_children_set = set()
-                    for s_tup in self_val:
-                        for o_tup in other_val:
-                            if rank == 0:
-                                new_children_set.add((tuple(), s_tup[1]))
-                                new_children_set.add((tuple(), o_tup[1]))
-                            for i in range(rank):
-                                new_children_set.add((tuple([f"{s_tup[0][i]}_{o_tup[0][i]}"]), s_tup[1]))
-                                new_children_set.add((tuple([f"{s_tup[0][i]}_{o_tup[0][i]}"]), o_tup[1]))
-                    new_transitions[(f"{s1}_{s2}", symbol, rank)] = new_children_set
-        new_states = [f"{s1}_{s2}" for s1 in self.states for s2 in other.states]
+                new_children_set = set()
+                for s_tup in self.transitions[self_key]:
+                    for o_tup in other_val:
+                        child_pairs = tuple(zip(s_tup[0], o_tup[0]))
+                        new_children = tuple(f"{c1}_{c2}" for (c1, c2) in child_pairs)
+                        new_children_set.add((new_children, s_tup[1]))
+                        new_children_set.add((new_children, o_tup[1]))
+                        for pair in child_pairs:
+                            if pair not in reached:
+                                reached.add(pair)
+                                stack.append(pair)
+                new_transitions[(f"{s1}_{s2}", self_key[1], self_key[2])] = new_children_set
+        new_states = [f"{s1}_{s2}" for (s1, s2) in reached]
         new_final_states = [f"{s1}_{s2}" for s1 in self.final_states for s2 in other.final_states]
         new_in_symbols = self.in_symbols.union(other.in_symbols)
         new_out_symbols = self.out_symbols.union(other.out_symbols)
         return NTTT(new_states, new_final_states, new_in_symbols, new_out_symbols, new_transitions)
 
+    def domain(self) -> NTTA:
+        """
+        Returns an automaton that accepts exactly the input trees that have an output.
+        Epsilon transitions are removed by giving each state the rules of the states it reaches with epsilon transitions,
+        and states that accept no input tree or that cannot be reached from an initial state are left out.
+
+        Returns:
+            NTTA: the domain of this top-down transducer
+        """
+        useful = self._get_useful_states()
+        epsilon_paths = self.epsilon_paths
+        new_transitions = dict()
+        for state in useful:
+            for to_state in {state} | {path[0] for path in epsilon_paths[state]}:
+                for (k, v) in self.transitions.items():
+                    if k[0] != to_state or not k[1]:
+                        continue
+                    child_states = {rule[0] for rule in v if all(c in useful for c in rule[0])}
+                    if child_states:
+                        new_key = (state, k[1], k[2])
+                        new_transitions[new_key] = new_transitions.get(new_key, set()) | child_states
+        return NTTA(useful | self.final_states, self.final_states, self.in_symbols, new_transitions)
+
+    def range(self) -> NTTA:
+        """
+        Returns an automaton that accepts the output trees of the transducer.
+        Each output template is split into one rule per node with new states for its inner nodes,
+        and rules whose template is a single variable are removed by giving their states the rules of the variable's state.
+        The automaton is exact for linear transducers. When a rule copies a variable the copies are checked independently,
+        so the automaton may also accept trees whose copies differ.
+
+        Returns:
+            NTTA: an automaton that accepts every output of this top-down transducer
+        """
+        useful = self._get_useful_states()
+        new_states = set(useful)
+        template_transitions = dict()
+        down = {s: {s} for s in useful}
+        for (k, v) in self.transitions.items():
+            if k[0] not in useful:
+                continue
+            for (child_states, template) in v:
+                if not all(c in useful for c in child_states):
+                    continue
+                if isinstance(template, VarLeaf):
+                    down[k[0]].add(child_states[template.idx])
+                else:
+                    self._add_template_rules(template, k[0], child_states, new_states, template_transitions)
+        #A state produces every output of the states below it through variable-only rules
+        update = True
+        while update:
+            update = False
+            for s in useful:
+                closure = set().union(*[down[t] for t in down[s]])
+                if closure != down[s]:
+                    down[s] = closure
+                    update = True
+        up = dict()
+        for s in useful:
+            for t in down[s]:
+                up.setdefault(t, set()).add(s)
+        new_transitions = dict()
+        for (k, v) in template_transitions.items():
+            for state in up.get(k[0], {k[0]}):
+                new_key = (state, k[1], k[2])
+                new_transitions[new_key] = new_transitions.get(new_key, set()) | v
+        return NTTA(new_states | self.final_states, self.final_states, self.out_symbols, new_transitions)
+
+    def _add_template_rules(self, template: Tree, state, var_states: tuple, new_states: set, new_transitions: dict):
+        """
+        Adds the rules that check the shape of an output template to a top-down automaton
+
+        Args:
+            template: The template Tree
+            state: The state of the root of the template
+            var_states: A tuple containing the state of each variable of the template
+            new_states: The set of states of the automaton, which new states are added to
+            new_transitions: The transitions of the automaton, which new rules are added to
+        """
+        child_states = []
+        for c in template.children:
+            if isinstance(c, VarLeaf):
+                child_states.append(var_states[c.idx])
+            else:
+                child_state = f"{state}_%{len(new_states)}%"
+                new_states.add(child_state)
+                self._add_template_rules(c, child_state, var_states, new_states, new_transitions)
+                child_states.append(child_state)
+        new_key = (state, template.value, len(child_states))
+        new_transitions[new_key] = new_transitions.get(new_key, set()) | {tuple(child_states)}
+
+    def get_productive_states(self) -> set:
+        """
+        Finds the states that have an output for at least one input tree
+
+        Returns:
+            set: The set of productive states
+        """
+        productive = set()
+        update = True
+        while update:
+            update = False
+            for (k, v) in self.transitions.items():
+                if k[0] not in productive and any(all(c in productive for c in rule[0]) for rule in v):
+                    productive.add(k[0])
+                    update = True
+        return productive
+
+    def _get_live_transitions(self) -> dict:
+        """
+        Finds the compiled rules of each (state, symbol, arity) whose child states are all productive.
+        The children of each rule are ordered so that the child whose state matches the fewest (symbol, arity) pairs,
+        directly or through its epsilon paths, is transduced first, since it is the most likely to have no output.
+        The rules of each key are sorted by their string form, since the order of a set of rules depends on string hashing.
+
+        Returns:
+            dict: A dict mapping (state, symbol, arity) keys to lists of tuples each containing a rule, its compiled Template and the order in which its children are transduced
+        """
+        productive = self.productive_states
+        key_counts = dict()
+        for k in self.transitions:
+            if k[1] and k[0] in productive:
+                key_counts[k[0]] = key_counts.get(k[0], 0) + 1
+        selectivity = {s: key_counts.get(s, 0) + sum(key_counts.get(path[0], 0) for path in self.epsilon_paths[s]) for s in self.states}
+        live_transitions = dict()
+        for (k, v) in self.transitions.items():
+            if k[0] not in productive:
+                continue
+            rules = []
+            for (rule, compiled) in sorted(zip(v, self.compiled_transitions[k]), key=lambda pair: str(pair[0])):
+                if all(c in productive for c in rule[0]):
+                    rules.append((rule, compiled[1], tuple(sorted(range(len(rule[0])), key=lambda c: selectivity[rule[0][c]]))))
+            if rules:
+                live_transitions[k] = rules
+        return live_transitions
+
+    def _get_useful_states(self) -> set:
+        """
+        Finds the states that accept some input tree and that can be reached from an initial state
+
+        Returns:
+            set: The set of useful states
+        """
+        productive = self.productive_states
+        useful = set()
+        stack = list(self.final_states & productive)
+        while stack:
+            state = stack.pop()
+            if state in useful:
+                continue
+            useful.add(state)
+            for (k, v) in self.transitions.items():
+                if k[0] == state:
+                    for rule in v:
+                        if all(c in productive for c in rule[0]):
+                            stack.extend(rule[0])
+        return useful
+
+    def image(self, automaton: NTTA) -> NTTA:
+        """
+        Returns an automaton that accepts the outputs of every input tree accepted by another automaton.
+        It is the range of the composition of the automaton's identity transducer with this transducer.
+
+        Args:
+            automaton: The NTTA that accepts the input trees
+
+        Returns:
+            NTTA: an automaton that accepts the outputs of the accepted input trees
+
+        Raises:
+            ValueError: The transducer is not linear or has an epsilon cycle.
+        """
+        if not self.is_linear():
+            raise ValueError("image() requires a linear transducer.")
+        if self.epsilon_cycles:
+            raise ValueError("image() requires a transducer without epsilon cycles.")
+        return NTTT._identity(automaton).compose(self).range()
+
+    def preimage(self, automaton: NTTA) -> NTTA:
+        """
+        Returns an automaton that accepts the input trees that have at least one output accepted by another automaton.
+        It is the domain of the composition of this transducer with the automaton's identity transducer.
+
+        Args:
+            automaton: The NTTA that accepts the output trees
+
+        Returns:
+            NTTA: an automaton that accepts the input trees with an accepted output
+
+        Raises:
+            ValueError: The transducer is not linear or has an epsilon cycle.
+        """
+        if not self.is_linear():
+            raise ValueError("preimage() requires a linear transducer.")
+        if self.epsilon_cycles:
+            raise ValueError("preimage() requires a transducer without epsilon cycles.")
+        return self.compose(NTTT._identity(automaton)).domain()
+
+    @staticmethod
+    def _identity(automaton: NTTA) -> NTTT:
+        """
+        Returns a transducer that outputs the input tree unchanged if it is accepted by an automaton
+
+        Args:
+            automaton: The NTTA
+
+        Returns:
+            NTTT: the identity transducer of the automaton
+        """
+        new_transitions = dict()
+        for (k, v) in automaton.transitions.items():
+            if k[1]:
+                new_transitions[k] = {(child_states, Tree(k[1], [VarLeaf(i) for i in range(k[2])])) for child_states in v}
+            else:
+                new_transitions[k] = {(child_states, VarLeaf(0)) for child_states in v}
+        return NTTT(automaton.states, automaton.final_states, automaton.symbols, automaton.symbols, new_transitions)
+
+    def compose(self, other: NTTT) -> NTTT | Pipeline:
+        """
+        Returns a transducer that applies this transducer and then another transducer without building the intermediate trees.
+        A single NTTT is built when this transducer is linear.
+        Otherwise, the copies of an intermediate subtree could be read in different states by the other transducer,
+        which no top-down transducer can do, so a Pipeline of the two transducers is returned instead.
+        A Pipeline is also returned when either transducer has an epsilon cycle, since a cycle of one transducer's states
+        becomes a chain of different pairs of states in the composition and would be followed past the point where it is cut.
+        The states of the composition are the reachable pairs of states of the two transducers, where "%S%" marks the
+        state of an input subtree whose output is deleted by this transducer.
+
+        Args:
+            other: The transducer to be applied after this transducer
+
+        Returns:
+            NTTT | Pipeline: the composition of this top-down transducer and another transducer
+        """
+        if not isinstance(other, NTTT) or not self.is_linear() or self.epsilon_cycles or other.epsilon_cycles:
+            return Pipeline([self, other])
+        #Deleted subtrees are still checked by this transducer but their outputs are never seen, so any constant output will do
+        placeholder = Tree(min(other.out_symbols, key=str)) if other.out_symbols else None
+        epsilon_paths = other.epsilon_paths
+        new_transitions = dict()
+        new_final_states = {f"{s1}_{s2}" for s1 in self.final_states for s2 in other.final_states}
+        stack = [(s1, s2) for s1 in self.final_states for s2 in other.final_states]
+        new_states = set()
+        while stack:
+            (s1, s2) = stack.pop()
+            state = f"{s1}_{s2}"
+            if state in new_states:
+                continue
+            new_states.add(state)
+            for (k, v) in self.transitions.items():
+                if k[0] != s1:
+                    continue
+                for (child_states, template) in v:
+                    if s2 == "%S%":
+                        if placeholder is None:
+                            continue
+                        results = [(placeholder, dict())]
+                    else:
+                        results = other._run_on_template(s2, template, epsilon_paths)
+                    for (out_tree, var_states) in results:
+                        new_children = [(child_states[i], var_states.get(i, "%S%")) for i in range(len(child_states))]
+                        stack.extend(new_children)
+                        new_key = (state, k[1], k[2])
+                        new_transitions[new_key] = new_transitions.get(new_key, set()) | {(tuple(f"{c1}_{c2}" for (c1, c2) in new_children), out_tree)}
+        new_final_states &= new_states
+        return NTTT(new_states, new_final_states, self.in_symbols, other.out_symbols, new_transitions)
+
+    def _run_on_template(self, state, template: Tree, epsilon_paths: dict, epsilon: bool = True) -> list:
+        """
+        Runs the transducer over an output template, finding the state in which each variable of the template is read
+
+        Args:
+            state: The state of the template
+            template: The template Tree
+            epsilon_paths: The epsilon paths of the transducer as found by _get_epsilon_paths()
+            epsilon: Whether epsilon transitions may be applied at the root of the template
+
+        Returns:
+            list: A list of tuples each containing an output template and a dict mapping the variables of the template to their states
+        """
+        if isinstance(template, VarLeaf):
+            #The epsilon transitions at a variable are applied to the subtree that fills it
+            return [(VarLeaf(template.idx), {template.idx: state})]
+        results = []
+        for (child_states, out_tree) in self.transitions.get((state, template.value, len(template.children)), set()):
+            child_results = [self._run_on_template(child_states[i], template.children[i], epsilon_paths) for i in range(len(child_states))]
+            for child_combination in product(*child_results):
+                var_states = dict()
+                for c in child_combination:
+                    var_states.update(c[1])
+                results.append((out_tree.fill(tuple(c[0] for c in child_combination)), var_states))
+        if epsilon:
+            for (to_state, path_tree, _) in epsilon_paths[state]:
+                for (out_tree, var_states) in self._run_on_template(to_state, template, epsilon_paths, False):
+                    results.append((path_tree.fill((out_tree,)), var_states))
+        return results
+
     def __eq__(self, other: object) -> bool:
         if isinstance(other, NTTT):
             return self.states == other.states and \
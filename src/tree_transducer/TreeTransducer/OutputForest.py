@@ -0,0 +1,459 @@
+"""
+Packed output forest module
+"""
+from __future__ import annotations
+from collections.abc import Iterator
+from ..Tree import Tree, VarLeaf, Template
+from ..Semiring import Semiring
+from itertools import product
+import heapq
+
+class OutputForest:
+    """
+    Packed forest of the output trees of a transduction.
+    Each node stands for the outputs of one (state, input subtree) pair and holds a list of alternatives.
+    Each alternative is a tuple containing an output template, a tuple of the child nodes that fill its variables,
+    the tuple of (key, value) transition rules it applies, the set of variable indices used by the template,
+    and the compiled template.
+    The forest is acyclic and its size is bounded by the size of the input times the size of the transducer,
+    however many output trees it contains.
+    """
+    def __init__(self, dag: bool = False):
+        """
+        Creates an empty forest
+
+        Args:
+            dag: Whether the output trees built from the forest are DagTrees instead of plain Trees
+        """
+        self.dag = dag
+        self.nodes = []
+        self.labels = []
+        self.roots = []
+        self._compiled = dict()
+
+    def add_node(self, label) -> int:
+        """
+        Adds a node without alternatives
+
+        Args:
+            label: The label of the node, usually a (state, input subtree id) tuple
+
+        Returns:
+            int: The id of the new node
+        """
+        self.nodes.append([])
+        self.labels.append(label)
+        return len(self.nodes) - 1
+
+    def add_alternative(self, node: int, template: Tree, children: tuple, rules: tuple = ()):
+        """
+        Adds an alternative to a node
+
+        Args:
+            node: The id of the node
+            template: The output template of the alternative
+            children: A tuple containing the ids of the nodes whose outputs fill the template's variables
+            rules: A tuple containing the (key, value) transition rules applied by the alternative
+        """
+        #Templates are usually shared by many alternatives, so each one is only compiled once
+        compiled = self._compiled.get(id(template))
+        if compiled is None or compiled.tree is not template:
+            compiled = Template(template, self.dag)
+            self._compiled[id(template)] = compiled
+        self.nodes[node].append((template, children, rules, set(compiled.vars), compiled))
+
+    def count(self) -> int:
+        """
+        Counts the derivations in the forest without building any output trees
+
+        Returns:
+            int: The number of derivations, which may be larger than the number of distinct output trees
+        """
+        counts = dict()
+        return sum(self._count_helper(root, counts) for root in self.roots)
+
+    def _count_helper(self, node: int, counts: dict) -> int:
+        """
+        Recursive helper for count()
+
+        Args:
+            node: The id of the node
+            counts: A dict mapping node ids to their number of derivations
+
+        Returns:
+            int: The number of derivations of the node
+        """
+        if node not in counts:
+            total = 0
+            for (_, children, _, _, _) in self.nodes[node]:
+                product = 1
+                for child in children:
+                    product *= self._count_helper(child, counts)
+                total += product
+            counts[node] = total
+        return counts[node]
+
+    def count_distinct(self) -> int:
+        """
+        Counts the distinct output trees in the forest without building any output trees.
+        Each distinct output of a node is interned as an integer id made from its root symbol and the ids of its children,
+        so outputs built by different derivations get the same id.
+        The ids of a node are only combined once, but the work grows with the number of distinct outputs of each node rather than the size of the forest.
+
+        Returns:
+            int: The number of distinct output trees
+        """
+        interned = dict()
+        outputs = dict()
+        return len(set().union(*[self._count_distinct_helper(root, interned, outputs) for root in self.roots]))
+
+    def _count_distinct_helper(self, node: int, interned: dict, outputs: dict) -> set:
+        """
+        Recursive helper for count_distinct()
+
+        Args:
+            node: The id of the node
+            interned: A dict mapping (symbol, child ids) pairs to the ids of the outputs they make
+            outputs: A dict mapping node ids to the sets of ids of their distinct outputs
+
+        Returns:
+            set: The set of ids of the node's distinct outputs
+        """
+        if node not in outputs:
+            ids = set()
+            for (template, children, _, used, _) in self.nodes[node]:
+                child_ids = [self._count_distinct_helper(children[i], interned, outputs) if i in used else (None,) for i in range(len(children))]
+                ids.update(self._intern(template, combination, interned) for combination in product(*child_ids))
+            outputs[node] = ids
+        return outputs[node]
+
+    def _intern(self, template: Tree, child_ids: tuple, interned: dict) -> int:
+        """
+        Finds the id of the output made by filling a template with the outputs of its children
+
+        Args:
+            template: The output template
+            child_ids: A tuple containing the id of the output that fills each variable
+            interned: A dict mapping (symbol, child ids) pairs to the ids of the outputs they make
+
+        Returns:
+            int: The id of the output
+        """
+        if isinstance(template, VarLeaf):
+            return child_ids[template.idx]
+        key = (template.value, tuple(self._intern(c, child_ids, interned) for c in template.children))
+        return interned.setdefault(key, len(interned))
+
+    def best(self, semiring: Semiring, weights: dict) -> tuple:
+        """
+        Finds the output tree of the best derivation in the forest, visiting each alternative once
+
+        Args:
+            semiring: The Semiring of the weights
+            weights: A dict mapping the (key, value) transition rules of the alternatives to their weights
+
+        Returns:
+            tuple: A tuple containing the output Tree and the weight of its derivation, or None if the forest is empty
+        """
+        memo = dict()
+        best = None
+        for root in self.roots:
+            weight = self._best_helper(root, semiring, weights, memo)[0]
+            if best is None or semiring.key(weight) < semiring.key(best[0]):
+                best = (weight, root)
+        if best is None:
+            return None
+        return (self._build_best(best[1], memo), best[0])
+
+    def _best_helper(self, node: int, semiring: Semiring, weights: dict, memo: dict) -> tuple:
+        """
+        Recursive helper for best()
+
+        Args:
+            node: The id of the node
+            semiring: The Semiring of the weights
+            weights: A dict mapping transition rules to their weights
+            memo: A dict mapping node ids to their best weights and alternatives
+
+        Returns:
+            tuple: A tuple containing the weight of the best derivation of the node and the index of its alternative
+        """
+        if node not in memo:
+            best = (semiring.zero, None)
+            for i, alternative in enumerate(self.nodes[node]):
+                weight = self._alternative_weight(alternative, semiring, weights)
+                for child in alternative[1]:
+                    weight = semiring.times(weight, self._best_helper(child, semiring, weights, memo)[0])
+                if best[1] is None or semiring.key(weight) < semiring.key(best[0]):
+                    best = (weight, i)
+            memo[node] = best
+        return memo[node]
+
+    def _build_best(self, node: int, memo: dict) -> Tree:
+        """
+        Builds the output tree of the best derivation of a node
+
+        Args:
+            node: The id of the node
+            memo: A dict mapping node ids to their best weights and alternatives, as filled by _best_helper()
+
+        Returns:
+            Tree: The output tree
+        """
+        (_, children, _, used, compiled) = self.nodes[node][memo[node][1]]
+        return compiled.fill(tuple(self._build_best(children[i], memo) if i in used else None for i in range(len(children))))
+
+    def k_best(self, k: int, semiring: Semiring, weights: dict) -> list:
+        """
+        Finds the output trees of the k best derivations in the forest that have distinct outputs.
+        Derivations are extracted lazily from best to worst, so only the derivations that are needed are ranked.
+
+        Args:
+            k: The number of output trees to find
+            semiring: The Semiring of the weights
+            weights: A dict mapping the (key, value) transition rules of the alternatives to their weights
+
+        Returns:
+            list: A list of up to k tuples each containing an output Tree and the weight of its best derivation, from best to worst
+        """
+        ranked = dict()
+        candidates = dict()
+        heap = []
+        for root in self.roots:
+            derivation = self._get_derivation(root, 0, semiring, weights, ranked, candidates)
+            if derivation is not None:
+                heap.append((semiring.key(derivation[0]), len(heap), root, 0))
+        heapq.heapify(heap)
+        count = len(heap)
+        outputs = []
+        seen = set()
+        while heap and len(outputs) < k:
+            (_, _, root, rank) = heapq.heappop(heap)
+            derivation = ranked[root][rank]
+            out_tree = self._build_derivation(root, rank, ranked)
+            if out_tree not in seen:
+                seen.add(out_tree)
+                outputs.append((out_tree, derivation[0]))
+            derivation = self._get_derivation(root, rank + 1, semiring, weights, ranked, candidates)
+            if derivation is not None:
+                heapq.heappush(heap, (semiring.key(derivation[0]), count, root, rank + 1))
+                count += 1
+        return outputs
+
+    def _get_derivation(self, node: int, rank: int, semiring: Semiring, weights: dict, ranked: dict, candidates: dict) -> tuple:
+        """
+        Finds the derivation of a node with the given rank, ranking the derivations of the node and its descendants as needed.
+        Each node keeps a heap of candidate derivations. When a derivation is ranked, the derivations that use the next
+        derivation of one of its children are added to the heap.
+
+        Args:
+            node: The id of the node
+            rank: The rank of the derivation, where 0 is the best
+            semiring: The Semiring of the weights
+            weights: A dict mapping transition rules to their weights
+            ranked: A dict mapping node ids to their ranked derivations
+            candidates: A dict mapping node ids to a tuple containing their heap of candidates and the set of candidates already added
+
+        Returns:
+            tuple: A tuple containing the weight of the derivation, the index of its alternative and the ranks of its children's derivations, or None if the node has fewer derivations
+        """
+        if node not in ranked:
+            ranked[node] = []
+            heap = []
+            for i, alternative in enumerate(self.nodes[node]):
+                ranks = (0,) * len(alternative[1])
+                weight = self._derivation_weight(node, i, ranks, semiring, weights, ranked, candidates)
+                if weight is not None:
+                    heap.append((semiring.key(weight), len(heap), weight, i, ranks))
+            heapq.heapify(heap)
+            candidates[node] = (heap, {(c[3], c[4]) for c in heap})
+        derivations = ranked[node]
+        (heap, added) = candidates[node]
+        while len(derivations) <= rank and heap:
+            (_, _, weight, i, ranks) = heapq.heappop(heap)
+            derivations.append((weight, i, ranks))
+            for c in range(len(ranks)):
+                next_ranks = ranks[:c] + (ranks[c] + 1,) + ranks[c + 1:]
+                if (i, next_ranks) in added:
+                    continue
+                added.add((i, next_ranks))
+                next_weight = self._derivation_weight(node, i, next_ranks, semiring, weights, ranked, candidates)
+                if next_weight is not None:
+                    heapq.heappush(heap, (semiring.key(next_weight), len(added), next_weight, i, next_ranks))
+        return derivations[rank] if rank < len(derivations) else None
+
+    def _derivation_weight(self, node: int, i: int, ranks: tuple, semiring: Semiring, weights: dict, ranked: dict, candidates: dict):
+        """
+        Finds the weight of a derivation of a node from the ranks of its children's derivations
+
+        Args:
+            node: The id of the node
+            i: The index of the derivation's alternative
+            ranks: A tuple containing the rank of the derivation of each child
+            semiring: The Semiring of the weights
+            weights: A dict mapping transition rules to their weights
+            ranked: A dict mapping node ids to their ranked derivations
+            candidates: A dict mapping node ids to their heaps of candidates
+
+        Returns:
+            The weight of the derivation, or None if a child has too few derivations
+        """
+        alternative = self.nodes[node][i]
+        weight = self._alternative_weight(alternative, semiring, weights)
+        for c, child in enumerate(alternative[1]):
+            derivation = self._get_derivation(child, ranks[c], semiring, weights, ranked, candidates)
+            if derivation is None:
+                return None
+            weight = semiring.times(weight, derivation[0])
+        return weight
+
+    def _build_derivation(self, node: int, rank: int, ranked: dict) -> Tree:
+        """
+        Builds the output tree of a ranked derivation of a node
+
+        Args:
+            node: The id of the node
+            rank: The rank of the derivation
+            ranked: A dict mapping node ids to their ranked derivations
+
+        Returns:
+            Tree: The output tree
+        """
+        (_, i, ranks) = ranked[node][rank]
+        (_, children, _, used, compiled) = self.nodes[node][i]
+        return compiled.fill(tuple(self._build_derivation(children[c], ranks[c], ranked) if c in used else None for c in range(len(children))))
+
+    def _alternative_weight(self, alternative: tuple, semiring: Semiring, weights: dict):
+        """
+        Finds the weight of the rules applied by an alternative
+
+        Args:
+            alternative: The alternative
+            semiring: The Semiring of the weights
+            weights: A dict mapping transition rules to their weights
+
+        Returns:
+            The product of the weights of the alternative's rules
+        """
+        weight = semiring.one
+        for rule in alternative[2]:
+            weight = semiring.times(weight, weights[rule])
+        return weight
+
+    def __iter__(self) -> Iterator[Tree]:
+        """
+        Lazily builds the output trees of the forest.
+        A tree is yielded once for each way of filling its template's variables, so equal trees may be yielded more than once.
+
+        Returns:
+            Iterator: An iterator over the output trees
+        """
+        for root in self.roots:
+            yield from self._enumerate(root)
+
+    def _enumerate(self, node: int) -> Iterator[Tree]:
+        """
+        Lazily builds the output trees of a node
+
+        Args:
+            node: The id of the node
+
+        Returns:
+            Iterator: An iterator over the output trees of the node
+        """
+        for (_, children, _, used, compiled) in self.nodes[node]:
+            for child_trees in self._enumerate_product(children, used, 0):
+                yield compiled.fill(child_trees)
+
+    def _enumerate_product(self, children: tuple, used: set, i: int) -> Iterator[tuple]:
+        """
+        Lazily builds the combinations of output trees of the children of an alternative.
+        Children that are not used by the template are filled with None.
+
+        Args:
+            children: A tuple containing the ids of the child nodes
+            used: The set of child indices used by the template
+            i: The index of the first child to combine
+
+        Returns:
+            Iterator: An iterator over tuples containing an output tree for each child from i on
+        """
+        if i == len(children):
+            yield ()
+            return
+        firsts = self._enumerate(children[i]) if i in used else (None,)
+        for first in firsts:
+            for rest in self._enumerate_product(children, used, i + 1):
+                yield (first,) + rest
+
+    def __contains__(self, tree: object) -> bool:
+        """
+        Checks whether a tree is one of the outputs in the forest without enumerating the outputs
+
+        Args:
+            tree: The candidate Tree.
+
+        Returns:
+            bool: True if the tree is an output of the forest and False otherwise.
+        """
+        if not isinstance(tree, Tree):
+            return False
+        matches = dict()
+        return any(self._matches(root, tree, matches) for root in self.roots)
+
+    def _matches(self, node: int, tree: Tree, matches: dict) -> bool:
+        """
+        Checks whether a tree is one of the outputs of a node
+
+        Args:
+            node: The id of the node
+            tree: The candidate Tree.
+            matches: A dict mapping (node id, id of a subtree of the candidate) pairs to whether they match
+
+        Returns:
+            bool: True if the tree is an output of the node and False otherwise.
+        """
+        key = (node, id(tree))
+        if key not in matches:
+            matches[key] = False
+            for (template, children, _, _, _) in self.nodes[node]:
+                bindings = dict()
+                if self._bind(template, tree, bindings) and \
+                        all(self._matches(children[i], subtree, matches) for i, subtree in bindings.items()):
+                    matches[key] = True
+                    break
+        return matches[key]
+
+    def _bind(self, template: Tree, tree: Tree, bindings: dict) -> bool:
+        """
+        Matches a template against a tree, binding each variable to the subtree at its position.
+        A variable used more than once must be bound to equal subtrees.
+
+        Args:
+            template: The output template
+            tree: The candidate Tree.
+            bindings: A dict mapping variable indices to subtrees of the candidate, which is filled by this method
+
+        Returns:
+            bool: True if the tree has the shape of the template and False otherwise.
+        """
+        if isinstance(template, VarLeaf):
+            if template.idx in bindings:
+                return bindings[template.idx] == tree
+            bindings[template.idx] = tree
+            return True
+        return template.value == tree.value and len(template.children) == len(tree.children) and \
+            all(self._bind(template.children[i], tree.children[i], bindings) for i in range(len(tree.children)))
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __str__(self) -> str:
+        return f"OutputForest(Nodes: {len(self.nodes)}\n \
+                Alternatives: {sum(len(alternatives) for alternatives in self.nodes)}\n \
+                Roots: {self.roots})"
+
+    def __repr__(self) -> str:
+        return f"OutputForest(Nodes: {len(self.nodes)}\n \
+                Alternatives: {sum(len(alternatives) for alternatives in self.nodes)}\n \
+                Roots: {self.roots})"
@@ -0,0 +1,113 @@
+"""
+Transducer pipeline module
+"""
+from __future__ import annotations
+from collections.abc import Iterable, Iterator
+from ..Tree import Tree
+
+class Pipeline:
+    """
+    Applies a sequence of transducers one after the other.
+    Each output of a stage is passed to the next stage as soon as it is built, so the intermediate outputs are streamed
+    instead of being collected into lists or sets. It is returned by compose() when two transducers cannot be combined
+    into a single transducer.
+    """
+    def __init__(self, stages: Iterable):
+        """
+        Creates a pipeline
+
+        Args:
+            stages: An Iterable containing the transducers (or pipelines) to be applied in order
+
+        Raises:
+            ValueError: The pipeline has no stages
+        """
+        self.stages = []
+        for stage in stages:
+            if isinstance(stage, Pipeline):
+                self.stages.extend(stage.stages)
+            else:
+                self.stages.append(stage)
+        if not self.stages:
+            raise ValueError("Pipeline must have at least one stage.")
+
+    def compose(self, other) -> Pipeline:
+        """
+        Returns a pipeline that applies this pipeline and then another transducer
+
+        Args:
+            other: The transducer (or pipeline) to be applied after this pipeline
+
+        Returns:
+            Pipeline: The combined pipeline
+        """
+        return Pipeline([self, other])
+
+    def transduce(self, tree: Tree) -> list:
+        """
+        Transduces the input Tree with every stage in order.
+
+        Args:
+            tree: The Tree to be transduced.
+
+        Returns:
+            list: The list of distinct Trees output by the last stage
+        """
+        return list(self.transduce_iter(tree))
+
+    def transduce_iter(self, tree: Tree, limit: int = None) -> Iterator[Tree]:
+        """
+        Lazily transduces the input Tree with every stage in order, yielding each distinct output tree of the last stage once.
+
+        Args:
+            tree: The Tree to be transduced.
+            limit: The maximum number of output trees to yield, or None to yield all of them
+
+        Returns:
+            Iterator: An iterator over the distinct output trees
+        """
+        if limit is not None and limit < 1:
+            return
+        seen = set()
+        for out_tree in self._transduce_helper(tree, 0):
+            if out_tree in seen:
+                continue
+            seen.add(out_tree)
+            yield out_tree
+            if len(seen) == limit:
+                return
+
+    def _transduce_helper(self, tree: Tree, stage: int) -> Iterator[Tree]:
+        """
+        Recursive helper for transduce_iter()
+
+        Args:
+            tree: The Tree to be transduced.
+            stage: The index of the stage to apply to the tree
+
+        Returns:
+            Iterator: An iterator over the output trees of the last stage
+        """
+        if stage == len(self.stages):
+            yield tree
+            return
+        for out_tree in self.stages[stage].transduce_iter(tree):
+            yield from self._transduce_helper(out_tree, stage + 1)
+
+    def first(self, tree: Tree) -> Tree:
+        """
+        Finds one output of the input Tree without building the others
+
+        Args:
+            tree: The Tree to be transduced.
+
+        Returns:
+            Tree: The first output tree yielded by transduce_iter(), or None if the tree has no output
+        """
+        return next(self.transduce_iter(tree), None)
+
+    def __str__(self) -> str:
+        return f"Pipeline(Stages: {self.stages})"
+
+    def __repr__(self) -> str:
+        return f"Pipeline(Stages: {self.stages})"
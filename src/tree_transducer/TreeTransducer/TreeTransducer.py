@@ -1,13 +1,18 @@
 """
 Tree Transducer module
 """
-from collections.abc import Iterable
+from collections.abc import Iterable, Iterator
 from ..Tree import Tree
 
 class TreeTransducer:
     """
     Tree transducer class. The types of tree transducers inherit from this.
     """
+    #The Profiler that collects statistics of the transducer's runs, or None to skip profiling
+    profiler = None
+    #Whether the transducer's runs record hits of epsilon rules, so that the profiler can report the dead ones
+    epsilon_rule_hits = True
+
     def __init__(self, states: Iterable, final_states: Iterable, in_symbols: Iterable, out_symbols: Iterable, transitions: dict):
         """
         Creates a tree transducer
@@ -43,4 +48,92 @@ class TreeTransducer:
 
         This method is intended to be overridden by subclasses of TreeAutomaton.
         """
-        raise NotImplementedError
\ No newline at end of file
+        raise NotImplementedError
+
+    def transduce_iter(self, tree: Tree, limit: int = None) -> Iterator[Tree]:
+        """
+        Lazily transduces the input Tree, yielding each distinct output tree once.
+        The outputs are built one at a time from the transducer's output forest, so stopping early skips the work for the remaining outputs.
+        The outputs are yielded in a stable order, which is the same on every call and in every process for the same transducer and input.
+
+        Args:
+            tree: The Tree to be transduced.
+            limit: The maximum number of output trees to yield, or None to yield all of them
+
+        Returns:
+            Iterator: An iterator over the distinct output trees
+        """
+        if limit is not None and limit < 1:
+            return
+        seen = set()
+        for out_tree in self.transduce_forest(tree):
+            if out_tree in seen:
+                continue
+            seen.add(out_tree)
+            yield out_tree
+            if len(seen) == limit:
+                return
+
+    def first(self, tree: Tree) -> Tree:
+        """
+        Finds one output of the input Tree without building the others
+
+        Args:
+            tree: The Tree to be transduced.
+
+        Returns:
+            Tree: The first output tree yielded by transduce_iter(), or None if the tree has no output
+        """
+        return next(self.transduce_iter(tree), None)
+
+    def count_outputs(self, tree: Tree, distinct: bool = False) -> int:
+        """
+        Counts the outputs of the input Tree without building them.
+        Derivations are counted over the output forest in time polynomial in the size of the input.
+        Counting distinct outputs interns each output of each forest node, so it should only be used once the number of derivations is known to be manageable.
+
+        Args:
+            tree: The Tree to be transduced.
+            distinct: Whether to count distinct output trees instead of derivations
+
+        Returns:
+            int: The number of derivations, or of distinct output trees if distinct is True
+        """
+        forest = self.transduce_forest(tree)
+        return forest.count_distinct() if distinct else forest.count()
+
+    def transduce_forest(self, tree: Tree):
+        """
+        Transduces the input Tree into a packed forest of its outputs.
+
+        Args:
+            tree: The Tree to be transduced.
+
+        This method is intended to be overridden by subclasses of TreeTransducer.
+        """
+        raise NotImplementedError
+
+    def _profile_lookup(self, key: tuple):
+        """
+        Records one transition lookup and the rules it finds with the transducer's profiler
+
+        Args:
+            key: The key that was looked up
+        """
+        self.profiler.count("lookups")
+        for rule in self.transitions.get(key, ()):
+            self.profiler.hit((key, rule))
+
+    def is_linear(self) -> bool:
+        """
+        Checks whether no rule of the transducer copies a variable
+
+        Returns:
+            bool: True if each variable appears at most once in each output template and False otherwise.
+        """
+        for rules in self.transitions.values():
+            for rule in rules:
+                out_vars = rule[1].get_vars()
+                if len(out_vars) != len(set(out_vars)):
+                    return False
+        return True
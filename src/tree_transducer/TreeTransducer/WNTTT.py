@@ -0,0 +1,86 @@
+"""
+Weighted non-deterministic finite-state top-down tree transducer module
+"""
+from __future__ import annotations
+from collections.abc import Iterable
+from .NTTT import NTTT
+from ..Tree import Tree
+from ..Semiring import Semiring, TROPICAL
+
+class WNTTT(NTTT):
+    """
+    Weighted non-deterministic finite-state top-down tree transducer class.
+    Each transition rule has a weight, and the weight of an output is the product of the weights of the rules used to build it.
+    """
+    def __init__(self, states: Iterable, final_states: Iterable, in_symbols: Iterable, out_symbols: Iterable, transitions: dict, semiring: Semiring = TROPICAL, dag: bool = False):
+        """
+        Creates a weighted tree transducer
+
+        Args:
+            states: An Iterable containing the set of states (Q)
+            final_states: An Iterable containing the set of final states (Q_{f/i})
+            in_symbols: An Iterable containing the set of input symbols (F)
+            out_symbols: An Iterable containing the set of output symbols (F')
+            transitions: A dict containing the transitions (Delta), whose rules are (child states, template, weight) tuples
+            semiring: The Semiring of the weights
+            dag: Whether the output trees are DagTrees that share the subtrees copied by rules instead of plain Trees
+        """
+        self.semiring = semiring
+        #Weights are kept apart from the rules so the unweighted NTTT functions can be reused
+        self.weights = dict()
+        unweighted = dict()
+        for (k, v) in transitions.items():
+            unweighted[k] = set()
+            for rule in v:
+                if len(rule) != 3:
+                    raise ValueError("Weighted transition rules must be (child states, template, weight) tuples.")
+                weight_key = (k, (rule[0], rule[1]))
+                if weight_key in self.weights:
+                    self.weights[weight_key] = semiring.plus(self.weights[weight_key], rule[2])
+                else:
+                    self.weights[weight_key] = rule[2]
+                    unweighted[k].add((rule[0], rule[1]))
+        super().__init__(states, final_states, in_symbols, out_symbols, unweighted, dag)
+
+    def best(self, tree: Tree) -> tuple:
+        """
+        Finds the best output of the input Tree.
+        The best derivation is found over the output forest, so each (state, input subtree) pair is only considered once.
+
+        Args:
+            tree: The Tree to be transduced.
+
+        Returns:
+            tuple: A tuple containing the output Tree and its weight, or None if the tree has no output
+        """
+        return self.transduce_forest(tree).best(self.semiring, self.weights)
+
+    def k_best(self, tree: Tree, k: int) -> list:
+        """
+        Finds the k best distinct outputs of the input Tree.
+
+        Args:
+            tree: The Tree to be transduced.
+            k: The number of outputs to find
+
+        Returns:
+            list: A list of up to k tuples each containing an output Tree and its weight, from best to worst
+        """
+        return self.transduce_forest(tree).k_best(k, self.semiring, self.weights)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, WNTTT):
+            return super().__eq__(other) and self.weights == other.weights and self.semiring.name == other.semiring.name
+        return False
+
+    def __str__(self) -> str:
+        return f"WNTTT(States: {self.states}\n \
+                Final States: {self.final_states}\n \
+                Transitions: {self.transitions}\n \
+                Weights: {self.weights})"
+
+    def __repr__(self) -> str:
+        return f"WNTTT(States: {self.states}\n \
+                Final States: {self.final_states}\n \
+                Transitions: {self.transitions}\n \
+                Weights: {self.weights})"
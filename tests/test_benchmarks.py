@@ -0,0 +1,51 @@
+import unittest
+from random import Random
+from benchmarks import Generators as gen
+from benchmarks.Runner import run_benchmarks, compare_results
+
+class BenchmarkTests(unittest.TestCase):
+    #Builds the same workloads from the same seed
+    def testDeterministic(self):
+        first = gen.random_nbta(Random(7), gen.random_alphabet(Random(7), 4), 6)
+        second = gen.random_nbta(Random(7), gen.random_alphabet(Random(7), 4), 6)
+        self.assertEqual(first.transitions, second.transitions)
+        self.assertEqual(first.final_states, second.final_states)
+        self.assertEqual(gen.random_tree(Random(3), {"A": 0, "B": 2}, 50), gen.random_tree(Random(3), {"A": 0, "B": 2}, 50))
+
+    #Builds trees accepted by the generated automata
+    def testAcceptedTree(self):
+        rng = Random(1)
+        alphabet = gen.random_alphabet(rng, 5)
+        for make in (gen.random_nbta, gen.random_dbta, gen.random_ntta):
+            automaton = make(rng, alphabet, 8, rules_per_symbol=16)
+            tree = gen.accepted_tree(rng, automaton, 100)
+            if tree is not None:
+                self.assertTrue(automaton.accepts(tree))
+        tree = gen.deep_tree(rng, {"A": 0, "B": 1}, 30)
+        depth = 1
+        while tree.children:
+            (tree, depth) = (tree.children[0], depth + 1)
+        self.assertEqual(depth, 30)
+
+    #Times the scenarios at the given sizes and flags regressions
+    def testRunAndCompare(self):
+        results = run_benchmarks(["nbta_accepts", "dbta_minimize"], sizes=[4], repeat=1)
+        self.assertEqual(set(results["results"]), {"nbta_accepts", "dbta_minimize"})
+        self.assertEqual(set(results["results"]["nbta_accepts"]), {"4"})
+        baseline = {"results": {"nbta_accepts": {"4": results["results"]["nbta_accepts"]["4"] / 10}}}
+        self.assertEqual([(name, size) for (name, size, _, _) in compare_results(results, baseline)], [("nbta_accepts", "4")])
+        self.assertEqual(compare_results(results, results), [])
+        with self.assertRaises(ValueError):
+            run_benchmarks(["missing"])
+
+    #Times the construction of transducers with an epsilon transition between every pair of states
+    def testEpsilonConstruction(self):
+        results = run_benchmarks(["nbtt_epsilon_construction", "nttt_epsilon_construction"], sizes=[12], repeat=1)
+        self.assertEqual(set(results["results"]), {"nbtt_epsilon_construction", "nttt_epsilon_construction"})
+        self.assertEqual(len(gen.dense_epsilon_rules(["q0", "q1", "q2"])[(("q0",), "")]), 2)
+
+if __name__ == '__main__':
+    suite = unittest.TestLoader().loadTestsFromTestCase(BenchmarkTests)
+    runner = unittest.TextTestRunner()
+    result = runner.run(suite)
+    print(result)
@@ -0,0 +1,82 @@
+import unittest
+from src.tree_transducer.Budget import Budget, BudgetExceeded
+from src.tree_transducer.TreeAutomaton.NBTA import NBTA
+from src.tree_transducer.TreeAutomaton.DBTA import DBTA
+from src.tree_transducer.TreeTransducer.NBTT import NBTT
+from src.tree_transducer.TreeTransducer.NTTT import NTTT
+from src.tree_transducer.TreeTransducer.DBTT import DBTT
+from src.tree_transducer.TreeTransducer.DTTT import DTTT
+from src.tree_transducer.Tree import Tree, VarLeaf
+
+class BudgetTests(unittest.TestCase):
+    #Stops determinization and products once they create too many states
+    def testMaxStates(self):
+        automaton = NBTA(["qA","qB"],["qB"],["A","B"],{(("qA","qA"),"A"):{"qA","qB"}, (tuple(),"A"):{"qA"}, (tuple(),"B"):{"qB"}})
+        with self.assertRaises(BudgetExceeded) as raised:
+            automaton.determinize(Budget(max_states=1))
+        self.assertEqual(raised.exception.resource, "states")
+        self.assertEqual(raised.exception.stats["states"], 2)
+        self.assertEqual(automaton.determinize(Budget(max_states=10)), automaton.determinize())
+        with self.assertRaises(BudgetExceeded):
+            automaton.intersection(automaton, Budget(max_states=3))
+        with self.assertRaises(BudgetExceeded) as raised:
+            automaton.union(automaton, Budget(max_nodes=4))
+        self.assertEqual(raised.exception.resource, "nodes")
+        self.assertEqual(raised.exception.stats["nodes"], 5)
+
+    #Stops transductions once they build too many outputs, before building them
+    def testMaxOutputs(self):
+        transducer = NBTT(["qA"],["qA"],["A"],["A","B"],{
+                                                        (("qA","qA"),"A"):[("qA",Tree("A", [VarLeaf(0), VarLeaf(1)]))],
+                                                        (tuple(), "A"):[("qA", Tree("A")), ("qA", Tree("B"))]})
+        in_tree = Tree("A")
+        for i in range(40):
+            in_tree = Tree("A", [in_tree, Tree("A")])
+        budget = Budget(max_outputs=1000)
+        with self.assertRaises(BudgetExceeded) as raised:
+            transducer.transduce(in_tree, budget=budget)
+        self.assertEqual(raised.exception.resource, "outputs")
+        self.assertLess(raised.exception.stats["nodes"], 81)
+        small_tree = Tree("A", [Tree("A"), Tree("A")])
+        self.assertEqual(transducer.transduce(small_tree, budget=Budget(max_outputs=10, max_nodes=3)), transducer.transduce(small_tree))
+        transducer = NTTT(["qA"],["qA"],["A"],["A","B"],{
+                        ("qA", "A", 2):{(("qA","qA"),Tree("A", [VarLeaf(0), VarLeaf(1)]))},
+                        ("qA", "A", 0):{(tuple(),Tree("A")), (tuple(),Tree("B"))}})
+        with self.assertRaises(BudgetExceeded):
+            transducer.transduce(in_tree, Budget(max_outputs=1000))
+        self.assertEqual(transducer.transduce(small_tree, Budget(max_outputs=6)), {Tree("A", [a, b]) for a in (Tree("A"), Tree("B")) for b in (Tree("A"), Tree("B"))})
+
+    #Limits the nodes visited by single-output transductions
+    def testTransduceOne(self):
+        in_tree = Tree("A", [Tree("A"), Tree("A", [Tree("A"), Tree("A")])])
+        transducer = DBTT(["qA"],["qA"],["A"],["A"],{(("qA","qA"),"A"):[("qA",Tree("A", [VarLeaf(1), VarLeaf(0)]))], (tuple(), "A"):[("qA", Tree("A"))]})
+        with self.assertRaises(BudgetExceeded):
+            transducer.transduce_one(in_tree, Budget(max_nodes=4))
+        self.assertEqual(transducer.transduce_one(in_tree, Budget(max_nodes=5)), transducer.transduce_one(in_tree))
+        transducer = DTTT(["qA"],["qA"],["A"],["A"],{("qA","A",2):{(("qA","qA"),Tree("A", [VarLeaf(1), VarLeaf(0)]))}, ("qA","A",0):{(tuple(),Tree("A"))}})
+        with self.assertRaises(BudgetExceeded) as raised:
+            transducer.transduce_one(in_tree, Budget(max_nodes=4))
+        self.assertEqual(raised.exception.resource, "nodes")
+        self.assertEqual(transducer.transduce_one(in_tree, Budget(max_nodes=5)), transducer.transduce_one(in_tree))
+
+    #Stops operations after the deadline or once the budget is cancelled
+    def testDeadlineAndCancel(self):
+        automaton = DBTA(["qA","qB","qC"],["qA"], ["A","B","C"], {(("qA",),"A"): {"qA"}, (tuple(),"A"): {"qA"},
+                                                                  (tuple(),"B"): {"qB"}, (("qB",),"B"): {"qB"},
+                                                                  (tuple(),"C"): {"qC"}, (("qC","qC"),"C"): {"qC"}})
+        budget = Budget()
+        budget.cancel()
+        with self.assertRaises(BudgetExceeded) as raised:
+            automaton.minimize(budget)
+        self.assertEqual(raised.exception.resource, "cancelled")
+        self.assertEqual(raised.exception.stats["nodes"], 1)
+        with self.assertRaises(BudgetExceeded) as raised:
+            automaton.minimize(Budget(timeout=-1))
+        self.assertEqual(raised.exception.resource, "deadline")
+        self.assertEqual(automaton.minimize(Budget(timeout=60)), automaton.minimize())
+
+if __name__ == '__main__':
+    suite = unittest.TestLoader().loadTestsFromTestCase(BudgetTests)
+    runner = unittest.TextTestRunner()
+    result = runner.run(suite)
+    print(result)
@@ -49,6 +49,25 @@ class DBTATests(unittest.TestCase):
                                                                   (('qB_qC', 'qB_qC'), 'C'): {'qB_qC'}})
         self.assertEqual(automaton.minimize(), minimized)
 
+    #Marks the merged state as final when equivalent final states are merged
+    def testMinimizeMergedFinalStates(self):
+        automaton = DBTA(["qA","qB","qC"],["qA","qB"], ["A","B","C"], {(tuple(),"A"): {"qA"},
+                                                                  (tuple(),"B"): {"qB"},
+                                                                  (tuple(),"C"): {"qC"},
+                                                                  (("qA",),"A"): {"qA"},
+                                                                  (("qB",),"A"): {"qB"}})
+        minimized = automaton.minimize()
+        self.assertEqual(minimized.states, {"qA_qB", "qC"})
+        self.assertEqual(minimized.final_states, {"qA_qB"})
+        self.assertTrue(minimized.accepts(Tree("A", [Tree("B")])))
+        self.assertFalse(minimized.accepts(Tree("C")))
+
+    #Returns acceptance for each tree in a batch
+    def testAcceptsMany(self):
+        automaton = DBTA(["qA"],["qA"],["A"],{(("qA","qA"),"A"):{"qA"}, (tuple(),"A"):{"qA"}})
+        trees = [Tree("A", [Tree("A"), Tree("A", [Tree("A"), Tree("A")])]), Tree("A", [Tree("A"), Tree("A", [Tree("A")])])]
+        self.assertEqual(automaton.accepts_many(trees), [True, False])
+
 if __name__ == '__main__':
     suite = unittest.TestLoader().loadTestsFromTestCase(DBTATests)
     runner = unittest.TextTestRunner()
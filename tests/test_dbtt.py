@@ -49,6 +49,17 @@ class DBTTTests(unittest.TestCase):
     def testEpsilon(self):
         self.assertRaises(ValueError, DBTT, ["qA"],["qA"],["A"],["Z"],{(("qB",),""):[("qA",Tree("Z"))]})
 
+    #Returns the single output tree or None
+    def testTransduceOne(self):
+        transducer = DBTT(["qS","qA","qB","qT"],["qS"],["A","B","S"],["A","B","S"],{
+                                                        (("qA","qB"),"S"):[("qS",Tree("S", [VarLeaf(1), VarLeaf(0)]))],
+                                                        (("qA","qS","qB"),"S"):[("qT", Tree("S", [VarLeaf(2), VarLeaf(1), VarLeaf(0)]))],
+                                                        (tuple(), "A"):[("qA", Tree("A"))],
+                                                        (tuple(), "B"):[("qB", Tree("B"))]})
+        self.assertEqual(transducer.transduce_one(Tree("S", [Tree("A"), Tree("B")])), Tree("S", [Tree("B"), Tree("A")]))
+        self.assertIsNone(transducer.transduce_one(Tree("S", [Tree("A"), Tree("S", [Tree("A"), Tree("B")]), Tree("B")])))
+        self.assertIsNone(transducer.transduce_one(Tree("S", [Tree("B"), Tree("A")])))
+
 if __name__ == '__main__':
     suite = unittest.TestLoader().loadTestsFromTestCase(DBTTTests)
     runner = unittest.TextTestRunner()
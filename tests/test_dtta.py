@@ -39,6 +39,18 @@ class DTTATests(unittest.TestCase):
     def testEpsilon(self):
         self.assertRaises(ValueError, DTTA, ["qA"], ["qA"], ["A"], {("qA","", 2):{("qA", "qA")}})
 
+    #Returns acceptance for each tree in a batch
+    def testAcceptsMany(self):
+        automaton = DTTA(["qS","qA","qB"],["qS"],["a","b","S"],{("qS","S", 2):{("qA", "qB")},
+                                                                ("qS", "S", 3):{("qA", "qS", "qB")},
+                                                                ("qA","a",0): {tuple()},
+                                                                ("qB","b",0):{tuple()}})
+        trees = [Tree("S", [Tree("a"), Tree("S", [Tree("a"), Tree("b")]), Tree("b")]),
+                 Tree("S", [Tree("a"), Tree("S", [Tree("b"), Tree("a")]), Tree("b")]),
+                 Tree("S", [Tree("a"), Tree("b")])]
+        self.assertEqual(automaton.accepts_many(trees), [True, False, True])
+        self.assertEqual(automaton.batch_stats["hits"], 4)
+
 if __name__ == '__main__':
     suite = unittest.TestLoader().loadTestsFromTestCase(DTTATests)
     runner = unittest.TextTestRunner()
@@ -41,6 +41,54 @@ class DTTTTests(unittest.TestCase):
     def testEpsilon(self):
         self.assertRaises(ValueError, DTTT, ["qA"],["qA"],["A"],["Z"],{("qB","", 1):{(("qA",),Tree("Z", [VarLeaf(0)]))}})
 
+    #Returns the single output tree or None
+    def testTransduceOne(self):
+        transducer = DTTT(["qS","qA","qB"],["qS"],["A","B","S"],["A","B","S"],{
+                        ("qS", "S", 2):{(("qA","qB"),Tree("S", [VarLeaf(1), VarLeaf(0)]))},
+                        ("qS", "S", 3):{(("qA","qS","qB"),Tree("S", [VarLeaf(2), VarLeaf(1), VarLeaf(0)]))},
+                        ("qB", "B", 0):{(tuple(),Tree("B"))},
+                        ("qA", "A", 0):{(tuple(),Tree("A"))}
+                        })
+        in_tree = Tree("S", [Tree("A"), Tree("S", [Tree("A"), Tree("B")]), Tree("B")])
+        self.assertEqual(transducer.transduce_one(in_tree), Tree("S", [Tree("B"), Tree("S", [Tree("B"), Tree("A")]), Tree("A")]))
+        self.assertIsNone(transducer.transduce_one(Tree("S", [Tree("A"), Tree("S", [Tree("A")]), Tree("B")])))
+
+    #Streams the output events of a tree given as events
+    def testTransduceEvents(self):
+        transducer = DTTT(["qS","qA","qB"],["qS"],["A","B","S"],["A","B","S","T"],{
+                        ("qS", "S", 2):{(("qA","qB"),Tree("S", [VarLeaf(1), VarLeaf(0)]))},
+                        ("qS", "S", 3):{(("qA","qS","qB"),Tree("T", [VarLeaf(0), VarLeaf(1), VarLeaf(1)]))},
+                        ("qB", "B", 0):{(tuple(),Tree("B"))},
+                        ("qA", "A", 0):{(tuple(),Tree("A"))}
+                        })
+        in_tree = Tree("S", [Tree("A"), Tree("S", [Tree("A"), Tree("B")]), Tree("B")])
+        out_events = transducer.transduce_events(in_tree.to_events())
+        self.assertEqual(Tree.from_events(out_events), transducer.transduce_one(in_tree))
+        self.assertRaises(ValueError, list, transducer.transduce_events(Tree("S", [Tree("B"), Tree("A")]).to_events()))
+        self.assertRaises(ValueError, list, transducer.transduce_events([("open", "A", 0)]))
+
+    #Outputs events before the whole input is read
+    def testTransduceEventsStreams(self):
+        transducer = DTTT(["qL"],["qL"],["A","L"],["B","L"],{
+                        ("qL", "L", 2):{(("qL","qL"),Tree("L", [VarLeaf(0), VarLeaf(1)]))},
+                        ("qL", "A", 0):{(tuple(),Tree("B"))}
+                        })
+        read = []
+        def events():
+            for _ in range(1000):
+                read.append(1)
+                yield ("open", "L", 2)
+                yield ("open", "A", 0)
+                yield ("close",)
+            yield ("open", "A", 0)
+            yield ("close",)
+            for _ in range(1000):
+                yield ("close",)
+        out_events = transducer.transduce_events(events())
+        self.assertEqual(next(out_events), ("open", "L", 2))
+        self.assertEqual(len(read), 1)
+        self.assertEqual(sum(1 for event in out_events if event[0] == "open"), 2000)
+
 if __name__ == '__main__':
     suite = unittest.TestLoader().loadTestsFromTestCase(DTTTTests)
     runner = unittest.TextTestRunner()
@@ -0,0 +1,40 @@
+import unittest
+from src.tree_transducer.TreeAutomaton.NBTA import NBTA
+from src.tree_transducer.TreeAutomaton.LazyDBTA import LazyDBTA
+from src.tree_transducer.Tree import Tree
+
+class LazyDBTATests(unittest.TestCase):
+    automaton = NBTA(["qA","qB","qC"],["qC"],["A","B"],{(("qA","qA"),"A"):{"qA","qB"},
+                                                        (("qB","qA"),"A"):{"qC"},
+                                                        (tuple(),"A"):{"qA"},
+                                                        (tuple(),"B"):{"qB"},
+                                                        (("qB",),""):{"qC"}})
+    trees = [Tree("A"), Tree("B"), Tree("A", [Tree("A"), Tree("A")]),
+             Tree("A", [Tree("A", [Tree("A"), Tree("A")]), Tree("A")]),
+             Tree("A", [Tree("B"), Tree("A")]), Tree("A", [Tree("A"), Tree("B")])]
+
+    #Returns the same results as the non-deterministic automaton
+    def testAccepts(self):
+        lazy = self.automaton.lazy_determinize()
+        for tree in self.trees * 2:
+            self.assertEqual(lazy.accepts(tree), self.automaton.accepts(tree))
+        self.assertGreater(lazy.stats["hits"], 0)
+
+    #Evicts transitions when the cache is full and falls back to the non-deterministic automaton when it thrashes
+    def testBoundedCache(self):
+        lazy = LazyDBTA(self.automaton, cache_size=2, fallback_runs=3)
+        for tree in self.trees * 2:
+            self.assertEqual(lazy.accepts(tree), self.automaton.accepts(tree))
+            self.assertLessEqual(len(lazy.transitions), 2)
+        self.assertGreater(lazy.stats["evictions"], 0)
+        self.assertGreater(lazy.stats["fallback_runs"], 0)
+
+    #Raises error if the cache size is not positive
+    def testInvalidCacheSize(self):
+        self.assertRaises(ValueError, LazyDBTA, self.automaton, 0)
+
+if __name__ == '__main__':
+    suite = unittest.TestLoader().loadTestsFromTestCase(LazyDBTATests)
+    runner = unittest.TextTestRunner()
+    result = runner.run(suite)
+    print(result)
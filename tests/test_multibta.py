@@ -0,0 +1,45 @@
+import unittest
+from src.tree_transducer.TreeAutomaton.MultiBTA import MultiBTA
+from src.tree_transducer.TreeAutomaton.NBTA import NBTA
+from src.tree_transducer.TreeAutomaton.DBTA import DBTA
+from src.tree_transducer.Tree import Tree
+
+class MultiBTATests(unittest.TestCase):
+    #Returns a bitmask of the automata that accept the tree
+    def testRun(self):
+        automaton1 = NBTA(["qA"],["qA"],["A"],{(("qA","qA"),"A"):{"qA"}, (tuple(),"A"):{"qA"}})
+        automaton2 = DBTA(["qS","qa","qb"],["qS"],["S","a","b"],{(("qa","qb"),"S"):{"qS"}, (tuple(),"a"):{"qa"}, (tuple(),"b"):{"qb"}})
+        automaton3 = NBTA(["qA","qB"],["qB"],["A"],{(("qA","qA"),"A"):{"qA"}, (tuple(),"A"):{"qA"}, (("qA",),""):{"qB"}})
+        multi = MultiBTA([automaton1, automaton2, automaton3])
+        tree = Tree("A", [Tree("A"), Tree("A", [Tree("A"), Tree("A")])])
+        self.assertEqual(multi.run(tree), 0b101)
+        self.assertEqual(multi.accepted(tree), [0, 2])
+        tree = Tree("S", [Tree("a"), Tree("b")])
+        self.assertEqual(multi.run(tree), 0b010)
+        tree = Tree("A", [Tree("A"), Tree("A", [Tree("A")])])
+        self.assertEqual(multi.run(tree), 0)
+
+    #Returns the same results as running each automaton separately
+    def testMatchesAccepts(self):
+        automata = [NBTA(["qA","qB"],["qB"],["A","B"],{(("qA","qA"),"A"):{"qA","qB"}, (tuple(),"A"):{"qA"}, (tuple(),"B"):{"qB"}}),
+                    NBTA(["qA","qB"],["qA"],["A","B"],{(("qA","qB"),"A"):{"qA"}, (("qB","qA"),"A"):{"qB"}, (tuple(),"A"):{"qA"}, (tuple(),"B"):{"qB"}}),
+                    NBTA(["qB"],["qB"],["B"],{(("qB",),"B"):{"qB"}, (tuple(),"B"):{"qB"}})]
+        multi = MultiBTA(automata)
+        trees = [Tree("A"), Tree("B"), Tree("A", [Tree("A"), Tree("B")]), Tree("A", [Tree("A"), Tree("A")]),
+                 Tree("B", [Tree("B", [Tree("B")])]), Tree("A", [Tree("B"), Tree("A", [Tree("A"), Tree("B")])])]
+        for tree in trees:
+            expected = sum(1 << i for i, automaton in enumerate(automata) if automaton.accepts(tree))
+            self.assertEqual(multi.run(tree), expected)
+
+    #Reuses cached combined states for repeated subtrees
+    def testCache(self):
+        automaton = NBTA(["qA"],["qA"],["A"],{(("qA","qA"),"A"):{"qA"}, (tuple(),"A"):{"qA"}})
+        multi = MultiBTA([automaton])
+        multi.run(Tree("A", [Tree("A", [Tree("A"), Tree("A")]), Tree("A", [Tree("A"), Tree("A")])]))
+        self.assertEqual(len(multi.transitions), 2)
+
+if __name__ == '__main__':
+    suite = unittest.TestLoader().loadTestsFromTestCase(MultiBTATests)
+    runner = unittest.TextTestRunner()
+    result = runner.run(suite)
+    print(result)
@@ -82,6 +82,17 @@ class NBTATests(unittest.TestCase):
         determinized = NBTA(['qA_qB'], ["qA_qB"], ["A"],{(("qA_qB","qA_qB"),"A"):{"qA_qB"}, (tuple(),"A"):{"qA_qB"}})
         self.assertEqual(automaton1.determinize(), determinized)
 
+    #Returns acceptance for each tree in a batch
+    def testAcceptsMany(self):
+        automaton = NBTA(["qA","qB"],["qB"],["A"],{(("qA","qA"),"A"):{"qA"}, (tuple(),"A"):{"qA"}, (("qA",),""):{"qB"}})
+        trees = [Tree("A", [Tree("A"), Tree("A", [Tree("A"), Tree("A")])]),
+                 Tree("A", [Tree("A"), Tree("A", [Tree("A")])]),
+                 Tree("A", [Tree("A", [Tree("A"), Tree("A")]), Tree("A")])]
+        self.assertEqual(automaton.accepts_many(trees), [automaton.accepts(tree) for tree in trees])
+        self.assertEqual(automaton.accepts_many(trees), [True, False, True])
+        self.assertEqual(automaton.batch_stats["misses"], 6)
+        self.assertEqual(automaton.batch_stats["hits"], 8)
+
 if __name__ == '__main__':
     suite = unittest.TestLoader().loadTestsFromTestCase(NBTATests)
     runner = unittest.TextTestRunner()
@@ -1,5 +1,11 @@
+import os
+import subprocess
+import sys
+import textwrap
 import unittest
 from src.tree_transducer.TreeTransducer.NBTT import NBTT
+from src.tree_transducer.TreeTransducer.Pipeline import Pipeline
+from src.tree_transducer.TreeAutomaton.NBTA import NBTA
 from src.tree_transducer.Tree import Tree, VarLeaf
 
 class NBTTTests(unittest.TestCase):
@@ -90,6 +96,218 @@ class NBTTTests(unittest.TestCase):
         )
         self.assertEqual(transducer1.intersection(transducer2), intersection)
 
+    #Only combines the rules whose child states are reachable pairs of states
+    def testIntersectionReachable(self):
+        transducer1 = NBTT(["qA","qB"],["qA"],["A","B"],["A","B"], {(("qA",),"A"):[("qA",Tree("A", [VarLeaf(0)]))], (("qB",),"A"):[("qA",Tree("B", [VarLeaf(0)]))], (tuple(),"A"):[("qA",Tree("A"))]})
+        transducer2 = NBTT(["qA","qB"],["qA"],["A","B"],["A","B"], {(("qA",),"A"):[("qA",Tree("A", [VarLeaf(0)]))], (("qB",),"A"):[("qA",Tree("B", [VarLeaf(0)]))], (tuple(),"A"):[("qA",Tree("A"))]})
+        intersection = transducer1.intersection(transducer2)
+        self.assertEqual(set(intersection.transitions.keys()), {(("qA_qA",),"A"), (tuple(),"A")})
+        self.assertEqual(intersection.transduce(Tree("A", [Tree("A")])), [Tree("A", [Tree("A")])])
+
+    #Only combines the outputs of child states read by some rule
+    def testRuleTrieJoin(self):
+        transducer = NBTT(["qS","qA","qB"],["qS"],["A","S"],["A","B","S"],{
+                                                        (("qA","qB"),"S"):[("qS",Tree("S", [VarLeaf(0), VarLeaf(1)]))],
+                                                        (tuple(), "A"):[("qA", Tree("A")), ("qB", Tree("B")), ("qB", Tree("A"))]})
+        self.assertEqual(set(transducer.rule_trie[("S", 2)].keys()), {"qA"})
+        self.assertEqual(set(transducer.rule_trie[("S", 2)]["qA"].keys()), {"qB"})
+        in_tree = Tree("S", [Tree("A"), Tree("A")])
+        self.assertEqual(set(transducer.transduce(in_tree)), {Tree("S", [Tree("A"), Tree("B")]), Tree("S", [Tree("A"), Tree("A")])})
+        self.assertEqual(transducer.transduce_forest(in_tree).count(), 2)
+
+    #Keeps only the outputs accepted by the output filter
+    def testOutputFilter(self):
+        transducer = NBTT(["qS","qA","qR"],["qS","qR"],["A","S"],["A","B","S","R"],{
+                                                        (("qA","qA"),"S"):[("qS",Tree("S", [VarLeaf(0), VarLeaf(1)])),("qS",Tree("S", [VarLeaf(1), Tree("B")]))],
+                                                        (("qS","qS"),"S"):[("qS",Tree("S", [VarLeaf(0), VarLeaf(1)]))],
+                                                        (tuple(), "A"):[("qA", Tree("A")), ("qA", Tree("B"))],
+                                                        (("qS",),""):[("qR", Tree("R", [VarLeaf(0)]))]})
+        output_filter = NBTA(["qA","qS","qR"],["qS","qR"],["A","S","R"],{(tuple(),"A"):{"qA"},
+                                                                     (("qA","qA"),"S"):{"qS"},
+                                                                     (("qS","qS"),"S"):{"qS"},
+                                                                     (("qS",),"R"):{"qR"}})
+        in_tree = Tree("S", [Tree("S", [Tree("A"), Tree("A")]), Tree("S", [Tree("A"), Tree("A")])])
+        expected = {out_tree for out_tree in transducer.transduce(in_tree) if output_filter.accepts(out_tree)}
+        self.assertEqual(set(transducer.transduce(in_tree, output_filter=output_filter)), expected)
+        self.assertEqual(expected, {Tree("S", [Tree("S", [Tree("A"), Tree("A")]), Tree("S", [Tree("A"), Tree("A")])]),
+                                    Tree("R", [Tree("S", [Tree("S", [Tree("A"), Tree("A")]), Tree("S", [Tree("A"), Tree("A")])])])})
+        self.assertEqual(output_filter.get_coreachable_states(), {"qA","qS","qR"})
+
+    #Keeps the outputs that a rule deletes even if the output filter rejects them
+    def testOutputFilterDeletedChild(self):
+        transducer = NBTT(["qA","qS"],["qS"],["A","S"],["X","Y"],{
+                                                        (tuple(), "A"):[("qA", Tree("X"))],
+                                                        (("qA",),"S"):[("qS", Tree("Y"))]})
+        output_filter = NBTA(["qY"],["qY"],["Y"],{(tuple(),"Y"):{"qY"}})
+        in_tree = Tree("S", [Tree("A")])
+        self.assertEqual(transducer.transduce(in_tree, output_filter=output_filter), [Tree("Y")])
+        transducer = NBTT(["qA","qB","qS"],["qS"],["A","S"],["X","Y"],{
+                                                        (tuple(), "A"):[("qA", Tree("X"))],
+                                                        (("qA",),"S"):[("qB", Tree("X", [VarLeaf(0)]))],
+                                                        (("qB",),""):[("qS", Tree("Y"))]})
+        in_tree = Tree("S", [Tree("A")])
+        self.assertEqual(transducer.transduce(in_tree, output_filter=output_filter), [Tree("Y")])
+        self.assertEqual(transducer.transduce(Tree("A"), output_filter=output_filter), [])
+
+    #Returns a forest containing the same outputs as transduce
+    def testTransduceForest(self):
+        transducer = NBTT(["qS","qA","qB"],["qS"],["A","B","S"],["A","B","S"],{
+                                                        (("qA","qB"),"S"):[("qS",Tree("S", [VarLeaf(1), VarLeaf(0)])),("qS",Tree("S", [VarLeaf(0), VarLeaf(1)]))],
+                                                        (("qA","qS","qB"),"S"):[("qS", Tree("S", [VarLeaf(2), VarLeaf(1), VarLeaf(0)])),("qS", Tree("S", [VarLeaf(0), VarLeaf(1), VarLeaf(2)]))],
+                                                        (tuple(), "A"):[("qA", Tree("A"))],
+                                                        (tuple(), "B"):[("qB", Tree("B"))]})
+        in_tree = Tree("S", [Tree("A"), Tree("S", [Tree("A"), Tree("B")]), Tree("B")])
+        forest = transducer.transduce_forest(in_tree)
+        self.assertEqual(set(forest), set(transducer.transduce(in_tree)))
+        self.assertEqual(forest.count(), 4)
+        self.assertIn(Tree("S", [Tree("B"), Tree("S", [Tree("A"), Tree("B")]), Tree("A")]), forest)
+        self.assertNotIn(Tree("S", [Tree("B"), Tree("A")]), forest)
+        transducer = NBTT(["qS","qA","qB","qR","qT"],["qT"],["A","B","S"],["A","B","S","R","T"],{
+                                                        (("qA","qB"),"S"):[("qS",Tree("S", [VarLeaf(1), VarLeaf(0)]))],
+                                                        (tuple(), "A"):[("qA", Tree("A"))],
+                                                        (tuple(), "B"):[("qB", Tree("B"))],
+                                                        (("qS",),""):[("qR", Tree("R", [VarLeaf(0)]))],
+                                                        (("qR",),""):[("qT", Tree("T", [VarLeaf(0)]))],
+                                                        (("qA","qR","qB"),"S"):[("qS", Tree("S", [VarLeaf(2), VarLeaf(1), VarLeaf(0)]))]})
+        forest = transducer.transduce_forest(in_tree)
+        self.assertEqual(list(forest), transducer.transduce(in_tree))
+
+    #Yields distinct outputs lazily and stops at the limit
+    def testTransduceIter(self):
+        transducer = NBTT(["qS","qA"],["qS"],["A","S"],["A","B","S"],{
+                                                        (("qA","qA"),"S"):[("qS",Tree("S", [VarLeaf(0), VarLeaf(1)])),("qS",Tree("S", [VarLeaf(1), VarLeaf(0)]))],
+                                                        (tuple(), "A"):[("qA", Tree("A")), ("qA", Tree("B"))]})
+        in_tree = Tree("S", [Tree("A"), Tree("A")])
+        out_trees = list(transducer.transduce_iter(in_tree))
+        self.assertEqual(len(out_trees), 4)
+        self.assertEqual(set(out_trees), set(transducer.transduce(in_tree)))
+        self.assertEqual(list(transducer.transduce_iter(in_tree, limit=2)), out_trees[:2])
+        self.assertEqual(transducer.first(in_tree), out_trees[0])
+        self.assertIsNone(transducer.first(Tree("S", [Tree("A")])))
+
+    #Yields the outputs in the same order in processes with different string hashing
+    def testTransduceIterOrderAcrossProcesses(self):
+        script = textwrap.dedent("""
+            from src.tree_transducer.TreeTransducer.NBTT import NBTT
+            from src.tree_transducer.Tree import Tree, VarLeaf
+            transducer = NBTT(["qS","qT","qU","qV","qA"],["qS","qT","qU","qV"],["A","S"],["A","B","S"],{
+                                                            (("qA","qA"),"S"):[("qS",Tree("S", [VarLeaf(0), VarLeaf(1)])),("qT",Tree("S", [VarLeaf(1), VarLeaf(0)])),
+                                                                               ("qU",Tree("A", [VarLeaf(0)])),("qV",Tree("B", [VarLeaf(1)]))],
+                                                            (tuple(), "A"):[("qA", Tree("A")), ("qA", Tree("B"))]})
+            print(list(transducer.transduce_iter(Tree("S", [Tree("A"), Tree("A")]))))
+            """)
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        outputs = {subprocess.run([sys.executable, "-c", script], cwd=root, env={**os.environ, "PYTHONHASHSEED": str(seed)},
+                                  capture_output=True, text=True, check=True).stdout for seed in range(4)}
+        self.assertEqual(len(outputs), 1)
+
+    #Returns a single transducer equivalent to applying both transducers in turn
+    def testCompose(self):
+        transducer1 = NBTT(["qS","qA","qC"],["qS"],["A","C","S"],["A","B","S"],{
+                                                        (("qA","qA","qC"),"S"):[("qS",Tree("S", [VarLeaf(1), VarLeaf(0)]))],
+                                                        (tuple(), "A"):[("qA", Tree("A")), ("qA", Tree("B"))],
+                                                        (tuple(), "C"):[("qC", Tree("A"))]})
+        transducer2 = NBTT(["pA","pB","pS"],["pS"],["A","B","S"],["X","Y","Z"],{
+                                                        (("pB","pA"),"S"):[("pS",Tree("Z", [VarLeaf(0), VarLeaf(1), VarLeaf(0)]))],
+                                                        (tuple(), "A"):[("pA", Tree("X"))],
+                                                        (tuple(), "B"):[("pB", Tree("Y")), ("pA", Tree("Z"))]})
+        composition = transducer1.compose(transducer2)
+        self.assertIsInstance(composition, NBTT)
+        in_tree = Tree("S", [Tree("A"), Tree("A"), Tree("C")])
+        out_trees = {out2 for out1 in transducer1.transduce(in_tree) for out2 in transducer2.transduce(out1)}
+        self.assertEqual(set(composition.transduce(in_tree)), out_trees)
+        self.assertIn(Tree("Z", [Tree("Y"), Tree("X"), Tree("Y")]), out_trees)
+        self.assertEqual(composition.transduce(Tree("S", [Tree("A"), Tree("A"), Tree("A")])), [])
+
+    #Falls back to a pipeline when an epsilon cycle would be followed further in the composition than in the transducer
+    def testComposeEpsilonCycle(self):
+        transducer1 = NBTT(["p1","p2"],["p1"],["A"],["A","B","C"],{
+                                                        (tuple(), "A"):[("p1", Tree("A"))],
+                                                        (("p1",),""):[("p2", Tree("B", [VarLeaf(0)]))],
+                                                        (("p2",),""):[("p1", Tree("C", [VarLeaf(0)]))]})
+        transducer2 = NBTT(["a","b","c"],["a","b","c"],["A","B","C"],["A","B","C"],{
+                                                        (tuple(), "A"):[("a", Tree("A"))],
+                                                        (("a",),"B"):[("b", Tree("B", [VarLeaf(0)]))],
+                                                        (("b",),"C"):[("c", Tree("C", [VarLeaf(0)]))]})
+        composition = transducer1.compose(transducer2)
+        self.assertIsInstance(composition, Pipeline)
+        self.assertEqual(set(composition.transduce(Tree("A"))), set(Pipeline([transducer1, transducer2]).transduce(Tree("A"))))
+        self.assertEqual(set(composition.transduce(Tree("A"))), {Tree("A")})
+        self.assertIsInstance(transducer2.compose(transducer1), Pipeline)
+        self.assertRaises(ValueError, transducer1.image, NBTA(["a"],["a"],["A"],{(tuple(),"A"):{"a"}}))
+
+    #Returns automata of the inputs with an output and of the outputs
+    def testDomainRange(self):
+        transducer = NBTT(["qS","qA","qB","qR","qD"],["qR"],["A","B","S"],["A","B","S","R"],{
+                                                        (("qA","qB"),"S"):[("qS",Tree("S", [VarLeaf(1), VarLeaf(0)]))],
+                                                        (("qA","qD"),"S"):[("qS",Tree("S", [VarLeaf(0), VarLeaf(1)]))],
+                                                        (("qB","qB"),"S"):[("qB",VarLeaf(1))],
+                                                        (tuple(), "A"):[("qA", Tree("A"))],
+                                                        (tuple(), "B"):[("qB", Tree("B"))],
+                                                        (("qS",),""):[("qR", Tree("R", [VarLeaf(0)]))]})
+        domain = transducer.domain()
+        self.assertTrue(domain.accepts(Tree("S", [Tree("A"), Tree("S", [Tree("B"), Tree("B")])])))
+        self.assertFalse(domain.accepts(Tree("S", [Tree("B"), Tree("A")])))
+        self.assertFalse(domain.accepts(Tree("A")))
+        self.assertNotIn("qD", domain.states)
+        range_automaton = transducer.range()
+        self.assertTrue(range_automaton.accepts(Tree("R", [Tree("S", [Tree("B"), Tree("A")])])))
+        self.assertFalse(range_automaton.accepts(Tree("S", [Tree("B"), Tree("A")])))
+        self.assertFalse(range_automaton.accepts(Tree("R", [Tree("S", [Tree("A"), Tree("B")])])))
+
+    #Returns automata of the outputs of a language and of the inputs with outputs in a language
+    def testImagePreimage(self):
+        transducer = NBTT(["qS","qA"],["qS"],["A","S"],["A","B","S"],{
+                                                        (("qA","qA"),"S"):[("qS",Tree("S", [VarLeaf(1), VarLeaf(0)]))],
+                                                        (tuple(), "A"):[("qA", Tree("A")), ("qA", Tree("B"))]})
+        inputs = NBTA(["a","s"],["s"],["A","S"],{(tuple(),"A"):{"a"}, (("a","a"),"S"):{"s"}})
+        image = transducer.image(inputs)
+        self.assertTrue(image.accepts(Tree("S", [Tree("B"), Tree("A")])))
+        self.assertFalse(image.accepts(Tree("S", [Tree("S", [Tree("A"), Tree("A")]), Tree("A")])))
+        outputs = NBTA(["a","b","s"],["s"],["A","B","S"],{(tuple(),"A"):{"a"}, (tuple(),"B"):{"b"}, (("b","a"),"S"):{"s"}})
+        preimage = transducer.preimage(outputs)
+        self.assertTrue(preimage.accepts(Tree("S", [Tree("A"), Tree("A")])))
+        self.assertFalse(preimage.accepts(Tree("S", [Tree("S", [Tree("A"), Tree("A")]), Tree("A")])))
+        copying = NBTT(["qA","qS"],["qS"],["A","S"],["A","S"],{
+                                                        (("qA",),"S"):[("qS",Tree("S", [VarLeaf(0), VarLeaf(0)]))],
+                                                        (tuple(), "A"):[("qA", Tree("A"))]})
+        self.assertRaises(ValueError, copying.image, inputs)
+        self.assertRaises(ValueError, copying.preimage, outputs)
+
+    #Returns outputs that share copied subtrees
+    def testDagOutputs(self):
+        transducer = NBTT(["qA"],["qA"],["A","S"],["A","S"],{
+                                                        (("qA",),"S"):[("qA",Tree("S", [VarLeaf(0), VarLeaf(0)]))],
+                                                        (tuple(), "A"):[("qA", Tree("A"))]}, dag=True)
+        in_tree = Tree("A")
+        for i in range(100):
+            in_tree = Tree("S", [in_tree])
+        out_tree = transducer.transduce(in_tree)[0]
+        self.assertIs(out_tree.children[0], out_tree.children[1])
+        self.assertEqual(out_tree, transducer.first(in_tree))
+        self.assertEqual(len(str(out_tree)), len(str(transducer.first(in_tree))))
+        in_tree = Tree("S", [Tree("S", [Tree("A")])])
+        self.assertEqual(transducer.transduce(in_tree)[0].materialize(), Tree("S", [Tree("S", [Tree("A"), Tree("A")]), Tree("S", [Tree("A"), Tree("A")])]))
+
+    #Terminates on epsilon cycles and reports the productive ones
+    def testEpsilonCycle(self):
+        transducer = NBTT(["qA","qB","qC"],["qA","qC"],["A"],["A","B","C"],{
+                                                        (tuple(), "A"):[("qA", Tree("A"))],
+                                                        (("qA",),""):[("qB", Tree("B", [VarLeaf(0)])), ("qC", VarLeaf(0))],
+                                                        (("qB",),""):[("qA", Tree("C", [VarLeaf(0)]))],
+                                                        (("qC",),""):[("qA", VarLeaf(0))]})
+        self.assertEqual(set(transducer.transduce(Tree("A"))), {Tree("A")})
+        self.assertEqual(transducer.epsilon_cycles, [(("qA", "qB"), Tree("C", [Tree("B", [VarLeaf(0)])]))])
+
+    #Builds one epsilon chain per reachable (state, template) pair instead of one per path on dense epsilon graphs
+    def testDenseEpsilonGraph(self):
+        states = [f"q{i}" for i in range(16)]
+        transitions = {((s,), ""):[(t, VarLeaf(0)) for t in states if t != s] for s in states}
+        transitions[(tuple(), "A")] = [("q0", Tree("A"))]
+        transducer = NBTT(states, ["q15"], ["A"], ["A"], transitions)
+        self.assertEqual(len(transducer.epsilon_paths["q0"]), 15)
+        self.assertEqual(transducer.epsilon_cycles, [])
+        self.assertEqual(transducer.transduce(Tree("A")), [Tree("A")])
 
 if __name__ == '__main__':
     suite = unittest.TestLoader().loadTestsFromTestCase(NBTTTests)
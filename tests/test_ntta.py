@@ -122,6 +122,43 @@ class NTTATests(unittest.TestCase):
            S S -> a b
         """, {"S"}, {"a","b"})
 
+    #Returns False if a subtree below the root is rejected
+    def testIncorrectSubtreeRejected(self):
+        automaton = NTTA(["qS","qA","qB"],["qS"],["a","b","S"],{("qS","S", 2):{("qA", "qB")},
+                                                                ("qS", "S", 3):{("qA", "qS", "qB")},
+                                                                ("qA","a",0): {tuple()},
+                                                                ("qB","b",0):{tuple()}})
+        tree = Tree("S", [Tree("a"), Tree("S", [Tree("b"), Tree("a")]), Tree("b")])
+        self.assertFalse(automaton.accepts(tree))
+
+    #Returns acceptance for each tree in a batch
+    def testAcceptsMany(self):
+        automaton = NTTA(["qS","qA","qB","qT","qR"],["qT"],["a","b","S"],{("qS","S", 2):{("qA", "qB"), ("qA", "qA")},
+                                                                ("qS","S", 3):{("qA", "qS", "qB")},
+                                                                ("qA","a",0): {tuple()},
+                                                                ("qB","b",0):{tuple()},
+                                                                ("qT","",1):{("qR",)},
+                                                                ("qR","",1):{("qS",)}})
+        trees = [Tree("S", [Tree("a"), Tree("S", [Tree("a"), Tree("a")]), Tree("b")]),
+                 Tree("S", [Tree("a"), Tree("S", [Tree("b"), Tree("a")]), Tree("b")]),
+                 Tree("S", [Tree("a"), Tree("b")])]
+        self.assertEqual(automaton.accepts_many(trees), [automaton.accepts(tree) for tree in trees])
+        self.assertEqual(automaton.accepts_many(trees), [True, False, True])
+        self.assertGreater(automaton.batch_stats["hits"], 0)
+
+    #Drops rules whose child states accept no tree and checks the most selective child first
+    def testLiveTransitions(self):
+        automaton = NTTA(["qS","qA","qB","qD"],["qS"],["a","b","S"],{("qS","S", 2):{("qA", "qB"), ("qA", "qD")},
+                                                                ("qA","a",0): {tuple()},
+                                                                ("qA","b",0): {tuple()},
+                                                                ("qB","b",0):{tuple()},
+                                                                ("qD","S",2):{("qD", "qA")}})
+        self.assertEqual(automaton.productive_states, {"qS","qA","qB"})
+        self.assertEqual(automaton.live_transitions[("qS","S",2)], [(("qA", "qB"), (1, 0))])
+        self.assertNotIn(("qD","S",2), automaton.live_transitions)
+        self.assertTrue(automaton.accepts(Tree("S", [Tree("a"), Tree("b")])))
+        self.assertFalse(automaton.accepts(Tree("S", [Tree("a"), Tree("S", [Tree("a"), Tree("b")])])))
+
 if __name__ == '__main__':
     suite = unittest.TestLoader().loadTestsFromTestCase(NTTATests)
     runner = unittest.TextTestRunner()
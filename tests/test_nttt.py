@@ -1,5 +1,11 @@
+import os
+import subprocess
+import sys
+import textwrap
 import unittest
 from src.tree_transducer.TreeTransducer.NTTT import NTTT
+from src.tree_transducer.TreeTransducer.Pipeline import Pipeline
+from src.tree_transducer.TreeAutomaton.NTTA import NTTA
 from src.tree_transducer.Tree import Tree, VarLeaf
 
 class NTTTTests(unittest.TestCase):
@@ -78,6 +84,190 @@ class NTTTTests(unittest.TestCase):
         )
         self.assertEqual(transducer1.intersection(transducer2), intersection)
 
+    #Only combines the rules of reachable pairs of states, keeping every child of a rule
+    def testIntersectionReachable(self):
+        transducer1 = NTTT(["qS","qA","qU"],["qS"],["A","S"],["A","S"], {("qS","S",2):{(("qA","qA"),Tree("S", [VarLeaf(1),VarLeaf(0)]))}, ("qA","A",0):{(tuple(),Tree("A"))}, ("qU","A",0):{(tuple(),Tree("A"))}})
+        transducer2 = NTTT(["qS","qA"],["qS"],["A","S"],["A","S"], {("qS","S",2):{(("qA","qA"),Tree("S", [VarLeaf(0),VarLeaf(1)]))}, ("qA","A",0):{(tuple(),Tree("A"))}})
+        intersection = transducer1.intersection(transducer2)
+        self.assertEqual(intersection.states, {"qS_qS", "qA_qA"})
+        self.assertEqual(intersection.transitions[("qS_qS","S",2)], {(("qA_qA","qA_qA"), Tree("S", [VarLeaf(1),VarLeaf(0)])), (("qA_qA","qA_qA"), Tree("S", [VarLeaf(0),VarLeaf(1)]))})
+        self.assertEqual(intersection.transduce(Tree("S", [Tree("A"), Tree("A")])), {Tree("S", [Tree("A"), Tree("A")])})
+
+    #Returns a forest containing the same outputs as transduce
+    def testTransduceForest(self):
+        transducer = NTTT(["qS","qA","qB","qT","qR"],["qT","qR"],["A","B","S"],["A","B","S","R","T"],{
+                        ("qS", "S", 2):{(("qA","qB"),Tree("S", [VarLeaf(0), VarLeaf(1)]))},
+                        ("qS", "S", 3):{(("qA","qS","qB"),Tree("S", [VarLeaf(0), VarLeaf(1), VarLeaf(2)]))},
+                        ("qB", "B", 0):{(tuple(),Tree("B"))},
+                        ("qA", "A", 0):{(tuple(),Tree("A"))},
+                        ("qT", "", 1):{(("qR",),Tree("T", [VarLeaf(0)]))},
+                        ("qR", "", 1):{(("qS",),Tree("R", [VarLeaf(0)]))}
+                        })
+        in_tree = Tree("S", [Tree("A"), Tree("S", [Tree("A"), Tree("B")]), Tree("B")])
+        forest = transducer.transduce_forest(in_tree)
+        self.assertEqual(set(forest), transducer.transduce(in_tree))
+        self.assertEqual(forest.count(), 2)
+        self.assertIn(Tree("R", [Tree("S", [Tree("A"), Tree("S", [Tree("A"), Tree("B")]), Tree("B")])]), forest)
+        self.assertNotIn(Tree("T", [Tree("S", [Tree("A"), Tree("S", [Tree("A"), Tree("B")]), Tree("B")])]), forest)
+
+    #Yields distinct outputs lazily and stops at the limit
+    def testTransduceIter(self):
+        transducer = NTTT(["qS","qA"],["qS"],["A","S"],["A","B","S"],{
+                        ("qS", "S", 2):{(("qA","qA"),Tree("S", [VarLeaf(0), VarLeaf(1)])),(("qA","qA"),Tree("S", [VarLeaf(1), VarLeaf(0)]))},
+                        ("qA", "A", 0):{(tuple(),Tree("A")),(tuple(),Tree("B"))}
+                        })
+        in_tree = Tree("S", [Tree("A"), Tree("A")])
+        out_trees = list(transducer.transduce_iter(in_tree))
+        self.assertEqual(len(out_trees), 4)
+        self.assertEqual(set(out_trees), transducer.transduce(in_tree))
+        self.assertEqual(list(transducer.transduce_iter(in_tree, limit=3)), out_trees[:3])
+        self.assertEqual(transducer.first(in_tree), out_trees[0])
+        self.assertIsNone(transducer.first(Tree("S", [Tree("A")])))
+
+    #Yields the outputs in the same order in processes with different string hashing
+    def testTransduceIterOrderAcrossProcesses(self):
+        script = textwrap.dedent("""
+            from src.tree_transducer.TreeTransducer.NTTT import NTTT
+            from src.tree_transducer.Tree import Tree, VarLeaf
+            transducer = NTTT(["qS","qT","qU","qA","qB"],["qS","qT","qU"],["A","S"],["A","B","C","S"],{
+                            ("qS", "S", 2):{(("qA","qA"),Tree("S", [VarLeaf(0), VarLeaf(1)])),(("qA","qB"),Tree("S", [VarLeaf(1), VarLeaf(0)]))},
+                            ("qT", "", 1):{(("qS",),Tree("S", [VarLeaf(0)])),(("qU",),Tree("C", [VarLeaf(0)]))},
+                            ("qU", "S", 2):{(("qB","qB"),Tree("S", [VarLeaf(0), VarLeaf(1)])),(("qB","qA"),Tree("C", [VarLeaf(1), VarLeaf(0)]))},
+                            ("qA", "A", 0):{(tuple(),Tree("A")),(tuple(),Tree("B")),(tuple(),Tree("C"))},
+                            ("qB", "A", 0):{(tuple(),Tree("B")),(tuple(),Tree("C")),(tuple(),Tree("S"))}
+                            })
+            print(list(transducer.transduce_iter(Tree("S", [Tree("A"), Tree("A")]), limit=20)))
+            """)
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        outputs = {subprocess.run([sys.executable, "-c", script], cwd=root, env={**os.environ, "PYTHONHASHSEED": str(seed)},
+                                  capture_output=True, text=True, check=True).stdout for seed in range(4)}
+        self.assertEqual(len(outputs), 1)
+
+    #Terminates on epsilon cycles and shares the outputs of repeated subtrees
+    def testMemoizedTransduction(self):
+        transducer = NTTT(["qA","qB"],["qA"],["A"],["A","B","C"],{
+                        ("qA", "A", 2):{(("qA","qA"),Tree("A", [VarLeaf(0), VarLeaf(1)]))},
+                        ("qA", "A", 0):{(tuple(),Tree("A"))},
+                        ("qA", "", 1):{(("qB",),Tree("B", [VarLeaf(0)]))},
+                        ("qB", "", 1):{(("qA",),Tree("C", [VarLeaf(0)]))},
+                        ("qB", "A", 0):{(tuple(),Tree("C"))}
+                        })
+        self.assertEqual(transducer.transduce(Tree("A")), {Tree("A"), Tree("B", [Tree("C")])})
+        transducer = NTTT(["qA"],["qA"],["A"],["A"],{
+                        ("qA", "A", 2):{(("qA","qA"),Tree("A", [VarLeaf(1), VarLeaf(0)]))},
+                        ("qA", "A", 0):{(tuple(),Tree("A"))}
+                        })
+        in_tree = Tree("A")
+        for i in range(12):
+            in_tree = Tree("A", [in_tree, Tree("A", [in_tree, Tree("A")])])
+        self.assertEqual(len(transducer.transduce(in_tree)), 1)
+
+    #Builds one epsilon chain per reachable (state, template) pair instead of one per path on dense epsilon graphs
+    def testDenseEpsilonGraph(self):
+        states = [f"q{i}" for i in range(16)]
+        transitions = {(s, "", 1):{((t,), VarLeaf(0)) for t in states if t != s} for s in states}
+        transitions[("q15", "A", 0)] = {(tuple(), Tree("A"))}
+        transducer = NTTT(states, ["q0"], ["A"], ["A"], transitions)
+        self.assertEqual(len(transducer.epsilon_paths["q0"]), 15)
+        self.assertEqual(transducer.epsilon_cycles, [])
+        self.assertEqual(transducer.transduce(Tree("A")), {Tree("A")})
+
+    #Returns a single transducer equivalent to applying both transducers in turn
+    def testCompose(self):
+        transducer1 = NTTT(["qS","qA","qC"],["qS"],["A","C","S"],["A","B","S"],{
+                        ("qS", "S", 3):{(("qA","qA","qC"),Tree("S", [VarLeaf(1), VarLeaf(0)]))},
+                        ("qA", "A", 0):{(tuple(),Tree("A")),(tuple(),Tree("B"))},
+                        ("qC", "C", 0):{(tuple(),Tree("A"))}
+                        })
+        transducer2 = NTTT(["pA","pB","pS","pT"],["pT"],["A","B","S"],["W","X","Y","Z"],{
+                        ("pS", "S", 2):{(("pB","pA"),Tree("Z", [VarLeaf(0), VarLeaf(1), VarLeaf(0)]))},
+                        ("pA", "A", 0):{(tuple(),Tree("X"))},
+                        ("pB", "B", 0):{(tuple(),Tree("Y"))},
+                        ("pA", "B", 0):{(tuple(),Tree("Z"))},
+                        ("pT", "", 1):{(("pS",),Tree("W", [VarLeaf(0)]))}
+                        })
+        composition = transducer1.compose(transducer2)
+        self.assertIsInstance(composition, NTTT)
+        in_tree = Tree("S", [Tree("A"), Tree("A"), Tree("C")])
+        out_trees = {out2 for out1 in transducer1.transduce(in_tree) for out2 in transducer2.transduce(out1)}
+        self.assertEqual(composition.transduce(in_tree), out_trees)
+        self.assertIn(Tree("W", [Tree("Z", [Tree("Y"), Tree("X"), Tree("Y")])]), out_trees)
+        self.assertEqual(composition.transduce(Tree("S", [Tree("A"), Tree("A"), Tree("A")])), set())
+
+    #Falls back to a pipeline when an epsilon cycle would be followed further in the composition than in the transducer
+    def testComposeEpsilonCycle(self):
+        transducer1 = NTTT(["p1","p2"],["p1"],["A"],["A","B","C"],{
+                        ("p1", "A", 0):{(tuple(),Tree("A"))},
+                        ("p1", "", 1):{(("p2",),Tree("B", [VarLeaf(0)]))},
+                        ("p2", "", 1):{(("p1",),Tree("C", [VarLeaf(0)]))}
+                        })
+        transducer2 = NTTT(["q0","q1","q2"],["q0"],["A","B","C"],["A","B","C"],{
+                        ("q0", "A", 0):{(tuple(),Tree("A"))},
+                        ("q2", "A", 0):{(tuple(),Tree("A"))},
+                        ("q0", "B", 1):{(("q1",),Tree("B", [VarLeaf(0)]))},
+                        ("q1", "C", 1):{(("q2",),Tree("C", [VarLeaf(0)]))}
+                        })
+        composition = transducer1.compose(transducer2)
+        self.assertIsInstance(composition, Pipeline)
+        self.assertEqual(set(composition.transduce(Tree("A"))), set(Pipeline([transducer1, transducer2]).transduce(Tree("A"))))
+        self.assertEqual(set(composition.transduce(Tree("A"))), {Tree("A")})
+
+    #Returns automata of the inputs with an output and of the outputs
+    def testDomainRange(self):
+        transducer = NTTT(["qS","qA","qB","qR","qD"],["qR"],["A","B","S"],["A","B","S","R"],{
+                        ("qS", "S", 2):{(("qA","qB"),Tree("S", [VarLeaf(1), VarLeaf(0)])),(("qA","qD"),Tree("S", [VarLeaf(0), VarLeaf(1)]))},
+                        ("qB", "S", 2):{(("qB","qB"),VarLeaf(1))},
+                        ("qA", "A", 0):{(tuple(),Tree("A"))},
+                        ("qB", "B", 0):{(tuple(),Tree("B"))},
+                        ("qR", "", 1):{(("qS",),Tree("R", [VarLeaf(0)]))}
+                        })
+        domain = transducer.domain()
+        self.assertTrue(domain.accepts(Tree("S", [Tree("A"), Tree("S", [Tree("B"), Tree("B")])])))
+        self.assertFalse(domain.accepts(Tree("S", [Tree("B"), Tree("A")])))
+        self.assertFalse(domain.accepts(Tree("A")))
+        self.assertNotIn("qD", domain.states)
+        range_automaton = transducer.range()
+        self.assertTrue(range_automaton.accepts(Tree("R", [Tree("S", [Tree("B"), Tree("A")])])))
+        self.assertFalse(range_automaton.accepts(Tree("S", [Tree("B"), Tree("A")])))
+        self.assertFalse(range_automaton.accepts(Tree("R", [Tree("S", [Tree("A"), Tree("B")])])))
+
+    #Returns automata of the outputs of a language and of the inputs with outputs in a language
+    def testImagePreimage(self):
+        transducer = NTTT(["qS","qA"],["qS"],["A","S"],["A","B","S"],{
+                        ("qS", "S", 2):{(("qA","qA"),Tree("S", [VarLeaf(1), VarLeaf(0)]))},
+                        ("qA", "A", 0):{(tuple(),Tree("A")),(tuple(),Tree("B"))}
+                        })
+        inputs = NTTA(["a","s"],["s"],["A","S"],{("a","A",0):{tuple()}, ("s","S",2):{("a","a")}})
+        image = transducer.image(inputs)
+        self.assertTrue(image.accepts(Tree("S", [Tree("B"), Tree("A")])))
+        self.assertFalse(image.accepts(Tree("S", [Tree("S", [Tree("A"), Tree("A")]), Tree("A")])))
+        outputs = NTTA(["a","b","s"],["s"],["A","B","S"],{("a","A",0):{tuple()}, ("b","B",0):{tuple()}, ("s","S",2):{("b","a")}})
+        preimage = transducer.preimage(outputs)
+        self.assertTrue(preimage.accepts(Tree("S", [Tree("A"), Tree("A")])))
+        self.assertFalse(preimage.accepts(Tree("S", [Tree("S", [Tree("A"), Tree("A")]), Tree("A")])))
+        copying = NTTT(["qA","qS"],["qS"],["A","S"],["A","S"],{
+                        ("qS", "S", 1):{(("qA",),Tree("S", [VarLeaf(0), VarLeaf(0)]))},
+                        ("qA", "A", 0):{(tuple(),Tree("A"))}
+                        })
+        self.assertRaises(ValueError, copying.image, inputs)
+        self.assertRaises(ValueError, copying.preimage, outputs)
+
+    #Drops rules whose child states have no output without changing the transduction
+    def testLiveTransitions(self):
+        transducer = NTTT(["qS","qA","qB","qD"],["qS"],["A","B","S"],["A","B","S"],{
+                        ("qS", "S", 2):{(("qA","qB"),Tree("S", [VarLeaf(1), VarLeaf(0)])),(("qD","qB"),Tree("S", [VarLeaf(0), VarLeaf(1)]))},
+                        ("qD", "S", 2):{(("qD","qB"),Tree("S", [VarLeaf(0), VarLeaf(1)]))},
+                        ("qB", "B", 0):{(tuple(),Tree("B"))},
+                        ("qA", "A", 0):{(tuple(),Tree("A"))},
+                        ("qA", "B", 0):{(tuple(),Tree("A"))}
+                        })
+        self.assertEqual(transducer.productive_states, {"qS","qA","qB"})
+        self.assertEqual([(rule[0], order) for (rule, _, order) in transducer.live_transitions[("qS","S",2)]], [(("qA","qB"), (1, 0))])
+        self.assertNotIn(("qD","S",2), transducer.live_transitions)
+        in_tree = Tree("S", [Tree("A"), Tree("B")])
+        self.assertEqual(transducer.transduce(in_tree), {Tree("S", [Tree("B"), Tree("A")])})
+        self.assertEqual(set(transducer.transduce_iter(in_tree)), {Tree("S", [Tree("B"), Tree("A")])})
+
 if __name__ == '__main__':
     suite = unittest.TestLoader().loadTestsFromTestCase(NTTTTests)
     runner = unittest.TextTestRunner()
@@ -0,0 +1,52 @@
+import unittest
+from src.tree_transducer.TreeTransducer.NBTT import NBTT
+from src.tree_transducer.Tree import Tree, VarLeaf
+
+class OutputForestTests(unittest.TestCase):
+    #Counts outputs without enumerating them
+    def testCount(self):
+        transducer = NBTT(["qA"],["qA"],["A"],["A","B"],{
+                                                        (("qA","qA"),"A"):[("qA",Tree("A", [VarLeaf(0), VarLeaf(1)]))],
+                                                        (tuple(), "A"):[("qA", Tree("A")), ("qA", Tree("B"))]})
+        in_tree = Tree("A")
+        for i in range(40):
+            in_tree = Tree("A", [in_tree, Tree("A")])
+        forest = transducer.transduce_forest(in_tree)
+        self.assertEqual(forest.count(), 2 ** 41)
+        self.assertEqual(len(forest), 41)
+
+    #Counts distinct outputs separately from derivations
+    def testCountDistinct(self):
+        transducer = NBTT(["qA","qS"],["qS"],["A","S"],["A","B","S"],{
+                                                        (("qA","qA"),"S"):[("qS",Tree("S", [VarLeaf(0), VarLeaf(1)])),("qS",Tree("S", [VarLeaf(1), VarLeaf(0)])),("qS",Tree("S", [VarLeaf(0)]))],
+                                                        (tuple(), "A"):[("qA", Tree("A")), ("qA", Tree("B"))]})
+        in_tree = Tree("S", [Tree("A"), Tree("A")])
+        self.assertEqual(transducer.count_outputs(in_tree), 12)
+        self.assertEqual(transducer.count_outputs(in_tree, distinct=True), 6)
+        self.assertEqual(transducer.count_outputs(in_tree, distinct=True), len(set(transducer.transduce(in_tree))))
+        self.assertEqual(transducer.count_outputs(Tree("S", [Tree("A")])), 0)
+
+    #Checks membership of copied subtrees
+    def testContainsCopies(self):
+        transducer = NBTT(["qA","qS"],["qS"],["A","S"],["A","B","S"],{
+                                                        (("qA",),"S"):[("qS",Tree("S", [VarLeaf(0), VarLeaf(0)]))],
+                                                        (tuple(), "A"):[("qA", Tree("A")), ("qA", Tree("B"))]})
+        forest = transducer.transduce_forest(Tree("S", [Tree("A")]))
+        self.assertIn(Tree("S", [Tree("A"), Tree("A")]), forest)
+        self.assertIn(Tree("S", [Tree("B"), Tree("B")]), forest)
+        self.assertNotIn(Tree("S", [Tree("A"), Tree("B")]), forest)
+        self.assertNotIn("S", forest)
+        self.assertEqual(set(forest), {Tree("S", [Tree("A"), Tree("A")]), Tree("S", [Tree("B"), Tree("B")])})
+
+    #Leaves the forest empty if the tree is rejected
+    def testEmpty(self):
+        transducer = NBTT(["qA"],["qA"],["A"],["A"],{(tuple(), "A"):[("qA", Tree("A"))]})
+        forest = transducer.transduce_forest(Tree("A", [Tree("A")]))
+        self.assertEqual(forest.count(), 0)
+        self.assertEqual(list(forest), [])
+
+if __name__ == '__main__':
+    suite = unittest.TestLoader().loadTestsFromTestCase(OutputForestTests)
+    runner = unittest.TextTestRunner()
+    result = runner.run(suite)
+    print(result)
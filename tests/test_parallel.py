@@ -0,0 +1,44 @@
+import os
+import tempfile
+import unittest
+from src.tree_transducer.Parallel import run_parallel
+from src.tree_transducer.TreeAutomaton.NBTA import NBTA
+from src.tree_transducer.TreeTransducer.NBTT import NBTT
+from src.tree_transducer.Tree import Tree, VarLeaf
+
+class ParallelTests(unittest.TestCase):
+    automaton = NBTA(["qA"],["qA"],["A"],{(("qA","qA"),"A"):{"qA"}, (tuple(),"A"):{"qA"}})
+    trees = [Tree("A"), Tree("A", [Tree("A")]), Tree("A", [Tree("A"), Tree("A")]),
+             Tree("A", [Tree("A"), Tree("A", [Tree("A"), Tree("A")])]), Tree("B")] * 5
+
+    #Returns the results of accepts in the order of the input
+    def testAccepts(self):
+        results = list(run_parallel(self.automaton, self.trees, workers=2, chunk_size=3, max_in_flight=2))
+        self.assertEqual(results, [self.automaton.accepts(tree) for tree in self.trees])
+
+    #Returns the results of transduce in the order of the input
+    def testTransduce(self):
+        transducer = NBTT(["qA"],["qA"],["A"],["B"],{(("qA","qA"),"A"):[("qA",Tree("B", [VarLeaf(1), VarLeaf(0)]))], (tuple(),"A"):[("qA",Tree("B"))]})
+        results = list(run_parallel(transducer, self.trees, workers=2, chunk_size=4))
+        self.assertEqual(results, [transducer.transduce(tree) for tree in self.trees])
+
+    #Reads the trees from a corpus file
+    def testCorpusFile(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "corpus.txt")
+            with open(path, "w") as corpus:
+                corpus.write("\n".join(str(tree) for tree in self.trees) + "\n\n")
+            results = list(run_parallel(self.automaton, path, workers=2, chunk_size=2))
+        self.assertEqual(results, [self.automaton.accepts(tree) for tree in self.trees])
+
+    #Raises error when called if the chunk size, number of workers or number of chunks in flight is not positive
+    def testInvalidArguments(self):
+        self.assertRaises(ValueError, run_parallel, self.automaton, self.trees, chunk_size=0)
+        self.assertRaises(ValueError, run_parallel, self.automaton, self.trees, workers=0)
+        self.assertRaises(ValueError, run_parallel, self.automaton, self.trees, workers=2, max_in_flight=0)
+
+if __name__ == '__main__':
+    suite = unittest.TestLoader().loadTestsFromTestCase(ParallelTests)
+    runner = unittest.TextTestRunner()
+    result = runner.run(suite)
+    print(result)
@@ -0,0 +1,42 @@
+import unittest
+from src.tree_transducer.TreeTransducer.NBTT import NBTT
+from src.tree_transducer.TreeTransducer.NTTT import NTTT
+from src.tree_transducer.TreeTransducer.Pipeline import Pipeline
+from src.tree_transducer.Tree import Tree, VarLeaf
+
+class PipelineTests(unittest.TestCase):
+    #Falls back to a pipeline if the first transducer copies its input
+    def testCopyingComposition(self):
+        transducer1 = NBTT(["qA","qS"],["qS"],["A","S"],["A","S"],{
+                                                        (("qA",),"S"):[("qS",Tree("S", [VarLeaf(0), VarLeaf(0)]))],
+                                                        (tuple(), "A"):[("qA", Tree("A"))]})
+        transducer2 = NBTT(["pA","pS"],["pS"],["A","S"],["B","C","S"],{
+                                                        (("pA","pA"),"S"):[("pS",Tree("S", [VarLeaf(0), VarLeaf(1)]))],
+                                                        (tuple(), "A"):[("pA", Tree("B")), ("pA", Tree("C"))]})
+        composition = transducer1.compose(transducer2)
+        self.assertIsInstance(composition, Pipeline)
+        out_trees = composition.transduce(Tree("S", [Tree("A")]))
+        self.assertEqual(len(out_trees), 4)
+        self.assertIn(Tree("S", [Tree("B"), Tree("C")]), out_trees)
+        self.assertEqual(composition.first(Tree("A")), None)
+
+    #Falls back to a pipeline for transducers of different types
+    def testMixedComposition(self):
+        transducer1 = NBTT(["qA"],["qA"],["A"],["B"],{(tuple(), "A"):[("qA", Tree("B"))]})
+        transducer2 = NTTT(["pB"],["pB"],["B"],["C"],{("pB", "B", 0):{(tuple(),Tree("C"))}})
+        composition = transducer1.compose(transducer2)
+        self.assertIsInstance(composition, Pipeline)
+        self.assertEqual(composition.transduce(Tree("A")), [Tree("C")])
+        composition = composition.compose(transducer1.compose(transducer1))
+        self.assertEqual(len(composition.stages), 3)
+        self.assertEqual(composition.transduce(Tree("A")), [])
+
+    #Raises error if the pipeline has no stages
+    def testEmptyPipeline(self):
+        self.assertRaises(ValueError, Pipeline, [])
+
+if __name__ == '__main__':
+    suite = unittest.TestLoader().loadTestsFromTestCase(PipelineTests)
+    runner = unittest.TextTestRunner()
+    result = runner.run(suite)
+    print(result)
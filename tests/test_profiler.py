@@ -0,0 +1,102 @@
+import unittest
+from src.tree_transducer.Profiler import Profiler
+from src.tree_transducer.TreeAutomaton.NBTA import NBTA
+from src.tree_transducer.TreeAutomaton.DBTA import DBTA
+from src.tree_transducer.TreeAutomaton.NTTA import NTTA
+from src.tree_transducer.TreeAutomaton.DTTA import DTTA
+from src.tree_transducer.TreeTransducer.NBTT import NBTT
+from src.tree_transducer.TreeTransducer.NTTT import NTTT
+from src.tree_transducer.Tree import Tree, VarLeaf
+
+class ProfilerTests(unittest.TestCase):
+    #Counts lookups, combinations and rule hits of bottom-up runs and finds hot and dead rules
+    def testBottomUpRun(self):
+        automaton = NBTA(["qA","qB"],["qB"],["A","B"],{(("qA","qA"),"A"):{"qA","qB"}, (tuple(),"A"):{"qA"}, (tuple(),"B"):{"qB"}})
+        automaton.profiler = Profiler()
+        self.assertTrue(automaton.accepts(Tree("A", [Tree("A"), Tree("A", [Tree("A"), Tree("A")])])))
+        profiler = automaton.profiler
+        self.assertEqual(profiler.counters["lookups"], 12)
+        self.assertEqual(profiler.counters["combinations"], 6)
+        self.assertEqual(profiler.peaks["states"], 2)
+        self.assertEqual(profiler.rule_hits[((tuple(), "A"), "qA")], 3)
+        self.assertEqual(profiler.hot_rules(1), [(((tuple(), "A"), "qA"), 3)])
+        self.assertEqual(profiler.dead_rules(automaton), [((tuple(), "B"), "qB")])
+        automaton = NBTA(["qA","qB"],["qB"],["A","B"],{(tuple(),"A"):{"qA"}, (tuple(),"B"):{"qB"}, (("qA",),""):{"qB"}, (("qB",),""):{"qA"}})
+        automaton.profiler = Profiler()
+        self.assertTrue(automaton.accepts(Tree("A", [Tree("A")])))
+        self.assertEqual(automaton.profiler.dead_rules(automaton), [((tuple(), "B"), "qB"), ((("qB",), ""), "qA")])
+
+    #Counts the rules and epsilon expansions of top-down runs
+    def testTopDownRun(self):
+        automaton = NTTA(["qA","qB"],["qA"],["A"],{("qA","A",2):{("qB","qB")}, ("qB","",1):{("qA",)}, ("qA","A",0):{tuple()}, ("qB","A",1):{("qA",)}})
+        automaton.profiler = Profiler()
+        self.assertTrue(automaton.accepts(Tree("A", [Tree("A"), Tree("A")])))
+        self.assertEqual(automaton.profiler.counters["epsilon_expansions"], 2)
+        self.assertEqual(automaton.profiler.dead_rules(automaton), [(("qB","A",1), ("qA",))])
+        automaton = NTTA(["qA","qB","qC"],["qA"],["A","B","C"],{("qA","A",1):{("qB",), ("qC",)}, ("qB","B",0):{tuple()}, ("qC","C",0):{tuple()}})
+        automaton.profiler = Profiler()
+        for i in range(2):
+            self.assertTrue(automaton.accepts(Tree("A", [Tree("B")])))
+        self.assertEqual(automaton.profiler.rule_hits[(("qA","A",1), ("qB",))], 2)
+        self.assertEqual(automaton.profiler.dead_rules(automaton), [(("qA","A",1), ("qC",)), (("qC","C",0), tuple())])
+        automaton = DTTA(["qA","qB","qC"],["qA"],["A","B","C"],{("qA","A",1):{("qB",)}, ("qB","B",0):{tuple()}, ("qC","C",0):{tuple()}})
+        automaton.profiler = Profiler()
+        self.assertTrue(automaton.accepts(Tree("A", [Tree("B")])))
+        self.assertFalse(automaton.accepts(Tree("A", [Tree("C")])))
+        self.assertEqual(automaton.profiler.counters["lookups"], 4)
+        self.assertEqual(automaton.profiler.rule_hits[(("qA","A",1), ("qB",))], 1)
+        self.assertEqual(automaton.profiler.dead_rules(automaton), [(("qC","C",0), tuple())])
+
+    #Counts the rule hits, epsilon expansions and outputs of transductions
+    def testTransduce(self):
+        transducer = NBTT(["qA","qB"],["qB"],["A"],["A","B"],{
+                                                        (("qA","qA"),"A"):[("qA",Tree("A", [VarLeaf(0), VarLeaf(1)]))],
+                                                        (tuple(), "A"):[("qA", Tree("A")), ("qA", Tree("B"))],
+                                                        (("qA",), ""):[("qB", Tree("B", [VarLeaf(0)]))]})
+        transducer.profiler = Profiler()
+        self.assertEqual(len(transducer.transduce(Tree("A", [Tree("A"), Tree("A")]))), 4)
+        profiler = transducer.profiler
+        self.assertEqual(profiler.counters["combinations"], 8)
+        self.assertEqual(profiler.counters["epsilon_expansions"], 8)
+        self.assertEqual(profiler.peaks["outputs"], 8)
+        self.assertEqual(profiler.rule_hits[((("qA",), ""), ("qB", Tree("B", [VarLeaf(0)])))], 3)
+        self.assertEqual(profiler.dead_rules(transducer), [])
+        transducer = NBTT(["qA","qB","qC"],["qB"],["A"],["A","B"],{
+                                                        (tuple(), "A"):[("qA", Tree("A"))],
+                                                        (("qA",), ""):[("qB", Tree("B", [VarLeaf(0)]))],
+                                                        (("qC",), ""):[("qB", VarLeaf(0))]})
+        transducer.profiler = Profiler()
+        self.assertEqual(transducer.transduce(Tree("A")), [Tree("B", [Tree("A")])])
+        self.assertEqual(transducer.profiler.dead_rules(transducer), [((("qC",), ""), ("qB", VarLeaf(0)))])
+        transducer = NTTT(["qA"],["qA"],["A"],["A","B"],{
+                        ("qA", "A", 2):{(("qA","qA"),Tree("A", [VarLeaf(0), VarLeaf(1)]))},
+                        ("qA", "A", 0):{(tuple(),Tree("A")), (tuple(),Tree("B"))},
+                        ("qA", "A", 1):{(("qA",),Tree("A", [VarLeaf(0)]))}})
+        transducer.profiler = Profiler()
+        self.assertEqual(len(transducer.transduce(Tree("A", [Tree("A"), Tree("A")]))), 4)
+        self.assertEqual(transducer.profiler.counters["combinations"], 6)
+        self.assertEqual(transducer.profiler.dead_rules(transducer), [(("qA", "A", 1), (("qA",),Tree("A", [VarLeaf(0)])))])
+
+    #Times the phases of constructions and exports the statistics through the callback
+    def testPhasesAndFlush(self):
+        automaton = DBTA(["qA","qB","qC"],["qA"], ["A","B","C"], {(("qA",),"A"): {"qA"}, (tuple(),"A"): {"qA"},
+                                                                  (tuple(),"B"): {"qB"}, (("qB",),"B"): {"qB"},
+                                                                  (tuple(),"C"): {"qC"}, (("qC","qC"),"C"): {"qC"}})
+        exported = []
+        automaton.profiler = Profiler(exported.append)
+        automaton.minimize()
+        automaton.determinize()
+        metrics = automaton.profiler.flush()
+        self.assertEqual(exported, [metrics])
+        for phase in ["minimize.rule_pairs", "minimize.refine", "minimize.classes", "minimize.build",
+                      "determinize.arities", "determinize.constants", "determinize.subsets", "determinize.build"]:
+            self.assertIn(f"seconds_{phase}", metrics)
+        self.assertEqual(metrics["subset_states"], 3)
+        self.assertGreater(metrics["refine_rounds"], 0)
+        self.assertEqual(automaton.profiler.snapshot(), dict())
+
+if __name__ == '__main__':
+    suite = unittest.TestLoader().loadTestsFromTestCase(ProfilerTests)
+    runner = unittest.TextTestRunner()
+    result = runner.run(suite)
+    print(result)
@@ -0,0 +1,69 @@
+import pickle
+import unittest
+from src.tree_transducer.SharedTable import SharedTable, SharedAutomaton
+from src.tree_transducer.Parallel import run_parallel
+from src.tree_transducer.TreeAutomaton.NBTA import NBTA
+from src.tree_transducer.TreeAutomaton.NTTA import NTTA
+from src.tree_transducer.TreeTransducer.NBTT import NBTT
+from src.tree_transducer.Tree import Tree
+
+class SharedTableTests(unittest.TestCase):
+    trees = [Tree("S", [Tree("A"), Tree("S", [Tree("A"), Tree("B")]), Tree("B")]),
+             Tree("S", [Tree("A"), Tree("B")]),
+             Tree("S", [Tree("B"), Tree("A")]),
+             Tree("S", [Tree("A"), Tree("S", [Tree("A")]), Tree("B")]),
+             Tree("C")]
+
+    #Returns the same results as the bottom-up automaton
+    def testBottomUpAutomaton(self):
+        automaton = NBTA(["qS","qA","qB","qT"],["qT"],["A","B","S"],{(("qA","qB"),"S"):{"qS"},
+                                                                     (("qA","qS","qB"),"S"):{"qS"},
+                                                                     (tuple(),"A"):{"qA"},
+                                                                     (tuple(),"B"):{"qB","qA"},
+                                                                     (("qS",),""):{"qT"}})
+        with SharedTable.create(automaton) as table:
+            self.assertIsInstance(table, SharedAutomaton)
+            self.assertEqual([table.accepts(tree) for tree in self.trees], [automaton.accepts(tree) for tree in self.trees])
+            self.assertEqual(table.accepts_many(self.trees), automaton.accepts_many(self.trees))
+
+    #Returns the same results as the top-down automaton
+    def testTopDownAutomaton(self):
+        automaton = NTTA(["qS","qA","qB","qT"],["qT"],["A","B","S"],{("qS","S", 2):{("qA", "qB"), ("qB", "qA")},
+                                                                     ("qS","S", 3):{("qA", "qS", "qB")},
+                                                                     ("qA","A",0): {tuple()},
+                                                                     ("qB","B",0):{tuple()},
+                                                                     ("qT","",1):{("qS",)}})
+        with SharedTable.create(automaton) as table:
+            self.assertEqual([table.accepts(tree) for tree in self.trees], [automaton.accepts(tree) for tree in self.trees])
+            self.assertEqual(table.accepts_many(self.trees), automaton.accepts_many(self.trees))
+
+    #Attaches to the same block of memory when pickled and only lets the owner unlink it
+    def testAttach(self):
+        automaton = NBTA(["qA"],["qA"],["A"],{(("qA","qA"),"A"):{"qA"}, (tuple(),"A"):{"qA"}})
+        with SharedTable.create(automaton) as table:
+            attached = pickle.loads(pickle.dumps(table))
+            self.assertEqual(attached.name, table.name)
+            self.assertFalse(attached.owner)
+            self.assertTrue(attached.accepts(Tree("A", [Tree("A"), Tree("A")])))
+            self.assertRaises(PermissionError, attached.unlink)
+            attached.close()
+
+    #Is shared by parallel workers
+    def testParallel(self):
+        automaton = NBTA(["qA"],["qA"],["A"],{(("qA","qA"),"A"):{"qA"}, (tuple(),"A"):{"qA"}})
+        trees = [Tree("A"), Tree("A", [Tree("A")]), Tree("A", [Tree("A"), Tree("A")])] * 4
+        with SharedTable.create(automaton) as table:
+            results = list(run_parallel(table, trees, workers=2, chunk_size=2))
+        self.assertEqual(results, [automaton.accepts(tree) for tree in trees])
+
+    #Raises error if the machine is not an automaton
+    def testInvalidMachine(self):
+        self.assertRaises(TypeError, SharedTable.create, Tree("A"))
+        transducer = NBTT(["qA"],["qA"],["A"],["A"],{(tuple(), "A"):[("qA", Tree("A"))]})
+        self.assertRaises(TypeError, SharedTable.create, transducer)
+
+if __name__ == '__main__':
+    suite = unittest.TestLoader().loadTestsFromTestCase(SharedTableTests)
+    runner = unittest.TextTestRunner()
+    result = runner.run(suite)
+    print(result)
@@ -1,11 +1,62 @@
 import unittest
-from src.tree_transducer.Tree import Tree
+from src.tree_transducer.Tree import Tree, VarLeaf, SubtreeIndex, Template, DagTree
 
 class TreeTests(unittest.TestCase):
     #Raises error if Tree has a None node with children
     def testTreeEmptyNode(self):
         self.assertRaises(ValueError, Tree, None, ["A"])
 
+    #Gives structurally equal subtrees the same id
+    def testSubtreeIndex(self):
+        index = SubtreeIndex()
+        tree_id = index.get_id(Tree("A", [Tree("B"), Tree("C", [Tree("B")])]))
+        self.assertEqual(index.get_id(Tree("A", [Tree("B"), Tree("C", [Tree("B")])])), tree_id)
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.nodes[tree_id], ("A", (0, 1)))
+
+    #Creates a tree from its string form
+    def testFromString(self):
+        tree = Tree("S", [Tree("a"), Tree("S", [Tree("b")]), Tree("c")])
+        self.assertEqual(Tree.from_string(str(tree)), tree)
+        self.assertRaises(ValueError, Tree.from_string, "S(a(),b()")
+        self.assertRaises(ValueError, Tree.from_string, "S(a(),)")
+        self.assertRaises(ValueError, Tree.from_string, "S(a()b())")
+
+    #Fills a compiled template, sharing its constant subtrees
+    def testTemplate(self):
+        constant = Tree("C", [Tree("D")])
+        tree = Tree("A", [VarLeaf(1), constant, Tree("B", [VarLeaf(0), VarLeaf(1)])])
+        template = Template(tree)
+        trees = (Tree("X"), Tree("Y", [Tree("Z")]))
+        filled = template.fill(trees)
+        self.assertEqual(filled, tree.fill(trees))
+        self.assertIs(filled.children[1], constant)
+        self.assertIs(filled.children[0], trees[1])
+        self.assertIs(Template(constant).fill(()), constant)
+        self.assertEqual(Template(VarLeaf(0)).fill(trees), Tree("X"))
+
+    #Compares, hashes and prints shared subtrees without expanding them
+    def testDagTree(self):
+        shared = DagTree("B", [Tree("C")])
+        dag = DagTree("A", [shared, shared])
+        tree = Tree("A", [Tree("B", [Tree("C")]), Tree("B", [Tree("C")])])
+        self.assertEqual(dag, tree)
+        self.assertEqual(tree, dag)
+        self.assertEqual(hash(dag), hash(tree))
+        self.assertNotEqual(dag, Tree("A", [Tree("B", [Tree("C")]), Tree("B")]))
+        self.assertEqual(str(dag), "A(#1=B(C()),#1)")
+        self.assertEqual(str(dag.materialize()), str(tree))
+        self.assertIs(type(dag.materialize()), Tree)
+        self.assertIs(tree.materialize(), tree)
+
+    #Converts a tree to events and back
+    def testEvents(self):
+        tree = Tree("S", [Tree("A"), Tree("S", [Tree("B")])])
+        self.assertEqual(list(tree.to_events()), [("open", "S", 2), ("open", "A", 0), ("close",), ("open", "S", 1), ("open", "B", 0), ("close",), ("close",), ("close",)])
+        self.assertEqual(Tree.from_events(tree.to_events()), tree)
+        self.assertRaises(ValueError, Tree.from_events, [("open", "S", 2), ("open", "A", 0), ("close",), ("close",)])
+        self.assertRaises(ValueError, Tree.from_events, [("open", "A", 0)])
+
 if __name__ == '__main__':
     suite = unittest.TestLoader().loadTestsFromTestCase(TreeTests)
     runner = unittest.TextTestRunner()
@@ -0,0 +1,59 @@
+import unittest
+from src.tree_transducer.TreeTransducer.WNBTT import WNBTT
+from src.tree_transducer.Semiring import VITERBI
+from src.tree_transducer.Tree import Tree, VarLeaf
+
+class WNBTTTests(unittest.TestCase):
+    def setUp(self):
+        self.transducer = WNBTT(["qS","qA","qB"],["qS"],["A","B","S"],["A","B","S","X","Y"],{
+                        (("qA","qB"),"S"):[("qS",Tree("S", [VarLeaf(1), VarLeaf(0)]),1),("qS",Tree("S", [VarLeaf(0), VarLeaf(1)]),4)],
+                        ((),"A"):[("qA",Tree("A"),0),("qA",Tree("X"),2)],
+                        ((),"B"):[("qB",Tree("B"),1),("qB",Tree("Y"),0.5)]
+                        })
+        self.tree = Tree("S", [Tree("A"), Tree("B")])
+
+    #Raises error if a transition rule has no weight
+    def testMissingWeight(self):
+        self.assertRaises(ValueError, WNBTT, ["qA"],["qA"],["A"],["A"],{((),"A"):[("qA",Tree("A"))]})
+
+    #Returns the cheapest output and its weight
+    def testBest(self):
+        self.assertEqual(self.transducer.best(self.tree), (Tree("S", [Tree("Y"), Tree("A")]), 1.5))
+        self.assertIsNone(self.transducer.best(Tree("S", [Tree("B"), Tree("A")])))
+
+    #Returns the k cheapest outputs in order
+    def testKBest(self):
+        self.assertEqual(self.transducer.k_best(self.tree, 3), [(Tree("S", [Tree("Y"), Tree("A")]), 1.5),
+                                                                (Tree("S", [Tree("B"), Tree("A")]), 2),
+                                                                (Tree("S", [Tree("Y"), Tree("X")]), 3.5)])
+        outputs = self.transducer.k_best(self.tree, 100)
+        self.assertEqual(len(outputs), 8)
+        self.assertEqual([weight for (_, weight) in outputs], [1.5, 2, 3.5, 4, 4.5, 5, 6.5, 7])
+        self.assertEqual({out_tree for (out_tree, _) in outputs}, set(self.transducer.transduce(self.tree)))
+
+    #Returns each output once with the weight of its best derivation
+    def testKBestDistinct(self):
+        transducer = WNBTT(["qS","qA","qB"],["qS"],["A","S"],["A","S"],{
+                        (("qA",),"S"):[("qS",Tree("S", [VarLeaf(0)]),1)],
+                        (("qB",),"S"):[("qS",Tree("S", [VarLeaf(0)]),3)],
+                        ((),"A"):[("qA",Tree("A"),2),("qA",Tree("A"),5),("qB",Tree("A"),0),("qB",Tree("S"),1)]
+                        })
+        tree = Tree("S", [Tree("A")])
+        self.assertEqual(transducer.best(tree), (Tree("S", [Tree("A")]), 3))
+        self.assertEqual(transducer.k_best(tree, 5), [(Tree("S", [Tree("A")]), 3), (Tree("S", [Tree("S")]), 4)])
+
+    #Finds the most probable output with the Viterbi semiring, including rules that delete and copy subtrees
+    def testViterbi(self):
+        transducer = WNBTT(["qS","qA","qB"],["qS"],["A","B","S"],["A","B","S"],{
+                        (("qA","qB"),"S"):[("qS",Tree("S", [VarLeaf(0)]),0.5),("qS",Tree("S", [VarLeaf(1), VarLeaf(1)]),0.4)],
+                        ((),"A"):[("qA",Tree("A"),0.5)],
+                        ((),"B"):[("qB",Tree("B"),0.5)]
+                        }, semiring=VITERBI)
+        self.assertEqual(transducer.best(self.tree), (Tree("S", [Tree("A")]), 0.125))
+        self.assertEqual(transducer.k_best(self.tree, 2), [(Tree("S", [Tree("A")]), 0.125), (Tree("S", [Tree("B"), Tree("B")]), 0.1)])
+
+if __name__ == '__main__':
+    suite = unittest.TestLoader().loadTestsFromTestCase(WNBTTTests)
+    runner = unittest.TextTestRunner()
+    result = runner.run(suite)
+    print(result)
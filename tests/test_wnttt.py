@@ -0,0 +1,45 @@
+import unittest
+from src.tree_transducer.TreeTransducer.WNTTT import WNTTT
+from src.tree_transducer.Tree import Tree, VarLeaf
+
+class WNTTTTests(unittest.TestCase):
+    def setUp(self):
+        self.transducer = WNTTT(["qS","qA","qB"],["qS"],["A","B","S"],["A","B","S","X","Y"],{
+                        ("qS", "S", 2):{(("qA","qB"),Tree("S", [VarLeaf(1), VarLeaf(0)]),1),(("qA","qB"),Tree("S", [VarLeaf(0), VarLeaf(1)]),4)},
+                        ("qA", "A", 0):{((),Tree("A"),0),((),Tree("X"),2)},
+                        ("qB", "B", 0):{((),Tree("B"),1),((),Tree("Y"),0.5)}
+                        })
+        self.tree = Tree("S", [Tree("A"), Tree("B")])
+
+    #Raises error if a transition rule has no weight
+    def testMissingWeight(self):
+        self.assertRaises(ValueError, WNTTT, ["qA"],["qA"],["A"],["A"],{("qA", "A", 0):{((),Tree("A"))}})
+
+    #Returns the cheapest output and its weight
+    def testBest(self):
+        self.assertEqual(self.transducer.best(self.tree), (Tree("S", [Tree("Y"), Tree("A")]), 1.5))
+        self.assertIsNone(self.transducer.best(Tree("S", [Tree("B"), Tree("A")])))
+
+    #Returns the k cheapest outputs in order
+    def testKBest(self):
+        self.assertEqual(self.transducer.k_best(self.tree, 3), [(Tree("S", [Tree("Y"), Tree("A")]), 1.5),
+                                                                (Tree("S", [Tree("B"), Tree("A")]), 2),
+                                                                (Tree("S", [Tree("Y"), Tree("X")]), 3.5)])
+        outputs = self.transducer.k_best(self.tree, 100)
+        self.assertEqual([weight for (_, weight) in outputs], [1.5, 2, 3.5, 4, 4.5, 5, 6.5, 7])
+        self.assertEqual({out_tree for (out_tree, _) in outputs}, self.transducer.transduce(self.tree))
+
+    #Adds the weights of epsilon transitions
+    def testEpsilonWeights(self):
+        transducer = WNTTT(["qS","qA"],["qS"],["A"],["A","E"],{
+                        ("qS", "", 1):{(("qA",),Tree("E", [VarLeaf(0)]),1)},
+                        ("qS", "A", 0):{((),Tree("A"),3)},
+                        ("qA", "A", 0):{((),Tree("A"),0)}
+                        })
+        self.assertEqual(transducer.k_best(Tree("A"), 2), [(Tree("E", [Tree("A")]), 1), (Tree("A"), 3)])
+
+if __name__ == '__main__':
+    suite = unittest.TestLoader().loadTestsFromTestCase(WNTTTTests)
+    runner = unittest.TextTestRunner()
+    result = runner.run(suite)
+    print(result)